@@ -0,0 +1,455 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+import numpy as np
+
+
+@dataclass
+class JitterResult:
+    """
+    Result of the jitter analysis of a square wave capture. Jitters are in
+    milliseconds, times and delays in seconds.
+    """
+
+    times: np.ndarray  # Time of each transition, relative to the first sample.
+    states: np.ndarray  # State of the signal after each transition.
+    delays: np.ndarray  # Time elapsed since the previous transition.
+    jitters: np.ndarray  # Deviation of each delay from half of the period.
+    failed: np.ndarray  # Mask of the transitions over the maximum jitter.
+    mean: float  # Stats of the absolute values of the jitters.
+    std: float
+    min: float
+    max: float
+    first_transition: int = 0  # Index of the first transition within the capture.
+
+    @property
+    def transitions(self) -> int:
+        """The number of transitions found in the capture."""
+
+        return len(self.jitters)
+
+    @property
+    def failed_percent(self) -> float:
+        """The percentage of transitions over the maximum jitter."""
+
+        if not self.transitions:
+            return 0.0
+
+        return np.count_nonzero(self.failed) / self.transitions * 100
+
+    @property
+    def passed(self) -> bool:
+        """Whether transitions were found and none of them failed, a signal that never changes state fails."""
+
+        return self.transitions > 0 and not self.failed.any()
+
+
+@dataclass
+class JitterSnapshot:
+    """
+    Stats of the absolute values of the jitters accumulated so far, in ms.
+    """
+
+    transitions: int
+    failed: int
+    mean: float
+    std: float
+    min: float
+    max: float
+    bins: np.ndarray  # Edges of the histogram bins, the outer ones are infinite.
+    histogram: np.ndarray  # Count of signed jitters in each bin.
+
+    @property
+    def failed_percent(self) -> float:
+        """The percentage of transitions over the maximum jitter."""
+
+        if not self.transitions:
+            return 0.0
+
+        return self.failed / self.transitions * 100
+
+    @property
+    def passed(self) -> bool:
+        """Whether transitions were found and none of them failed, a signal that never changes state fails."""
+
+        return self.transitions > 0 and self.failed == 0
+
+
+class OnlineJitterStats:
+    """
+    Accumulates jitter stats in constant memory, so captures of any length can
+    be summarized. Mean and variance are merged per chunk with the parallel
+    form of Welford's algorithm, and the jitters are counted in fixed bins of
+    'bin_width' ms within ±'limit' ms, plus two outer bins for the outliers.
+    """
+
+    def __init__(self, max_jitter: float, bin_width: float = 1.0, limit: float = 100.0) -> None:
+        self.max_jitter = max_jitter
+        self.bins = np.concatenate(([-np.inf], np.arange(-limit, limit + bin_width, bin_width), [np.inf]))
+        self.histogram = np.zeros(len(self.bins) - 1, dtype=np.int64)
+
+        self.transitions = 0
+        self.failed = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, jitters: np.ndarray | float) -> None:
+        """Add the jitters of one transition or of a whole chunk of them."""
+
+        jitters = np.atleast_1d(jitters)
+        count = len(jitters)
+
+        if not count:
+            return
+
+        jitters_abs = np.abs(jitters)
+        mean = jitters_abs.mean()
+        m2 = np.square(jitters_abs - mean).sum()
+
+        # Merge the chunk into the running mean and sum of squared deviations.
+        total = self.transitions + count
+        delta = mean - self._mean
+        self._mean += delta * count / total
+        self._m2 += m2 + delta**2 * self.transitions * count / total
+        self.transitions = total
+
+        self.failed += int(np.count_nonzero(jitters_abs > self.max_jitter))
+        self.min = min(self.min, jitters_abs.min())
+        self.max = max(self.max, jitters_abs.max())
+        self.histogram += np.histogram(jitters, self.bins)[0]
+
+    def merge(self, other: "OnlineJitterStats") -> None:
+        """Add the jitters accumulated by another instance with the same bins."""
+
+        if not other.transitions:
+            return
+
+        total = self.transitions + other.transitions
+        delta = other._mean - self._mean
+        self._mean += delta * other.transitions / total
+        self._m2 += other._m2 + delta**2 * self.transitions * other.transitions / total
+        self.transitions = total
+
+        self.failed += other.failed
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.histogram += other.histogram
+
+    def snapshot(self) -> JitterSnapshot:
+        """Copy the current stats, they are undefined before any transition."""
+
+        if not self.transitions:
+            stats = (np.nan,) * 4
+        else:
+            stats = self._mean, np.sqrt(self._m2 / self.transitions), self.min, self.max
+
+        return JitterSnapshot(
+            self.transitions, self.failed, *map(float, stats), self.bins.copy(), self.histogram.copy()
+        )
+
+
+class JitterAnalyzer:
+    """
+    Analyzes a square wave capture chunk by chunk. The last state and the time
+    of the last transition are carried over between chunks, so transitions at
+    chunk boundaries are measured as if the capture was analyzed at once. The
+    first sample of the capture must be right after a transition.
+    """
+
+    def __init__(self, period: float, max_jitter: float, **kwargs) -> None:
+        """
+        Args:
+            period (float): The expected period of the square wave, in ms.
+            max_jitter (float): The maximum jitter allowed, in ms.
+            kwargs: Forwarded to 'OnlineJitterStats'.
+        """
+
+        self.period = period
+        self.max_jitter = max_jitter
+        self.stats = OnlineJitterStats(max_jitter, **kwargs)
+
+        self._start_time = 0.0
+        self._last_state = None
+        self._last_transition_time = 0.0
+
+    def update(self, samples: np.ndarray, times: np.ndarray) -> JitterResult:
+        """
+        Analyze the next chunk of the capture and add its jitters to the stats.
+
+        Args:
+            samples (np.ndarray): The sampled signal states.
+            times (np.ndarray): The timestamp of each sample, in seconds.
+
+        Returns:
+            JitterResult:
+
+            The transitions found in the chunk, their jitters and stats.
+        """
+
+        samples = np.asarray(samples)
+        times = np.asarray(times, dtype=np.float64)
+
+        # The first sample of the capture is the reference for the others.
+        if self._last_state is None and len(samples):
+            self._start_time = self._last_transition_time = times[0]
+            self._last_state = samples[0]
+
+        # Compare each sample with the previous one, including the last sample
+        # of the previous chunk.
+        edges = find_transitions(samples)
+        if len(samples) and samples[0] != self._last_state:
+            edges = np.concatenate(([0], edges))
+
+        edge_times = times[edges]
+        delays = np.diff(edge_times, prepend=self._last_transition_time)
+        jitters = delays * 1000 - (self.period / 2)
+        jitters_abs = np.abs(jitters)
+
+        # Stats are undefined for chunks without transitions.
+        if len(jitters):
+            stats = jitters_abs.mean(), jitters_abs.std(), jitters_abs.min(), jitters_abs.max()
+            self._last_transition_time = edge_times[-1]
+        else:
+            stats = (np.nan,) * 4
+
+        if len(samples):
+            self._last_state = samples[-1]
+
+        first_transition = self.stats.transitions
+        self.stats.update(jitters)
+
+        return JitterResult(
+            edge_times - self._start_time,
+            samples[edges],
+            delays,
+            jitters,
+            jitters_abs > self.max_jitter,
+            *map(float, stats),
+            first_transition=first_transition,
+        )
+
+
+class MultiChannelJitterAnalyzer:
+    """
+    Analyzes the square waves of all the channels of a task chunk by chunk,
+    with one vectorized pass over each (channels, samples) block. The channels
+    don't need to be in phase, the first transition of each channel is the
+    reference for its capture and is not measured.
+    """
+
+    def __init__(self, channels: list[str], period: float, max_jitter: float, **kwargs) -> None:
+        """
+        Args:
+            channels (list[str]): The name of each channel, in the order of the
+                rows of the blocks.
+            period (float): The expected period of the square waves, in ms.
+            max_jitter (float): The maximum jitter allowed, in ms.
+            kwargs: Forwarded to 'OnlineJitterStats'.
+        """
+
+        self.channels = list(channels)
+        self.period = period
+        self.max_jitter = max_jitter
+        self.stats = [OnlineJitterStats(max_jitter, **kwargs) for _ in self.channels]
+
+        # The time of the first transition of each channel, NaN until found.
+        self.start_times = np.full(len(self.channels), np.nan)
+
+        self._last_states: np.ndarray | None = None
+        self._last_transition_times = np.full(len(self.channels), np.nan)
+
+    @property
+    def synced(self) -> np.ndarray:
+        """Mask of the channels whose first transition was found."""
+
+        return ~np.isnan(self.start_times)
+
+    def update(self, samples: np.ndarray, times: np.ndarray) -> list[JitterResult]:
+        """
+        Analyze the next block of the capture and add its jitters to the stats.
+
+        Args:
+            samples (np.ndarray): The sampled signal states, shaped as
+                (channels, samples).
+            times (np.ndarray): The timestamp of each sample, in seconds.
+
+        Returns:
+            list[JitterResult]:
+
+            The transitions found in the block for each channel, their jitters
+            and stats.
+        """
+
+        samples = np.asarray(samples)
+        times = np.asarray(times, dtype=np.float64)
+        channels = len(self.channels)
+
+        # Compare each sample with the previous one, including the last sample
+        # of the previous block.
+        if self._last_states is None and samples.shape[1]:
+            self._last_states = samples[:, :1].copy()
+
+        previous = np.empty_like(samples)
+        previous[:, 1:] = samples[:, :-1]
+        if samples.shape[1]:
+            previous[:, :1] = self._last_states
+            self._last_states = samples[:, -1:].copy()
+
+        # The transitions are sorted by channel, then by sample.
+        rows, columns = np.nonzero(samples != previous)
+        bounds = np.searchsorted(rows, np.arange(channels + 1))
+
+        # The first transition of a channel starts its capture.
+        syncing = (bounds[1:] > bounds[:-1]) & ~self.synced
+        if syncing.any():
+            first = bounds[:-1][syncing]
+            self.start_times[syncing] = self._last_transition_times[syncing] = times[columns[first]]
+
+            keep = np.ones(len(rows), dtype=bool)
+            keep[first] = False
+            rows, columns = rows[keep], columns[keep]
+            bounds = np.searchsorted(rows, np.arange(channels + 1))
+
+        # Measure each delay from the previous transition of the same channel,
+        # which is in a previous block for the first transition of each one.
+        edge_times = times[columns]
+        found = bounds[1:] > bounds[:-1]
+        previous_times = np.empty_like(edge_times)
+        previous_times[1:] = edge_times[:-1]
+        previous_times[bounds[:-1][found]] = self._last_transition_times[found]
+        self._last_transition_times[found] = edge_times[bounds[1:][found] - 1]
+
+        delays = edge_times - previous_times
+        jitters = delays * 1000 - (self.period / 2)
+        jitters_abs = np.abs(jitters)
+        states = samples[rows, columns]
+
+        results = []
+        for channel, channel_stats in enumerate(self.stats):
+            part = slice(bounds[channel], bounds[channel + 1])
+
+            # Stats are undefined for blocks without transitions.
+            if found[channel]:
+                part_abs = jitters_abs[part]
+                stats = part_abs.mean(), part_abs.std(), part_abs.min(), part_abs.max()
+            else:
+                stats = (np.nan,) * 4
+
+            first_transition = channel_stats.transitions
+            channel_stats.update(jitters[part])
+
+            results.append(
+                JitterResult(
+                    edge_times[part] - self.start_times[channel],
+                    states[part],
+                    delays[part],
+                    jitters[part],
+                    jitters_abs[part] > self.max_jitter,
+                    *map(float, stats),
+                    first_transition=first_transition,
+                )
+            )
+
+        return results
+
+
+def find_transitions(samples: np.ndarray) -> np.ndarray:
+    """
+    Find the indices of the samples where the signal changed state.
+
+    Returns:
+        np.ndarray:
+
+        The index of the first sample of each new state.
+    """
+
+    # Comparing neighbours works for boolean samples too, unlike 'np.diff'.
+    return np.flatnonzero(samples[1:] != samples[:-1]) + 1
+
+
+def analyze_jitter(samples: np.ndarray, times: np.ndarray, period: float, max_jitter: float) -> JitterResult:
+    """
+    Measure the delay between each transition of a square wave and how much it
+    deviates from half of its period, in one vectorized pass.
+
+    Args:
+        samples (np.ndarray): The sampled signal states. The first sample must
+            be right after a transition, so the first delay is complete.
+        times (np.ndarray): The timestamp of each sample, in seconds.
+        period (float): The expected period of the square wave, in ms.
+        max_jitter (float): The maximum jitter allowed, in ms.
+
+    Returns:
+        JitterResult:
+
+        The transitions, their jitters and stats.
+    """
+
+    return JitterAnalyzer(period, max_jitter).update(samples, times)
+
+
+def _analyze_rows(samples: np.ndarray, times: np.ndarray, period: float, max_jitter: float) -> list[JitterResult]:
+    """Analyze a group of channels, in a worker process."""
+
+    return MultiChannelJitterAnalyzer(range(len(samples)), period, max_jitter).update(samples, times)
+
+
+def analyze_channels(
+    samples: np.ndarray, times: np.ndarray, period: float, max_jitter: float, max_workers: int = 1
+) -> list[JitterResult]:
+    """
+    Measure the jitter of the square wave of each channel of a whole capture.
+    Channels are split in groups that are analyzed in parallel by a pool of
+    processes, which pays off for long captures of many channels.
+
+    Args:
+        samples (np.ndarray): The sampled signal states, shaped as
+            (channels, samples).
+        times (np.ndarray): The timestamp of each sample, in seconds.
+        period (float): The expected period of the square waves, in ms.
+        max_jitter (float): The maximum jitter allowed, in ms.
+        max_workers (int): The number of processes, the channels are analyzed
+            in the calling process if it is 1.
+
+    Returns:
+        list[JitterResult]:
+
+        The transitions of each channel after its first one, their jitters and
+        stats.
+    """
+
+    samples = np.asarray(samples)
+    groups = [group for group in np.array_split(samples, max(1, min(max_workers, len(samples)))) if len(group)]
+
+    if len(groups) <= 1:
+        return _analyze_rows(samples, times, period, max_jitter)
+
+    analyze = partial(_analyze_rows, times=times, period=period, max_jitter=max_jitter)
+    with ProcessPoolExecutor(len(groups)) as executor:
+        return [result for part in executor.map(analyze, groups) for result in part]
+
+
+def format_table(channels: list[str], snapshots: list[JitterSnapshot]) -> list[str]:
+    """
+    Format the stats of each channel as the rows of a table, with a header.
+
+    Returns:
+        list[str]:
+
+        The lines of the table, without line breaks.
+    """
+
+    width = max(len("Channel"), *map(len, channels))
+    header = ("Transitions", "Mean", "Std", "Min", "Max", "Failed")
+
+    lines = ["  ".join((f"{'Channel':<{width}}", *(f"{title:>11}" for title in header), "Result"))]
+    for channel, stats in zip(channels, snapshots):
+        jitters = (f"{value:.3f}ms" for value in (stats.mean, stats.std, stats.min, stats.max))
+        columns = (stats.transitions, *jitters, f"{stats.failed_percent:.1f}%")
+        columns = (f"{channel:<{width}}", *(f"{column:>11}" for column in columns), "PASS" if stats.passed else "FAIL")
+        lines.append("  ".join(columns))
+
+    return lines
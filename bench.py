@@ -0,0 +1,394 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime as dt
+from typing import Callable
+
+import numpy as np
+from nidaqmx.constants import WAIT_INFINITELY, AcquisitionType
+
+import db
+from analysis import MultiChannelJitterAnalyzer
+from mock_nidaqmx import DAQ
+from mock_nidaqmx.clock import VirtualClock
+from mock_nidaqmx.signals import EdgeJitter, SquareWave
+from mock_nidaqmx.utils import parse_channel_string, unflatten_channel_string
+
+# Same acquisition as the 'test_signal.py' tests.
+PERIOD = 2_000  # In ms
+MAX_JITTER = 10  # In ms
+SAMPLE_RATE = 20_000  # In samples per second
+CHUNK_SIZE = 10_000  # In samples
+CAPTURE_DURATION = 13  # In seconds
+
+# Benchmarks slower than the baseline by more than this fraction fail.
+DEFAULT_THRESHOLD = 0.25
+
+
+@dataclass
+class Benchmark:
+    """
+    A benchmark of a hot path. 'setup' is called once and returns the function
+    to time, which processes 'items' units of work (samples, channels...) per
+    call.
+    """
+
+    name: str
+    setup: Callable[[], Callable[[], object]]
+    items: int = 1
+    unit: str = "calls"
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    Timings of a benchmark, in seconds per call.
+    """
+
+    name: str
+    calls: int  # Calls per repeat.
+    repeats: int
+    min: float
+    median: float
+    mean: float
+    stdev: float
+    throughput: float  # In 'unit' per second, from the median.
+    unit: str
+    times: list[float] = field(default_factory=list)  # Seconds per call of each repeat.
+
+
+@dataclass
+class Comparison:
+    """
+    Change of the median time of a benchmark relative to the baseline.
+    """
+
+    name: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        """The current median time over the baseline one."""
+
+        return self.current / self.baseline
+
+    def regressed(self, threshold: float) -> bool:
+        """Whether the benchmark got slower than the baseline by more than 'threshold'."""
+
+        return self.ratio > 1 + threshold
+
+
+def read_benchmark(channels: int, samples: int) -> Callable[[], Callable[[], object]]:
+    """Software-timed 'Task.read' of a block of samples of analog and digital channels."""
+
+    def setup() -> Callable[[], object]:
+        task = DAQ(seed=0).Task()
+
+        # Half of the channels are analog, the rest digital.
+        analog = channels // 2
+        if analog:
+            task.ai_channels.add_ai_voltage_chan(f"Dev1/ai0:{analog - 1}")
+        task.di_channels.add_di_chan(f"Dev1/port0/line0:{channels - analog - 1}")
+
+        return lambda: task.read(samples)
+
+    return setup
+
+
+def analog_read_benchmark(channels: int, samples: int, raw: bool) -> Callable[[], Callable[[], object]]:
+    """Software-timed bulk read of analog channels, as raw ADC codes or scaled to volts."""
+
+    def setup() -> Callable[[], object]:
+        task = DAQ(seed=0).Task()
+        task.ai_channels.add_ai_voltage_chan(f"Dev1/ai0:{channels - 1}")
+
+        return lambda: task.in_stream.read_many(samples, raw=raw)
+
+    return setup
+
+
+def unflatten_benchmark(channels: str) -> Callable[[], Callable[[], object]]:
+    """Expansion of a channel string into a list of channel names, without the cache of the parser."""
+
+    def setup() -> Callable[[], object]:
+        def run() -> list[str]:
+            parse_channel_string.cache_clear()
+            return unflatten_channel_string(channels)
+
+        return run
+
+    return setup
+
+
+def parse_benchmark(channels: str) -> Callable[[], Callable[[], object]]:
+    """Lookup of the last channel of a cached channel string, without expanding its ranges."""
+
+    def setup() -> Callable[[], object]:
+        return lambda: parse_channel_string(channels)[-1]
+
+    return setup
+
+
+def capture(channels: int) -> tuple[np.ndarray, np.ndarray]:
+    """Acquire the samples of a jittery square wave wired to every channel, as 'base_test' does."""
+
+    device = DAQ(clock=VirtualClock(), seed=0)
+    device.connect(f"Dev1/port0/line0:{channels - 1}", SquareWave(PERIOD / 1000, impairments=(EdgeJitter(0.005),)))
+
+    with device.Task() as task:
+        task.di_channels.add_di_chan(f"Dev1/port0/line0:{channels - 1}")
+        samples = CAPTURE_DURATION * SAMPLE_RATE
+        task.timing.cfg_samp_clk_timing(SAMPLE_RATE, sample_mode=AcquisitionType.FINITE, samps_per_chan=samples)
+        data = task.in_stream.read_many(samples, timeout=WAIT_INFINITELY)
+
+        return data, task.in_stream.sample_times(0, samples)
+
+
+def jitter_benchmark(channels: int) -> Callable[[], Callable[[], object]]:
+    """Jitter analysis of a whole capture, chunk by chunk like 'base_test'."""
+
+    def setup() -> Callable[[], object]:
+        data, times = capture(channels)
+        names = [f"Dev1/port0/line{i}" for i in range(channels)]
+
+        def run() -> None:
+            analyzer = MultiChannelJitterAnalyzer(names, PERIOD, MAX_JITTER)
+            for i in range(0, data.shape[1], CHUNK_SIZE):
+                analyzer.update(data[:, i : i + CHUNK_SIZE], times[i : i + CHUNK_SIZE])
+
+        return run
+
+    return setup
+
+
+def serialization_benchmark(transitions: int, decode: bool) -> Callable[[], Callable[[], object]]:
+    """Encoding of a test with its transitions into a document, and decoding it back if 'decode'."""
+
+    def setup() -> Callable[[], object]:
+        rng = np.random.default_rng(0)
+        test = db.Test(
+            name="TestSignalJitter",
+            times=np.cumsum(rng.uniform(0.99, 1.01, transitions)),
+            states=np.arange(transitions) % 2,
+            passed=True,
+            log="",
+            uuid="0" * 32,
+            timestamp=dt(2024, 1, 1),
+        )
+
+        if not decode:
+            return test.to_mongo
+
+        son = test.to_mongo()
+        return lambda: db.Test._from_son(son).times
+
+    return setup
+
+
+BENCHMARKS = [
+    *(
+        Benchmark(
+            f"task_read[channels={channels},samples={samples}]",
+            read_benchmark(channels, samples),
+            channels * samples,
+            "samples",
+        )
+        for channels in (1, 8, 64)
+        for samples in (1, 100, 10_000)
+    ),
+    *(
+        Benchmark(
+            f"analog_read[channels=8,samples=10000,raw={raw}]",
+            analog_read_benchmark(8, 10_000, raw),
+            8 * 10_000,
+            "samples",
+        )
+        for raw in (False, True)
+    ),
+    Benchmark(
+        "unflatten_channel_string[ranges=3]",
+        unflatten_benchmark("Dev1/ai0:7, Dev1/ai9, Dev1/ai15:10"),
+        15,
+        "channels",
+    ),
+    Benchmark(
+        "unflatten_channel_string[channels=10000]",
+        unflatten_benchmark("Dev1/ai0:9999"),
+        10_000,
+        "channels",
+    ),
+    Benchmark(
+        "parse_channel_string[channels=10000,cached]",
+        parse_benchmark("Dev1/ai0:9999"),
+        1,
+        "lookups",
+    ),
+    *(
+        Benchmark(
+            f"jitter_analysis[channels={channels}]",
+            jitter_benchmark(channels),
+            channels * CAPTURE_DURATION * SAMPLE_RATE,
+            "samples",
+        )
+        for channels in (1, 13)
+    ),
+    Benchmark("db_encode[transitions=10000]", serialization_benchmark(10_000, decode=False), 10_000, "transitions"),
+    Benchmark("db_decode[transitions=10000]", serialization_benchmark(10_000, decode=True), 10_000, "transitions"),
+]
+
+
+def run_benchmark(benchmark: Benchmark, repeats: int = 5, min_time: float = 0.2) -> BenchmarkResult:
+    """
+    Time a benchmark. The number of calls per repeat is calibrated so each
+    repeat takes at least 'min_time' seconds, then the time per call of each
+    repeat is measured.
+
+    Returns:
+        BenchmarkResult:
+
+        The timings of the benchmark.
+    """
+
+    function = benchmark.setup()
+
+    # Double the calls until a repeat is long enough to be timed accurately,
+    # the calibration warms up the caches as well.
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        if time.perf_counter() - start >= min_time:
+            break
+        calls *= 2
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        times.append((time.perf_counter() - start) / calls)
+
+    median = statistics.median(times)
+
+    return BenchmarkResult(
+        name=benchmark.name,
+        calls=calls,
+        repeats=repeats,
+        min=min(times),
+        median=median,
+        mean=statistics.fmean(times),
+        stdev=statistics.stdev(times) if len(times) > 1 else 0.0,
+        throughput=benchmark.items / median,
+        unit=benchmark.unit,
+        times=times,
+    )
+
+
+def environment() -> dict:
+    """Describe the machine and versions the benchmarks ran on."""
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "timestamp": dt.now().isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "github_actions": os.environ.get("GITHUB_ACTIONS") == "true",
+    }
+
+
+def compare(results: list[BenchmarkResult], baseline: dict) -> list[Comparison]:
+    """
+    Compare the median times of the results to the ones of a baseline report,
+    benchmarks missing from the baseline are skipped.
+
+    Returns:
+        list[Comparison]:
+
+        The comparison of each benchmark present in both.
+    """
+
+    medians = {result["name"]: result["median"] for result in baseline["results"]}
+
+    return [
+        Comparison(result.name, medians[result.name], result.median) for result in results if result.name in medians
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the acquisition and analysis hot paths.")
+    parser.add_argument("-k", "--filter", default="", help="Only run the benchmarks whose name contains this text.")
+    parser.add_argument("-o", "--output", help="Write the results as JSON to this file.")
+    parser.add_argument("-b", "--baseline", help="Compare the results to a JSON file written by a previous run.")
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Fail if a benchmark is slower than the baseline by more than this fraction.",
+    )
+    parser.add_argument("-r", "--repeats", type=int, default=5, help="Number of timed repeats of each benchmark.")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum duration of each repeat, in seconds.")
+    args = parser.parse_args()
+
+    results = []
+    for benchmark in BENCHMARKS:
+        if args.filter not in benchmark.name:
+            continue
+
+        result = run_benchmark(benchmark, args.repeats, args.min_time)
+        results.append(result)
+        print(
+            f"{result.name:<50} {result.median * 1e6:12.1f}µs ±{result.stdev / result.median * 100:5.1f}% "
+            f"{result.throughput:14,.0f} {result.unit}/s",
+            flush=True,
+        )
+
+    report = {"environment": environment(), "results": [asdict(result) for result in results]}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline) as file:
+        comparisons = compare(results, json.load(file))
+
+    print(f"\n{'-' * 70}\nCompared to {args.baseline} (threshold {args.threshold:.0%})")
+    regressions = []
+    for comparison in comparisons:
+        regressed = comparison.regressed(args.threshold)
+        if regressed:
+            regressions.append(comparison.name)
+
+        status = "REGRESSION" if regressed else ""
+        print(f"{comparison.name:<50} {comparison.ratio:8.2f}x {status}")
+
+    if regressions:
+        print(f"\nFAILED ({len(regressions)} regressions): {', '.join(regressions)}")
+        return 1
+
+    print("\nOK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
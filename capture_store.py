@@ -0,0 +1,236 @@
+import json
+from pathlib import Path
+from typing import Self
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+SEGMENT_SIZE = 2**20  # In samples per file
+
+
+class CaptureWriter:
+    """
+    Appends the chunks of a raw capture to fixed size segments on disk. Each
+    segment is a pair of memory-mapped '.npy' files, the samples shaped as
+    (channels, segment_size) and their timestamps. The 'index.json' file
+    tells how many samples were written and the time range of each segment.
+    """
+
+    def __init__(self, path: Path, channels: list[str], dtype: np.dtype, segment_size: int = SEGMENT_SIZE) -> None:
+        """
+        Args:
+            path (Path): The directory of the capture, it is created if needed.
+            channels (list[str]): The name of each channel.
+            dtype (np.dtype): The dtype of the samples.
+            segment_size (int): The number of samples of each segment.
+        """
+
+        self.path = Path(path)
+        self.channels = list(channels)
+        self.dtype = np.dtype(dtype)
+        self.segment_size = segment_size
+        self.length = 0
+
+        self._segments: list[list[float]] = []  # First and last time of each segment.
+        self._samples: np.memmap | None = None
+        self._times: np.memmap | None = None
+
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def write(self, samples: np.ndarray, times: np.ndarray) -> None:
+        """
+        Append a chunk of samples to the capture.
+
+        Args:
+            samples (np.ndarray): The samples, shaped as (channels, samples).
+            times (np.ndarray): The timestamp of each sample, in seconds.
+        """
+
+        offset = 0
+        while offset < len(times):
+            segment, position = divmod(self.length, self.segment_size)
+
+            # Open the next segment once the current one is full.
+            if segment == len(self._segments):
+                self._open(segment)
+                self._segments.append([float(times[offset]), float(times[offset])])
+
+            count = min(len(times) - offset, self.segment_size - position)
+            self._samples[:, position : position + count] = samples[:, offset : offset + count]
+            self._times[position : position + count] = times[offset : offset + count]
+
+            self._segments[-1][1] = float(times[offset + count - 1])
+            self.length += count
+            offset += count
+
+    def _open(self, segment: int) -> None:
+        """Flush the current segment and create the next one."""
+
+        self.flush()
+
+        shape = (len(self.channels), self.segment_size)
+        self._samples = np.lib.format.open_memmap(self.path / f"samples_{segment:05}.npy", "w+", self.dtype, shape)
+        self._times = np.lib.format.open_memmap(self.path / f"times_{segment:05}.npy", "w+", np.float64, shape[1:])
+
+    def flush(self) -> None:
+        """Write the pending samples and the index to disk."""
+
+        if self._samples is not None:
+            self._samples.flush()
+            self._times.flush()
+
+        index = {
+            "channels": self.channels,
+            "dtype": self.dtype.str,
+            "segment_size": self.segment_size,
+            "length": self.length,
+            "segments": self._segments,
+        }
+        (self.path / "index.json").write_text(json.dumps(index))
+
+    def close(self) -> None:
+        """Flush the capture and release the memory maps."""
+
+        self.flush()
+        self._samples = self._times = None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class Capture:
+    """
+    Reads a raw capture written by 'CaptureWriter'. The segments are memory
+    mapped, only the pages of the samples that are used are read from disk,
+    so windows of captures of any size can be sliced.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+
+        index = json.loads((self.path / "index.json").read_text())
+        self.channels: list[str] = index["channels"]
+        self.dtype = np.dtype(index["dtype"])
+        self.segment_size: int = index["segment_size"]
+        self.length: int = index["length"]
+
+        # The first and last time of each segment, to find them by time.
+        segments = np.array(index["segments"], dtype=np.float64).reshape(-1, 2)
+        self._first_times, self._last_times = segments[:, 0], segments[:, 1]
+        self._segments: dict[int, tuple[np.memmap, np.memmap]] = {}
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def start_time(self) -> float:
+        """The time of the first sample, in seconds."""
+
+        return float(self._first_times[0]) if self.length else np.nan
+
+    @property
+    def end_time(self) -> float:
+        """The time of the last sample, in seconds."""
+
+        return float(self._last_times[-1]) if self.length else np.nan
+
+    def _segment(self, segment: int) -> tuple[np.memmap, np.memmap]:
+        """Map the samples and times of a segment, without the unwritten part."""
+
+        if segment not in self._segments:
+            count = min(self.segment_size, self.length - segment * self.segment_size)
+            samples = np.load(self.path / f"samples_{segment:05}.npy", mmap_mode="r")[:, :count]
+            times = np.load(self.path / f"times_{segment:05}.npy", mmap_mode="r")[:count]
+            self._segments[segment] = samples, times
+
+        return self._segments[segment]
+
+    def read(self, first: int, last: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Read the samples from index 'first' up to 'last', excluded.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]:
+
+            The samples, shaped as (channels, samples), and their timestamps.
+            They are read-only views of the memory maps when the samples are
+            within a single segment, and copies otherwise.
+        """
+
+        first, last = max(first, 0), min(last, self.length)
+        if first >= last:
+            return np.empty((len(self.channels), 0), dtype=self.dtype), np.empty(0)
+
+        parts = []
+        for segment in range(first // self.segment_size, (last - 1) // self.segment_size + 1):
+            samples, times = self._segment(segment)
+            offset = segment * self.segment_size
+            start, stop = max(first - offset, 0), min(last - offset, self.segment_size)
+            parts.append((samples[:, start:stop], times[start:stop]))
+
+        if len(parts) == 1:
+            return parts[0]
+
+        return np.concatenate([part[0] for part in parts], axis=1), np.concatenate([part[1] for part in parts])
+
+    def index(self, time: float) -> int:
+        """The index of the first sample taken at or after 'time'."""
+
+        segment = int(np.searchsorted(self._last_times, time, side="left"))
+        if segment == len(self._last_times):
+            return self.length
+
+        # Only the timestamps of one segment are searched.
+        return segment * self.segment_size + int(np.searchsorted(self._segment(segment)[1], time, side="left"))
+
+    def window(self, start: float, end: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Read the samples taken from 'start' up to 'end', excluded, in seconds.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]:
+
+            The samples, shaped as (channels, samples), and their timestamps.
+        """
+
+        return self.read(self.index(start), self.index(end))
+
+
+class CaptureStore:
+    """
+    Directory of raw captures, indexed by the uuid of the run and the name of
+    the test, as in '<root>/<uuid>/<name>/'.
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    def path(self, uuid: str, name: str) -> Path:
+        """The directory of a capture, names are escaped to be valid paths."""
+
+        return self.root / uuid / quote(name, safe=" ")
+
+    def create(self, uuid: str, name: str, channels: list[str], dtype: np.dtype, **kwargs) -> CaptureWriter:
+        """Start writing a new capture, 'kwargs' are forwarded to 'CaptureWriter'."""
+
+        return CaptureWriter(self.path(uuid, name), channels, dtype, **kwargs)
+
+    def open(self, uuid: str, name: str) -> Capture:
+        """Open a capture to read it."""
+
+        return Capture(self.path(uuid, name))
+
+    def exists(self, uuid: str, name: str) -> bool:
+        """Whether a capture was written for the test."""
+
+        return (self.path(uuid, name) / "index.json").is_file()
+
+    def captures(self, uuid: str | None = None) -> list[tuple[str, str]]:
+        """The uuid and name of every capture stored, or of those of a run."""
+
+        indexes = self.root.glob(f"{uuid or '*'}/*/index.json")
+
+        return sorted((index.parent.parent.name, unquote(index.parent.name)) for index in indexes)
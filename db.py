@@ -1,17 +1,571 @@
+import atexit
 import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime
 
+import gridfs
+import numpy as np
+from bson import Binary, ObjectId
 from dotenv import load_dotenv
-from mongoengine import BooleanField, DateTimeField, Document, ListField, StringField, connect
+from mongoengine import BooleanField, DateTimeField, Document, FloatField, IntField, StringField, connect
+from mongoengine.base import BaseField
+from mongoengine.connection import get_db
+from mongoengine.queryset import QuerySet
+from pymongo.errors import BulkWriteError, PyMongoError
 
+# The settings are read from the environment or a '.env' file, the database
+# is only connected to when it is first used.
 load_dotenv()
-connect(host=os.environ["DB_HOST"])
 
+# MongoDB error code of a duplicate '_id', for documents that were already
+# written by a previous attempt.
+DUPLICATE_KEY = 11000
+
+# Errors of the backends that are worth retrying a write for.
+DATABASE_ERRORS = (PyMongoError, sqlite3.Error)
+
+
+class MongoBackend:
+    """
+    Stores the documents in the MongoDB server at 'DB_HOST'. The size of the
+    connection pool and the timeouts are set with the 'DB_MAX_POOL_SIZE'
+    (10 by default), 'DB_MIN_POOL_SIZE' (0 by default) and 'DB_TIMEOUT' (5
+    seconds by default) environment variables.
+    """
+
+    def __init__(self) -> None:
+        if "DB_HOST" not in os.environ:
+            raise KeyError("DB_HOST is not set, set it to the MongoDB server or set DB_BACKEND=sqlite")
+
+        timeout = int(float(os.environ.get("DB_TIMEOUT", 5)) * 1000)
+
+        connect(
+            host=os.environ["DB_HOST"],
+            maxPoolSize=int(os.environ.get("DB_MAX_POOL_SIZE", 10)),
+            minPoolSize=int(os.environ.get("DB_MIN_POOL_SIZE", 0)),
+            serverSelectionTimeoutMS=timeout,
+            connectTimeoutMS=timeout,
+            uuidRepresentation="standard",
+        )
+
+    @property
+    def files(self) -> gridfs.GridFS:
+        """The GridFS store for large payloads."""
+
+        return gridfs.GridFS(get_db())
+
+    def objects(self, kind: type[Document]) -> QuerySet:
+        """Query the documents of a kind."""
+
+        return kind._meta.get("queryset_class", QuerySet)(kind, kind._get_collection())
+
+    def save(self, document: Document, *args, **kwargs) -> Document:
+        """Insert or update a single document."""
+
+        return Document.save(document, *args, **kwargs)
+
+    def trends(self, kind: type[Document], filters: dict) -> list[dict]:
+        """Aggregate the run summaries per day and test name, see 'trends'."""
+
+        pipeline = [
+            {"$match": filters},
+            {
+                "$group": {
+                    "_id": {"day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}}, "name": "$name"},
+                    "runs": {"$sum": 1},
+                    "passed": {"$sum": {"$cond": ["$passed", 1, 0]}},
+                    "mean": {"$avg": "$mean"},
+                    "max": {"$max": "$max"},
+                    "failed_percent": {"$avg": "$failed_percent"},
+                    "samples_per_second": {"$avg": "$samples_per_second"},
+                }
+            },
+            {"$sort": {"_id.day": 1, "_id.name": 1}},
+        ]
+
+        return [{**row.pop("_id"), **row} for row in kind._get_collection().aggregate(pipeline)]
+
+    def insert(self, documents: list[Document]) -> None:
+        """Insert documents of the same kind in a single request."""
+
+        for document in documents:
+            if document.id is None:
+                document.id = ObjectId()
+
+        try:
+            documents[0]._get_collection().insert_many([document.to_mongo() for document in documents], ordered=False)
+        except BulkWriteError as error:
+            # Documents written by a previous attempt are not errors.
+            errors = [write for write in error.details["writeErrors"] if write["code"] != DUPLICATE_KEY]
+            if errors or error.details.get("writeConcernErrors"):
+                raise
+
+
+_backend: "MongoBackend | SQLiteBackend | None" = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> "MongoBackend | SQLiteBackend":
+    """
+    Set up the backend selected by the 'DB_BACKEND' environment variable the
+    first time it is needed, 'mongodb' by default or 'sqlite' to store the
+    documents in the local 'DB_PATH' file, 'tests.sqlite3' by default.
+
+    Returns:
+        MongoBackend | SQLiteBackend:
+
+        The backend shared by every document.
+    """
+
+    global _backend
+
+    with _backend_lock:
+        if _backend is None:
+            name = os.environ.get("DB_BACKEND", "mongodb")
+
+            if name == "mongodb":
+                _backend = MongoBackend()
+            elif name == "sqlite":
+                from local_db import SQLiteBackend
+
+                _backend = SQLiteBackend(os.environ.get("DB_PATH", "tests.sqlite3"))
+            else:
+                raise ValueError(f"Unknown database backend: {name}")
+
+    return _backend
+
+
+class Objects:
+    """
+    Descriptor that queries the documents of a kind through the backend, like
+    the 'objects' attribute of the 'mongoengine' documents.
+    """
+
+    def __get__(self, instance, owner: type[Document]):
+        return get_backend().objects(owner)
+
+
+class LazyDocument(Document):
+    """
+    Base class for the documents, they connect to the database the first
+    time they are saved or queried, through the selected backend.
+    """
+
+    meta = {"abstract": True}
+
+    objects = Objects()
+
+    @classmethod
+    def _get_db(cls):
+        get_backend()
+        return super()._get_db()
+
+    @classmethod
+    def _get_collection(cls):
+        get_backend()
+        return super()._get_collection()
+
+    def save(self, *args, **kwargs) -> "LazyDocument":
+        return get_backend().save(self, *args, **kwargs)
+
+
+# Payloads larger than this are stored in GridFS, so the documents stay well
+# below the 16MB limit of MongoDB.
+MAX_INLINE_SIZE = 4 * 1024**2  # In bytes
+
+
+class ArrayField(BaseField):
+    """
+    Base class for the fields that store a 1-D NumPy array as a binary payload
+    instead of a BSON array, optionally compressed with zlib. Payloads over
+    'max_inline_size' bytes are stored in GridFS and only referenced by the
+    document. Values are always NumPy arrays, and documents stored with plain
+    lists are still loaded.
+
+    Files in GridFS are not deleted with their documents. Backends without a
+    file store keep every payload inline.
+    """
+
+    # NumPy dtype of the arrays.
+    dtype = None
+
+    def __init__(self, compress: bool = True, max_inline_size: int = MAX_INLINE_SIZE, **kwargs) -> None:
+        self.compress = compress
+        self.max_inline_size = max_inline_size
+
+        super().__init__(**kwargs)
+
+    def encode(self, array: np.ndarray) -> tuple[bytes, dict]:
+        """Encode an array into bytes, plus the parameters needed to decode it."""
+
+        raise NotImplementedError()
+
+    def decode(self, payload: bytes, count: int, parameters: dict) -> np.ndarray:
+        """Decode an array of 'count' values from its bytes."""
+
+        raise NotImplementedError()
+
+    def __set__(self, instance, value) -> None:
+        super().__set__(instance, None if value is None else self.to_python(value))
+
+    def to_python(self, value) -> np.ndarray:
+        if isinstance(value, dict):
+            if "file" in value:
+                payload = get_backend().files.get(value["file"]).read()
+            else:
+                payload = bytes(value["data"])
+
+            if value.get("compression") == "zlib":
+                payload = zlib.decompress(payload)
+
+            return self.decode(payload, value["count"], value)
+
+        # Lists of documents stored before the binary encoding.
+        return np.asarray(value, dtype=self.dtype)
+
+    def to_mongo(self, value) -> dict:
+        array = self.to_python(value)
+        payload, parameters = self.encode(array)
+
+        if self.compress:
+            payload = zlib.compress(payload)
+            parameters["compression"] = "zlib"
+
+        files = get_backend().files if len(payload) > self.max_inline_size else None
+        if files is not None:
+            parameters["file"] = files.put(payload)
+        else:
+            parameters["data"] = Binary(payload)
+
+        return {"count": len(array), **parameters}
+
+    def validate(self, value) -> None:
+        if np.ndim(value) != 1:
+            self.error("Must be a 1-D array")
+
+
+class TicksField(ArrayField):
+    """
+    Stores increasing timestamps as the differences between integer ticks,
+    with the smallest integer type that fits them. Steady sample or transition
+    rates compress very well this way.
+    """
+
+    dtype = np.float64
+
+    def __init__(self, tick: float = 1e-6, **kwargs) -> None:
+        """
+        Args:
+            tick (float): The resolution of the stored timestamps, in seconds.
+            kwargs: Forwarded to 'ArrayField'.
+        """
+
+        self.tick = tick
+
+        super().__init__(**kwargs)
+
+    def encode(self, array: np.ndarray) -> tuple[bytes, dict]:
+        deltas = np.diff(np.rint(array / self.tick).astype(np.int64), prepend=0)
+
+        # Use the smallest integer type that fits every delta.
+        for dtype in (np.int8, np.int16, np.int32, np.int64):
+            info = np.iinfo(dtype)
+            if not len(deltas) or (deltas.min() >= info.min and deltas.max() <= info.max):
+                break
+
+        parameters = {"encoding": "delta-ticks", "tick": self.tick, "dtype": np.dtype(dtype).str}
+
+        return deltas.astype(dtype).tobytes(), parameters
+
+    def decode(self, payload: bytes, count: int, parameters: dict) -> np.ndarray:
+        deltas = np.frombuffer(payload, dtype=parameters["dtype"], count=count)
+
+        return np.cumsum(deltas, dtype=np.int64) * parameters["tick"]
+
+
+class BitsField(ArrayField):
+    """
+    Stores an array of 0 and 1 states packed 8 per byte.
+    """
+
+    dtype = np.uint8
+
+    def encode(self, array: np.ndarray) -> tuple[bytes, dict]:
+        return np.packbits(array.astype(bool)).tobytes(), {"encoding": "bits"}
+
+    def decode(self, payload: bytes, count: int, parameters: dict) -> np.ndarray:
+        return np.unpackbits(np.frombuffer(payload, dtype=np.uint8), count=count)
+
+    def validate(self, value) -> None:
+        super().validate(value)
+
+        if np.any((np.asarray(value) != 0) & (np.asarray(value) != 1)):
+            self.error("States must be 0 or 1")
+
+
+class Test(LazyDocument):
+    # The app lists the tests by timestamp and name, and the tests of a run
+    # are found by uuid.
+    meta = {"indexes": [("-timestamp", "name"), "uuid"]}
 
-class Test(Document):
     timestamp = DateTimeField(required=True)
     passed = BooleanField(required=True)
     name = StringField(required=True)
     uuid = StringField(required=True)
-    states = ListField(required=True)
-    times = ListField(required=True)
+    states = BitsField(required=True)
+    times = TicksField(required=True)
     log = StringField(required=True)
+
+
+class Summary(LazyDocument):
+    """
+    Compact record of the stats of a test, so the trends over time are
+    computed without loading the transitions of the tests. Stats of tests
+    without transitions are left empty.
+    """
+
+    meta = {"indexes": [("-timestamp", "name"), "uuid"]}
+
+    timestamp = DateTimeField(required=True)
+    name = StringField(required=True)
+    uuid = StringField(required=True)
+    passed = BooleanField(required=True)
+    mean = FloatField()  # Stats of the absolute values of the jitters, in ms.
+    std = FloatField()
+    min = FloatField()
+    max = FloatField()
+    failed_percent = FloatField(required=True)
+    samples_per_second = FloatField(required=True)
+    transitions = IntField(required=True)
+    host = StringField(required=True)  # The machine the test ran on.
+    origin = StringField(required=True)  # 'github-actions' or 'local'.
+
+
+def trends(name: str | None = None, since: datetime | None = None) -> list[dict]:
+    """
+    Aggregate the run summaries per day and test name, in the database.
+
+    Args:
+        name (str | None): Only aggregate the summaries of this test.
+        since (datetime | None): Only aggregate the summaries from this time.
+
+    Returns:
+        list[dict]:
+
+        A row per day and test name, sorted by both, with the 'day' as
+        'YYYY-MM-DD', the 'name', the number of 'runs' and how many 'passed',
+        the average of the 'mean' jitters, the highest 'max' jitter and the
+        average 'failed_percent' and 'samples_per_second'.
+    """
+
+    filters = {}
+    if name is not None:
+        filters["name"] = name
+    if since is not None:
+        filters["timestamp"] = {"$gte": since}
+
+    return get_backend().trends(Summary, filters)
+
+
+class ResultSink:
+    """
+    Queues documents and writes them from a background thread, so a slow or
+    unreachable database never blocks the tests. Documents are written in
+    batches with 'insert_many', and each batch is retried with an exponential
+    backoff. Their '_id' is set before the first attempt, so a batch that was
+    partially written before an error isn't duplicated by the retries.
+
+    The backend is set up when the first document is queued, so a missing
+    setting is raised to the caller right away. Other errors that retrying
+    can't fix drop the batch right away and are raised again by the next
+    'flush' or 'close', so the results aren't lost silently.
+    """
+
+    def __init__(
+        self, batch_size: int = 100, retries: int = 5, retry_delay: float = 0.5, max_dropped: int = 1_000
+    ) -> None:
+        """
+        Args:
+            batch_size (int): The maximum number of documents per write.
+            retries (int): How many times a failed batch is written again
+                before its documents are dropped.
+            retry_delay (float): The delay before the first retry, in seconds,
+                it doubles for each one.
+            max_dropped (int): How many of the last dropped documents are
+                kept, the others are only counted.
+        """
+
+        self.batch_size = batch_size
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+        # The documents that couldn't be written after all the retries, the
+        # last ones are kept so memory doesn't grow in long runs.
+        self.dropped: deque[Document] = deque(maxlen=max_dropped)
+        self.dropped_count = 0
+
+        # The first error that retrying couldn't fix, not raised yet.
+        self._error: Exception | None = None
+
+        self._queue: queue.Queue[Document | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._connected = False
+
+    def put(self, document: Document) -> None:
+        """
+        Validate a document and queue it to be written, without blocking.
+
+        Raises:
+            Exception: The error setting up the backend with the first
+                document, like a 'KeyError' for a missing setting. The
+                document isn't queued.
+        """
+
+        document.validate()
+
+        # The backend is set up with the first document, the errors of the
+        # configuration would drop every result in the background, at exit.
+        with self._lock:
+            if not self._connected:
+                self._connect()
+                self._connected = True
+
+        self._queue.put(document)
+
+        # The writer is started with the first document.
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="ResultSink", daemon=True)
+                self._thread.start()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Wait until every queued document is written or dropped.
+
+        Raises:
+            Exception: The first error that retrying couldn't fix since the
+                last call, like a 'KeyError' for a missing setting. The
+                documents were dropped.
+
+        Returns:
+            bool:
+
+            Whether the queue was emptied before the timeout.
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+
+                self._queue.all_tasks_done.wait(remaining)
+
+        self._raise_error()
+
+        return True
+
+    def close(self, timeout: float | None = None) -> bool:
+        """Flush the queued documents and stop the writer, see 'flush'."""
+
+        try:
+            flushed = self.flush(timeout)
+        finally:
+            with self._lock:
+                if self._thread is not None and self._thread.is_alive():
+                    self._queue.put(None)
+                    self._thread.join(timeout)
+                self._thread = None
+
+        self._raise_error()
+
+        return flushed
+
+    def _raise_error(self) -> None:
+        """Raise the error that retrying couldn't fix, once."""
+
+        with self._lock:
+            error, self._error = self._error, None
+
+        if error is not None:
+            raise error
+
+    def _run(self) -> None:
+        """Write the queued documents until a 'None' is queued."""
+
+        while True:
+            # Wait for a document, then batch every other one already queued.
+            batch = [self._queue.get()]
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            documents = [document for document in batch if document is not None]
+            try:
+                if documents:
+                    self._write(documents)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            if batch[-1] is None:
+                return
+
+    def _write(self, documents: list[Document]) -> None:
+        """Write a batch, retrying on errors, and drop it if all attempts fail."""
+
+        # Each kind of document is written into its own collection.
+        for kind in dict.fromkeys(type(document) for document in documents):
+            batch = [document for document in documents if type(document) is kind]
+
+            for attempt in range(self.retries + 1):
+                try:
+                    self._insert(batch)
+                    break
+                except DATABASE_ERRORS as error:
+                    if attempt == self.retries:
+                        self._drop(batch, error)
+                    else:
+                        time.sleep(self.retry_delay * 2**attempt)
+                except Exception as error:
+                    # Errors like a missing setting don't go away by retrying,
+                    # the caller gets them from 'flush'.
+                    self._drop(batch, error)
+                    with self._lock:
+                        self._error = self._error or error
+                    break
+
+    def _drop(self, documents: list[Document], error: Exception) -> None:
+        """Count the documents that couldn't be written, keep the last ones and report the error."""
+
+        kind = type(documents[0]).__name__
+        print(f"Dropped {len(documents)} {kind} documents: {error!r}", file=sys.stderr, flush=True)
+        self.dropped.extend(documents)
+        self.dropped_count += len(documents)
+
+    def _connect(self) -> None:
+        """Set up the backend, the connection itself is opened when writing."""
+
+        get_backend()
+
+    def _insert(self, documents: list[Document]) -> None:
+        """Insert documents of the same kind in a single request."""
+
+        get_backend().insert(documents)
+
+
+# The sink the tests queue their results into, the ones still queued are
+# written before the interpreter exits.
+results = ResultSink()
+atexit.register(results.close, float(os.environ.get("DB_FLUSH_TIMEOUT", 60)))
@@ -0,0 +1,253 @@
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Iterator, Self
+
+import bson
+from mongoengine import BooleanField, DateTimeField, Document, FloatField, IntField, StringField
+
+# Fields stored in their own column as well, so documents can be filtered by
+# them without decoding every one of them.
+COLUMN_FIELDS = (BooleanField, DateTimeField, FloatField, IntField, StringField)
+
+
+def _normalize(value: Any) -> Any:
+    """Round a value the way BSON does, e.g. datetimes to milliseconds."""
+
+    return bson.decode(bson.encode({"value": value}))["value"]
+
+
+def _to_column(value: Any) -> Any:
+    """Convert a field value into an SQLite value."""
+
+    value = _normalize(value)
+
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    return value
+
+
+def _from_column(field: Any, value: Any) -> Any:
+    """Convert an SQLite value back into a field value."""
+
+    if value is None:
+        return None
+
+    if isinstance(field, DateTimeField):
+        return datetime.fromisoformat(value)
+
+    if isinstance(field, BooleanField):
+        return bool(value)
+
+    return value
+
+
+class LocalQuerySet:
+    """
+    Query on the documents of a kind stored in SQLite, with the subset of the
+    'mongoengine' QuerySet methods used by the tests and the app. Only equality
+    filters on the scalar fields are supported.
+    """
+
+    def __init__(self, backend: "SQLiteBackend", kind: type[Document], filters: dict | None = None) -> None:
+        self._backend = backend
+        self._kind = kind
+        self._filters = filters or {}
+
+    def __call__(self, **filters) -> Self:
+        """Filter the documents further."""
+
+        return LocalQuerySet(self._backend, self._kind, {**self._filters, **filters})
+
+    def __iter__(self) -> Iterator[Document]:
+        for document in self._backend.find(self._kind, self._filters):
+            yield self._kind._from_son(document)
+
+    def first(self) -> Document | None:
+        """The first document stored, or None if there is none."""
+
+        documents = self._backend.find(self._kind, self._filters, limit=1)
+
+        return self._kind._from_son(documents[0]) if documents else None
+
+    def count(self) -> int:
+        """The number of documents."""
+
+        return self._backend.count(self._kind, self._filters)
+
+    def distinct(self, field: str) -> list:
+        """The distinct values of a scalar field."""
+
+        return self._backend.distinct(self._kind, self._filters, field)
+
+
+class SQLiteBackend:
+    """
+    Stores the documents in a local SQLite file, to run the tests and the app
+    without a network connection. Each kind of document has its own table, with
+    the whole document encoded as BSON plus a column for each scalar field.
+    """
+
+    # There is no separate store for large payloads, they are kept inline.
+    files = None
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): The path of the database file, ':memory:' for a
+                temporary database.
+        """
+
+        self.path = path
+
+        # The connection is shared with the background writers.
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._tables: set[str] = set()
+
+    def _columns(self, kind: type[Document]) -> dict[str, Any]:
+        """The scalar fields of a kind, by column name."""
+
+        return {
+            field.db_field: field
+            for name, field in kind._fields.items()
+            if isinstance(field, COLUMN_FIELDS) and field.db_field != "_id"
+        }
+
+    def _table(self, kind: type[Document]) -> str:
+        """Create the table of a kind if needed, and return its name."""
+
+        table = kind._get_collection_name()
+
+        if table not in self._tables:
+            columns = "".join(f', "{column}"' for column in self._columns(kind))
+            self._connection.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table}" (id TEXT PRIMARY KEY, document BLOB{columns})'
+            )
+
+            # Create the indexes declared by the documents, on their columns.
+            for index in kind._meta.get("index_specs", []):
+                names = [field.lstrip("+-") for field, _ in index["fields"]]
+                if all(name in self._columns(kind) for name in names):
+                    quoted = ", ".join(f'"{name}"' for name in names)
+                    self._connection.execute(
+                        f'CREATE INDEX IF NOT EXISTS "{table}_{"_".join(names)}" ON "{table}" ({quoted})'
+                    )
+
+            self._connection.commit()
+            self._tables.add(table)
+
+        return table
+
+    def _where(self, kind: type[Document], filters: dict) -> tuple[str, list]:
+        """Build the WHERE clause of the filters."""
+
+        columns = self._columns(kind)
+        fields = {name: field.db_field for name, field in kind._fields.items()}
+
+        conditions, values = [], []
+        for name, value in filters.items():
+            column = fields.get(name)
+            if column not in columns:
+                raise ValueError(f"Can't filter {kind.__name__} documents by '{name}'")
+
+            conditions.append(f'"{column}" = ?')
+            values.append(_to_column(columns[column].to_mongo(value)))
+
+        return (f" WHERE {' AND '.join(conditions)}" if conditions else ""), values
+
+    def objects(self, kind: type[Document]) -> LocalQuerySet:
+        """Query the documents of a kind."""
+
+        return LocalQuerySet(self, kind)
+
+    def save(self, document: Document, *args, **kwargs) -> Document:
+        """Insert or replace a single document."""
+
+        document.validate()
+        self.insert([document], replace=True)
+
+        return document
+
+    def insert(self, documents: list[Document], replace: bool = False) -> None:
+        """Insert documents of the same kind, the ones already stored are kept unless 'replace' is set."""
+
+        kind = type(documents[0])
+        columns = list(self._columns(kind))
+
+        rows = []
+        for document in documents:
+            if document.id is None:
+                document.id = bson.ObjectId()
+
+            son = document.to_mongo()
+            rows.append((str(document.id), bson.encode(son), *(_to_column(son.get(column)) for column in columns)))
+
+        with self._lock:
+            table = self._table(kind)
+            names = "".join(f', "{column}"' for column in columns)
+            placeholders = ", ?" * len(columns)
+
+            self._connection.executemany(
+                f'INSERT OR {"REPLACE" if replace else "IGNORE"} INTO "{table}" (id, document{names}) '
+                f"VALUES (?, ?{placeholders})",
+                rows,
+            )
+            self._connection.commit()
+
+    def find(self, kind: type[Document], filters: dict, limit: int | None = None) -> list[dict]:
+        """The documents matching the filters, in the order they were stored."""
+
+        where, values = self._where(kind, filters)
+        limit_clause = "" if limit is None else f" LIMIT {int(limit)}"
+
+        with self._lock:
+            rows = self._connection.execute(
+                f'SELECT document FROM "{self._table(kind)}"{where} ORDER BY rowid{limit_clause}', values
+            ).fetchall()
+
+        return [bson.decode(row[0]) for row in rows]
+
+    def count(self, kind: type[Document], filters: dict) -> int:
+        """The number of documents matching the filters."""
+
+        where, values = self._where(kind, filters)
+
+        with self._lock:
+            return self._connection.execute(f'SELECT COUNT(*) FROM "{self._table(kind)}"{where}', values).fetchone()[0]
+
+    def trends(self, kind: type[Document], filters: dict) -> list[dict]:
+        """Aggregate the run summaries per day and test name, see 'db.trends'."""
+
+        # The only range filter supported is the start time of the trends.
+        filters = dict(filters)
+        since = filters.pop("timestamp", {}).get("$gte")
+        where, values = self._where(kind, filters)
+        if since is not None:
+            where += f"{' AND' if where else ' WHERE'} \"timestamp\" >= ?"
+            values.append(_to_column(since))
+
+        columns = ("day", "name", "runs", "passed", "mean", "max", "failed_percent", "samples_per_second")
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT substr("timestamp", 1, 10) AS day, "name", COUNT(*), SUM("passed"), AVG("mean"), MAX("max"), '
+                f'AVG("failed_percent"), AVG("samples_per_second") FROM "{self._table(kind)}"{where} '
+                'GROUP BY day, "name" ORDER BY day, "name"',
+                values,
+            ).fetchall()
+
+        return [dict(zip(columns, row)) for row in rows]
+
+    def distinct(self, kind: type[Document], filters: dict, name: str) -> list:
+        """The distinct values of a scalar field of the documents matching the filters."""
+
+        field = kind._fields[name]
+        where, values = self._where(kind, filters)
+
+        with self._lock:
+            rows = self._connection.execute(
+                f'SELECT DISTINCT "{field.db_field}" FROM "{self._table(kind)}"{where}', values
+            ).fetchall()
+
+        return [_from_column(field, row[0]) for row in rows]
@@ -0,0 +1,77 @@
+import time
+from typing import Callable
+
+
+class Clock:
+    """
+    Real time clock used by default by the DAQ devices and their tasks.
+    """
+
+    def perf_counter(self) -> float:
+        """The current time, in seconds."""
+
+        return time.perf_counter()
+
+    def sleep(self, seconds: float) -> None:
+        """Block for the given amount of seconds."""
+
+        time.sleep(seconds)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}()"
+
+
+class VirtualClock(Clock):
+    """
+    Simulated clock that only moves forward when something sleeps on it or
+    when it is advanced explicitly. Sleeping returns right away, so captures
+    of any duration run as fast as the samples can be processed, and runs are
+    repeatable when the random generators are seeded as well.
+
+    Tasks running on a virtual clock don't start a producer thread, they
+    register a listener that is called every time the clock moves instead.
+    """
+
+    def __init__(self, start: float = 0.0, resolution: float = 0.0) -> None:
+        """
+        Args:
+            start (float): The initial time, in seconds.
+            resolution (float): The shortest time a sleep takes, in seconds,
+                to emulate the timer granularity of the operating system.
+        """
+
+        self.now = start
+        self.resolution = resolution
+        self._listeners: list[Callable[[], None]] = []
+
+    def perf_counter(self) -> float:
+        """The current simulated time, in seconds."""
+
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """Advance the clock by the given amount of seconds, or its resolution."""
+
+        self.advance(max(seconds, self.resolution))
+
+    def advance(self, seconds: float) -> None:
+        """Move the clock forward and notify the listeners."""
+
+        self.now += seconds
+
+        for listener in list(self._listeners):
+            listener()
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        """Call 'listener' every time the clock moves forward."""
+
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[], None]) -> None:
+        """Stop calling 'listener' when the clock moves forward."""
+
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(now={self.now})"
@@ -1,21 +1,112 @@
+import copy
 import random
-from typing import Self
+import time
+from array import array
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Self
 
-from .utils import unflatten_channel_string  # Copied from the 'nidaqmx' module
+import numpy as np
+from nidaqmx.error_codes import DAQmxErrors
+from nidaqmx.errors import DaqError
+
+from .clock import Clock
+from .in_stream import InStream
+from .instrumentation import Instrumentation
+from .recording import Recorder
+from .signals import Signal
+from .timing import Timing
+from .utils import parse_channel_string, unflatten_channel_string  # Based on the 'nidaqmx' module
+
+
+# The analog inputs of the USB-6001, a 14bit ADC over a ±5 V range. The ADC
+# codes are signed, from -8192 to 8191.
+AI_RESOLUTION = 14
+AI_RANGE = 5.0  # In volts
+AI_CODES = (-(2 ** (AI_RESOLUTION - 1)), 2 ** (AI_RESOLUTION - 1) - 1)
+
+# The volts of a code are 'c[0] + c[1] * code + c[2] * code**2 + ...', like the
+# 'ai_dev_scaling_coeff' property of the original 'nidaqmx' module.
+AI_SCALING_COEFF = (0.0, 2 * AI_RANGE / 2**AI_RESOLUTION)
+
+
+def _scaling_coeff(coefficients: Iterable[float]) -> tuple[float, ...]:
+    """Normalize polynomial coefficients, without the trailing zeros of the higher orders."""
+
+    coefficients = [float(coefficient) for coefficient in coefficients]
+    while len(coefficients) > 2 and coefficients[-1] == 0:
+        coefficients.pop()
+
+    return tuple(coefficients + [0.0] * (2 - len(coefficients)))
 
 
 class Channel:
     """
-    Base class for all channels.
+    Base class for all channels. Channels are lightweight views of a row of
+    the 'ChannelTable' of a Task, created when they are accessed.
     """
 
-    def __init__(self, name) -> None:
+    __slots__ = ("name", "random", "signal", "coefficients")
+
+    # NumPy dtype of the samples returned by the bulk read path, and of the
+    # raw samples the device acquires.
+    dtype = None
+    raw_dtype = None
+
+    # Scaling coefficients of the raw samples of this kind of channel, None
+    # if they aren't scaled.
+    scaling_coeff: tuple[float, ...] | None = None
+
+    def __init__(
+        self,
+        name,
+        random_generator: random.Random | None = None,
+        signal: Signal | None = None,
+        coefficients: tuple[float, ...] | None = None,
+    ) -> None:
         self.name = name
 
+        # The 'random' module itself is used unless a seeded generator is given.
+        self.random = random_generator or random
+
+        # Signal wired to the terminal of the channel, random values are
+        # generated if there is none.
+        self.signal = signal
+
+        # Scaling coefficients of the raw samples of the channel.
+        self.coefficients = coefficients or self.scaling_coeff
+
     @property
-    def value(self) -> None:
+    def value(self) -> float | int:
+        """Emulate a random value for a single reading."""
+
+        return self.sample(self.random, self.coefficients)
+
+    @staticmethod
+    def sample(random_generator: random.Random, coefficients: tuple[float, ...] | None = None) -> float | int:
+        """Emulate a random value for a single reading of this kind of channel, scaled by 'coefficients'."""
+
+        raise NotImplementedError()
+
+    @classmethod
+    def values(cls, rng: np.random.Generator, number_of_channels: int, number_of_samples: int) -> np.ndarray:
+        """
+        Emulate a block of raw readings for one or more channels of this kind.
+
+        Returns:
+            np.ndarray:
+
+            An array of 'raw_dtype' shaped as (number_of_channels, number_of_samples).
+        """
+
         raise NotImplementedError()
 
+    @classmethod
+    def to_raw(cls, samples: np.ndarray) -> np.ndarray:
+        """Convert the samples of a signal wired to this kind of channel into raw readings."""
+
+        return samples
+
     def __repr__(self) -> str:
         return f"Channel({self.name})"
 
@@ -28,11 +119,13 @@ class DIChannel(Channel):
     Digital Input Channel, that generates a random value when queried.
     """
 
-    def __init__(self, name) -> None:
-        super().__init__(name)
+    __slots__ = ()
 
-    @property
-    def value(self) -> int:
+    dtype = np.uint8
+    raw_dtype = np.uint8
+
+    @staticmethod
+    def sample(random_generator: random.Random, coefficients: tuple[float, ...] | None = None) -> int:
         """
         Emulate a random value for a digital reading.
 
@@ -42,29 +135,316 @@ class DIChannel(Channel):
             An integer that can be 0 (LOW) or 1 (HIGH)
         """
 
-        return random.choice([0, 1])
+        return random_generator.choice([0, 1])
+
+    @classmethod
+    def values(cls, rng: np.random.Generator, number_of_channels: int, number_of_samples: int) -> np.ndarray:
+        """
+        Emulate a block of random digital readings.
+
+        Returns:
+            np.ndarray:
+
+            An uint8 array of 0 (LOW) and 1 (HIGH) values shaped as
+            (number_of_channels, number_of_samples).
+        """
+
+        return rng.integers(0, 2, (number_of_channels, number_of_samples), dtype=np.uint8)
 
 
 class AIChannel(Channel):
     """
-    Analog Input Channel, that generates a random value when queried.
+    Analog Input Channel, that generates a random value when queried. The
+    device acquires raw 14bit ADC codes, which are scaled to volts by the
+    polynomial coefficients of the channel only when scaled samples are read.
     """
 
-    def __init__(self, name) -> None:
-        super().__init__(name)
+    __slots__ = ()
+
+    dtype = np.float64
+    raw_dtype = np.int16
+    scaling_coeff = AI_SCALING_COEFF
 
     @property
-    def value(self) -> float:
+    def ai_dev_scaling_coeff(self) -> list[float]:
+        """The coefficients of the polynomial that scales the raw codes of the channel to volts."""
+
+        return list(self.coefficients)
+
+    @staticmethod
+    def scale(codes: np.ndarray | int, coefficients: tuple[float, ...] = AI_SCALING_COEFF) -> np.ndarray | float:
+        """
+        Scale raw ADC codes to volts.
+
+        Returns:
+            np.ndarray | float:
+
+            The volts, as float64.
+        """
+
+        # Horner's method, the coefficients have at least two terms.
+        volts = codes * coefficients[-1]
+        for coefficient in coefficients[-2:0:-1]:
+            volts += coefficient
+            volts *= codes
+
+        if coefficients[0]:
+            volts += coefficients[0]
+
+        return volts
+
+    @staticmethod
+    def sample(random_generator: random.Random, coefficients: tuple[float, ...] | None = None) -> float:
         """
         Emulate a random value for a 14bit ADC reading.
 
         Returns:
             float:
 
-            The 14bit value scaled to a range between -5.0 and +5.0 volts.
+            The 14bit value scaled to volts, between -5.0 and +5.0 volts with
+            the default coefficients.
+        """
+
+        code = random_generator.randint(*AI_CODES)
+        coefficients = coefficients or AI_SCALING_COEFF
+
+        # Most channels are scaled linearly, without the loop of 'scale'.
+        if len(coefficients) == 2:
+            return coefficients[0] + coefficients[1] * code
+
+        return AIChannel.scale(code, coefficients)
+
+    @classmethod
+    def values(cls, rng: np.random.Generator, number_of_channels: int, number_of_samples: int) -> np.ndarray:
+        """
+        Emulate a block of random 14bit ADC readings.
+
+        Returns:
+            np.ndarray:
+
+            An int16 array of raw codes between -8192 and 8191 shaped as
+            (number_of_channels, number_of_samples).
+        """
+
+        return rng.integers(AI_CODES[0], AI_CODES[1], (number_of_channels, number_of_samples), np.int16, True)
+
+    @classmethod
+    def to_raw(cls, samples: np.ndarray) -> np.ndarray:
         """
+        Quantize the volts of an analog signal like the ADC, over the ±5 V
+        range. Volts out of the range saturate at the first or last code.
+
+        Returns:
+            np.ndarray:
+
+            The int16 raw codes.
+        """
+
+        codes = np.rint(np.asarray(samples, dtype=np.float64) / AI_SCALING_COEFF[1])
+
+        return np.clip(codes, *AI_CODES).astype(np.int16)
 
-        return ((random.randint(0, 2**14) / 2**14) * 10) - 5
+
+# The kinds of channels, the table stores the index of each one.
+CHANNEL_KINDS: tuple[type[Channel], ...] = (AIChannel, DIChannel)
+
+
+def _rows(rows: np.ndarray) -> slice | np.ndarray:
+    """Turn sorted rows into a slice when they are contiguous, to be assigned without a copy."""
+
+    if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+        return slice(int(rows[0]), int(rows[-1]) + 1)
+
+    return rows
+
+
+class ChannelTable:
+    """
+    The channels of a Task, stored as parallel columns instead of an object
+    per channel: their names, with a dict index to find them by name, their
+    kind as a compact array of indexes into 'CHANNEL_KINDS', the signal
+    wired to each one and the coefficients that scale its raw samples. It
+    behaves like a list of channels, and can be indexed by position or by
+    name, like 'task.channels["Dev1/ai3"]'.
+
+    The rows are grouped once per change of the channels, so each read
+    generates the random samples of every kind of channel as a single batch,
+    and scales the channels with the same coefficients together, no matter
+    how many channels there are.
+    """
+
+    __slots__ = ("_task", "names", "kinds", "signals", "coefficients", "_index", "_groups", "_scales")
+
+    def __init__(self, task) -> None:
+        self._task = task
+        self.names: list[str] = []
+        self.kinds = array("b")
+        self.signals: list[Signal | None] = []
+        self.coefficients: list[tuple[float, ...] | None] = []
+        self._index: dict[str, int] = {}
+        self._groups: tuple | None = None
+        self._scales: tuple | None = None
+
+    def add(self, kind: type[Channel], names: Iterable[str]) -> None:
+        """Add channels of a kind, sampling the signals wired to their terminals with their calibration."""
+
+        code = CHANNEL_KINDS.index(kind)
+        calibration = self._task.calibration if kind.scaling_coeff is not None else {}
+        for name in names:
+            if name in self._index:
+                raise DaqError(
+                    "Specified channel cannot be added to the task, because a channel with the same name is "
+                    f"already in the task.\n\nChannel Name: {name}",
+                    DAQmxErrors.CHAN_ALREADY_IN_TASK,
+                )
+
+            self._index[name] = len(self.names)
+            self.names.append(name)
+            self.kinds.append(code)
+            self.signals.append(self._task.signals.get(name))
+            self.coefficients.append(calibration.get(name, kind.scaling_coeff))
+
+        self._groups = None
+        self._scales = None
+
+    def clear(self) -> None:
+        """Remove every channel."""
+
+        self.names.clear()
+        del self.kinds[:]
+        self.signals.clear()
+        self.coefficients.clear()
+        self._index.clear()
+        self._groups = None
+        self._scales = None
+
+    def index(self, name: str) -> int:
+        """The row of a channel, by name."""
+
+        try:
+            return self._index[name]
+        except KeyError:
+            raise KeyError(f"{name} is not a channel of the task") from None
+
+    @property
+    def dtype(self) -> np.dtype:
+        """The NumPy dtype that can hold samples from every channel."""
+
+        if not self.names:
+            return np.dtype(np.float64)
+
+        return np.result_type(*(CHANNEL_KINDS[code].dtype for code in set(self.kinds)))
+
+    @property
+    def raw_dtype(self) -> np.dtype:
+        """The NumPy dtype that can hold the raw samples from every channel."""
+
+        if not self.names:
+            return np.dtype(np.float64)
+
+        return np.result_type(*(CHANNEL_KINDS[code].raw_dtype for code in set(self.kinds)))
+
+    @property
+    def wired(self) -> bool:
+        """Whether any channel samples a signal."""
+
+        return self.groups[0] != ()
+
+    @property
+    def groups(
+        self,
+    ) -> tuple[tuple[tuple[int, Signal], ...], tuple[tuple[type[Channel], slice | np.ndarray, int], ...]]:
+        """
+        The rows of the channels grouped the way they are generated.
+
+        Returns:
+            tuple[tuple[tuple[int, Signal], ...], tuple[tuple[type[Channel], slice | np.ndarray, int], ...]]:
+
+            The row and signal of each channel wired to a signal, and the rows
+            of the other channels of each kind with their count. The rows are
+            a slice when they are contiguous, to be assigned without a copy.
+        """
+
+        if self._groups is None:
+            wired = tuple((row, signal) for row, signal in enumerate(self.signals) if signal is not None)
+
+            kinds = np.frombuffer(self.kinds, dtype=np.int8)
+            unwired = np.array([signal is None for signal in self.signals], dtype=bool)
+
+            batches = []
+            for code, kind in enumerate(CHANNEL_KINDS):
+                rows = np.flatnonzero((kinds == code) & unwired)
+                if len(rows):
+                    batches.append((kind, _rows(rows), len(rows)))
+
+            self._groups = wired, tuple(batches)
+
+        return self._groups
+
+    @property
+    def scales(self) -> tuple[tuple[tuple[slice | np.ndarray, tuple[float, ...]], ...], slice | np.ndarray | None]:
+        """
+        The rows of the channels grouped the way their raw samples are scaled.
+
+        Returns:
+            tuple[tuple[tuple[slice | np.ndarray, tuple[float, ...]], ...], slice | np.ndarray | None]:
+
+            The rows of the channels with the same coefficients, with the
+            coefficients, and the rows of the channels that aren't scaled,
+            None if every channel is. The rows are a slice when they are
+            contiguous.
+        """
+
+        if self._scales is None:
+            unscaled = np.array([coefficients is None for coefficients in self.coefficients], dtype=bool)
+
+            scales = []
+            for coefficients in dict.fromkeys(self.coefficients):
+                if coefficients is not None:
+                    rows = np.flatnonzero([other == coefficients for other in self.coefficients])
+                    scales.append((_rows(rows), coefficients))
+
+            self._scales = tuple(scales), _rows(np.flatnonzero(unscaled)) if unscaled.any() else None
+
+        return self._scales
+
+    def scale(self, raw: np.ndarray, data: np.ndarray) -> None:
+        """Scale the raw samples of every channel, shaped as (channels, samples), into 'data'."""
+
+        scales, unscaled = self.scales
+        if unscaled is not None:
+            data[unscaled] = raw[unscaled]
+
+        for rows, coefficients in scales:
+            data[rows] = AIChannel.scale(raw[rows], coefficients)
+
+    def kind(self, row: int) -> type[Channel]:
+        """The kind of the channel of a row."""
+
+        return CHANNEL_KINDS[self.kinds[row]]
+
+    def _channel(self, row: int) -> Channel:
+        """Build the view of a row."""
+
+        return self.kind(row)(self.names[row], self._task.random, self.signals[row], self.coefficients[row])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, key: int | str) -> Channel:
+        if isinstance(key, str):
+            return self._channel(self.index(key))
+
+        return self._channel(range(len(self.names))[key])
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._index
+
+    def __iter__(self) -> Iterator[Channel]:
+        return map(self._channel, range(len(self.names)))
+
+    def __repr__(self) -> str:
+        return f"ChannelTable({self.names})"
 
 
 class AIChannelCollection:
@@ -78,12 +458,9 @@ class AIChannelCollection:
     def add_ai_voltage_chan(self, channels) -> None:
         """Add one or more Analog Input Channels to the collection."""
 
-        # Extract all the channels from the input string.
-        channels = unflatten_channel_string(channels)
-
-        # Add each channel to the collection.
-        for channel in channels:
-            self.task.channels.append(AIChannel(channel))
+        # Extract all the channels from the input string, without expanding
+        # the ranges into a list.
+        self.task.channels.add(AIChannel, parse_channel_string(channels))
 
 
 class DIChannelCollection:
@@ -97,12 +474,9 @@ class DIChannelCollection:
     def add_di_chan(self, channels) -> None:
         """Add one or more Digital Input Channels to the collection."""
 
-        # Extract all the channels from the input string.
-        channels = unflatten_channel_string(channels)
-
-        # Add each channel to the collection.
-        for channel in channels:
-            self.task.channels.append(DIChannel(channel))
+        # Extract all the channels from the input string, without expanding
+        # the ranges into a list.
+        self.task.channels.add(DIChannel, parse_channel_string(channels))
 
 
 class DAQ:
@@ -111,10 +485,28 @@ class DAQ:
     """
 
     class Task:
-        def __init__(self) -> None:
-            self.channels: list[Channel] = []
+        def __init__(self, device: "DAQ | None" = None) -> None:
+            # Tasks created through 'device.Task()' share the clock and the
+            # random generators of the device.
+            self.device = device
+            self.clock = device.clock if device else Clock()
+            self.rng = device.rng if device else np.random.default_rng()
+            self.random = device.random if device else None
+            self.signals = device.signals if device else {}
+            self.calibration = device.calibration if device else {}
+
+            # Opt-in metrics of the reads, see 'Instrumentation'.
+            self.instrumentation: Instrumentation | None = device.instrumentation if device else None
+
+            # Records the reads into a file when enabled with 'record'.
+            self.recorder: Recorder | None = None
+
+            self.channels = ChannelTable(self)
             self.ai_channels = AIChannelCollection(self)
             self.di_channels = DIChannelCollection(self)
+            self.in_stream = InStream(self)
+            self.timing = Timing(self)
+            self._every_n_samples_event: tuple[int, Callable] | None = None
 
         def __enter__(self) -> Self:
             """Context Manager to mimic the original 'nidaqmx' module."""
@@ -122,11 +514,74 @@ class DAQ:
             return self
 
         def __exit__(self, *args, **kwargs) -> None:
-            """Clear all channels when closing the Task."""
+            """Stop the Task and clear all channels when closing it."""
+
+            self.stop()
+            self.channels.clear()
+
+            if self.recorder is not None:
+                self.recorder.close()
+                self.recorder = None
 
-            self.channels = []
+        def record(self, path: str | Path) -> None:
+            """
+            Record every read of the Task into a file, with the time it
+            returned, until the Task is closed. The recording can be served
+            again by a 'mock_nidaqmx.replay.ReplayDevice'.
+            """
 
-        def read(self, number_of_samples_per_channel=1) -> list[list[float | int]]:
+            self.recorder = Recorder(path, self)
+
+        def start(self) -> None:
+            """Start the Sample Clock of a hardware-timed Task."""
+
+            if self.timing.is_hardware_timed:
+                self.in_stream._start()
+
+        def stop(self) -> None:
+            """Stop the Sample Clock, unread samples are discarded."""
+
+            self.in_stream._stop()
+
+        def register_every_n_samples_acquired_into_buffer_event(
+            self, sample_interval: int, callback_method: Callable | None
+        ) -> None:
+            """
+            Register a callback to be called by the producer thread every time
+            'sample_interval' samples are acquired into the buffer. It must be
+            registered before the Task starts, passing None unregisters it.
+
+            The callback must have the following prototype, where 'task_handle'
+            receives this Task:
+
+                >>> def callback(task_handle, every_n_samples_event_type,
+                >>>         number_of_samples, callback_data):
+                >>>     return 0
+            """
+
+            self._every_n_samples_event = None if callback_method is None else (sample_interval, callback_method)
+
+        def is_task_done(self) -> bool:
+            """Whether a finite acquisition acquired all of its samples."""
+
+            if not self.timing.is_finite:
+                return False
+
+            return self.in_stream.total_samp_per_chan_acquired >= self.timing.samp_quant_samp_per_chan
+
+        def wait_until_done(self, timeout: float = 10.0) -> None:
+            """Wait for a finite acquisition to acquire all of its samples."""
+
+            if not self.timing.is_finite:
+                raise DaqError(
+                    "Wait Until Done did not indicate that the task was done within the specified timeout, "
+                    "as the task acquires samples continuously.",
+                    DAQmxErrors.WAIT_UNTIL_DONE_DOES_NOT_INDICATE_DONE,
+                )
+
+            self.in_stream._wait_for(self.timing.samp_quant_samp_per_chan, timeout)
+
+        def read(self, number_of_samples_per_channel=1, timeout: float = 10.0) -> list[list[float | int]]:
             """Read the specified number of samples for each channel.
 
             Returns:
@@ -135,10 +590,112 @@ class DAQ:
                 A list of all channels, each with it's own list of samples.
             """
 
-            return [[channel.value for _ in range(number_of_samples_per_channel)] for channel in self.channels]
+            if self.instrumentation is None and self.recorder is None:
+                return self._read(number_of_samples_per_channel, timeout)
+
+            start = time.perf_counter()
+            data = self._read(number_of_samples_per_channel, timeout)
+
+            if self.instrumentation is not None:
+                self.instrumentation.record_read(time.perf_counter() - start, len(data[0]) if data else 0)
+            if self.recorder is not None:
+                self.recorder.write(np.array(data, dtype=self.channels.dtype).reshape(len(self.channels), -1))
+
+            return data
+
+        def _read(self, number_of_samples_per_channel: int, timeout: float) -> list[list[float | int]]:
+            """Same as 'read', without the instrumentation."""
+
+            # Single software-timed random samples are cheaper to emulate
+            # without NumPy.
+            if number_of_samples_per_channel == 1 and not self.timing.is_hardware_timed and not self.channels.wired:
+                random_generator = self.random or random
+                samples = [kind.sample for kind in CHANNEL_KINDS]
+
+                return [
+                    [samples[code](random_generator, coefficients)]
+                    for code, coefficients in zip(self.channels.kinds, self.channels.coefficients)
+                ]
+
+            return self.in_stream._read_many(number_of_samples_per_channel, None, timeout).tolist()
+
+        def read_raw(self, number_of_samples_per_channel: int = 1, timeout: float = 10.0) -> np.ndarray:
+            """
+            Read the specified number of raw samples for each channel, the
+            int16 ADC codes of the analog channels are not scaled to volts.
+            Unlike the original module, the samples are shaped like
+            'in_stream.read_many' instead of interleaved.
+
+            Returns:
+                np.ndarray:
+
+                The array with one row of raw samples per channel, scale the
+                analog ones with 'AIChannel.scale' and the coefficients of
+                the channel.
+            """
+
+            return self.in_stream.read_many(number_of_samples_per_channel, timeout=timeout, raw=True)
+
+    def __init__(
+        self,
+        name: str = "Dev1",
+        clock: Clock | None = None,
+        seed: int | None = None,
+        instrumentation: Instrumentation | None = None,
+    ) -> None:
+        """
+        Args:
+            name (str): The name of the device.
+            clock (Clock, optional): The clock used by the tasks of the device,
+                a 'VirtualClock' runs them faster than real time. Defaults to
+                the real time clock.
+            seed (int, optional): Seed for the random generators of the tasks,
+                so runs are repeatable.
+            instrumentation (Instrumentation, optional): Metrics shared by the
+                reads of the tasks of the device. Disabled by default.
+        """
 
-    def __init__(self, name: str = "Dev1") -> None:
         self.name = name
+        self.clock = clock or Clock()
+        self.rng = np.random.default_rng(seed)
+        self.random = None if seed is None else random.Random(seed)
+        self.signals: dict[str, Signal] = {}
+        self.calibration: dict[str, tuple[float, ...]] = {}
+        self.instrumentation = instrumentation
+
+        # Bind the tasks to this device, so 'device.Task()' keeps working.
+        self.Task = partial(DAQ.Task, self)
+
+    def connect(self, terminals: str, signal: Signal) -> None:
+        """
+        Wire a signal to one or more terminals of the device, the channels
+        created on them afterwards sample the signal instead of random values.
+        Each terminal gets its own copy of the signal.
+
+        Args:
+            terminals (str): The list or range of terminals, like 'Dev1/0' or
+                'Dev1/port0/line0:12'.
+            signal (Signal): The signal to generate the samples.
+        """
+
+        for terminal in unflatten_channel_string(terminals):
+            self.signals[terminal] = copy.deepcopy(signal)
+
+    def calibrate(self, terminals: str, coefficients: Iterable[float]) -> None:
+        """
+        Set the scaling coefficients of one or more analog input terminals,
+        the channels created on them afterwards scale their raw codes to
+        volts with them instead of the nominal ones.
+
+        Args:
+            terminals (str): The list or range of terminals, like 'Dev1/ai0:7'.
+            coefficients (Iterable[float]): The coefficients of the polynomial
+                from a raw code to volts, from the constant term up.
+        """
+
+        coefficients = _scaling_coeff(coefficients)
+        for terminal in unflatten_channel_string(terminals):
+            self.calibration[terminal] = coefficients
 
     def __repr__(self) -> str:
         return f"DAQ {self.name}"
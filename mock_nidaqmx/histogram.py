@@ -0,0 +1,174 @@
+import math
+
+import numpy as np
+
+
+class LogHistogram:
+    """
+    Histogram of positive durations with log spaced buckets, so latencies from
+    nanoseconds to minutes are counted in a fixed amount of memory with the
+    same relative resolution. Each power of two is split in 'sub_buckets'
+    linear buckets, a value is counted in O(1) without computing logarithms,
+    and percentiles are reported as the upper bound of their bucket, so they
+    are never underestimated.
+
+    Values below 'min_value', zero included, are counted in the first bucket
+    and values above 'max_value' in the last one, the exact minimum and
+    maximum are kept apart.
+    """
+
+    def __init__(self, min_value: float = 1e-9, max_value: float = 100.0, sub_buckets: int = 32) -> None:
+        """
+        Args:
+            min_value (float): The smallest value resolved, in seconds.
+            max_value (float): The largest value resolved, in seconds.
+            sub_buckets (int): The number of buckets per power of two, the
+                relative error of the percentiles is at most 1 / sub_buckets.
+        """
+
+        self.sub_buckets = sub_buckets
+        self._min_exponent = math.frexp(min_value)[1]
+        self._max_exponent = math.frexp(max_value)[1]
+
+        # A list is faster than an array to count single values.
+        self.counts = [0] * ((self._max_exponent - self._min_exponent + 1) * sub_buckets)
+
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value: float) -> int:
+        """The bucket of a value."""
+
+        mantissa, exponent = math.frexp(value)
+        if value <= 0 or exponent < self._min_exponent:
+            return 0
+        elif exponent > self._max_exponent:
+            return len(self.counts) - 1
+
+        # The mantissa is within [0.5, 1), each sub-bucket is a slice of it.
+        return (exponent - self._min_exponent) * self.sub_buckets + int((mantissa - 0.5) * 2 * self.sub_buckets)
+
+    def _upper_bound(self, index: int) -> float:
+        """The largest value counted in a bucket."""
+
+        exponent, sub_bucket = divmod(index, self.sub_buckets)
+
+        return math.ldexp(0.5 + (sub_bucket + 1) / (2 * self.sub_buckets), exponent + self._min_exponent)
+
+    def record(self, value: float) -> None:
+        """Count a single value."""
+
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def record_many(self, values: np.ndarray) -> None:
+        """Count a block of values at once."""
+
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+
+        mantissas, exponents = np.frexp(values)
+        indexes = (exponents - self._min_exponent) * self.sub_buckets + ((mantissas - 0.5) * 2 * self.sub_buckets)
+        indexes = np.where((values <= 0) | (exponents < self._min_exponent), 0, indexes)
+        indexes = np.clip(indexes.astype(np.int64), 0, len(self.counts) - 1)
+        for index, count in zip(*np.unique(indexes, return_counts=True)):
+            self.counts[index] += int(count)
+
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: "LogHistogram") -> None:
+        """Add the values counted by another histogram with the same buckets."""
+
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> float:
+        """The mean of the values, NaN if there are none."""
+
+        return self.total / self.count if self.count else math.nan
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Estimate a percentile of the values.
+
+        Args:
+            percentile (float): The percentile, between 0 and 100.
+
+        Returns:
+            float:
+
+            The upper bound of the bucket of the percentile, within the exact
+            minimum and maximum, or NaN if there are no values.
+        """
+
+        if not self.count:
+            return math.nan
+
+        rank = max(math.ceil(percentile / 100 * self.count), 1)
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+
+        # The last bucket has no upper bound, it holds every larger value.
+        if index == len(self.counts) - 1:
+            return self.max
+
+        return min(max(self._upper_bound(index), self.min), self.max)
+
+    def count_above(self, value: float) -> int:
+        """
+        Count the values larger than a threshold.
+
+        Args:
+            value (float): The threshold, in the unit of the values.
+
+        Returns:
+            int:
+
+            The values counted in the buckets that hold values larger than
+            the threshold, so they are never underestimated. Values up to a
+            bucket below the threshold can be counted as well.
+        """
+
+        # The bucket of the threshold holds larger values, unless the
+        # threshold is its upper bound.
+        index = self._index(value)
+        if index < len(self.counts) - 1 and self._upper_bound(index) <= value:
+            index += 1
+
+        return sum(self.counts[index:])
+
+    def snapshot(self) -> dict:
+        """
+        Summarize the values.
+
+        Returns:
+            dict:
+
+            The count, mean, minimum, maximum and the 50th, 99th and 99.9th
+            percentiles, in the unit of the values.
+        """
+
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min if self.count else math.nan,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "p99.9": self.percentile(99.9),
+            "max": self.max if self.count else math.nan,
+        }
@@ -0,0 +1,455 @@
+import threading
+import time
+
+import numpy as np
+from nidaqmx.constants import READ_ALL_AVAILABLE, WAIT_INFINITELY, EveryNSamplesEventType
+from nidaqmx.error_codes import DAQmxErrors
+from nidaqmx.errors import DaqError
+
+from .clock import VirtualClock
+
+_samples_no_longer_available_message = (
+    "The application is not able to keep up with the hardware acquisition.\n\n"
+    "Increasing the buffer size, reading the data more frequently, or "
+    "specifying a fixed number of samples to read instead of reading all "
+    "available samples might correct the problem."
+)
+
+
+def _default_buffer_size(rate: float) -> int:
+    """Buffer size chosen by the NI-DAQmx driver for continuous acquisitions."""
+
+    if rate <= 100:
+        return 1_000
+    elif rate <= 10_000:
+        return 10_000
+    elif rate <= 1_000_000:
+        return 100_000
+
+    return 1_000_000
+
+
+# Longest interval between two runs of the background producer, in seconds.
+_PRODUCER_INTERVAL = 0.01
+
+
+class InStream:
+    """
+    Exposes the bulk read path of a Task, similar to the 'in_stream' property
+    of the original 'nidaqmx' module. The stream readers use it to fill NumPy
+    arrays with a whole block of samples at once.
+
+    When the Sample Clock is configured through 'Task.timing', the samples are
+    written into a circular buffer at the configured rate, as the on-board
+    clock would do, and reads wait until the requested samples are acquired.
+    Sample 'i' is taken at 'start_time + i / rate'.
+
+    The buffer holds the raw samples, like the int16 codes of the ADC for
+    analog channels, which are only scaled to volts when scaled samples are
+    read.
+
+    A background producer thread keeps the buffer filled while the Task runs,
+    and fires the Every N Samples Acquired Into Buffer event registered on the
+    Task. On a 'VirtualClock' the producer runs every time the clock moves. If
+    the buffer wraps around before the samples are read, the next read fails
+    with the 'SAMPLES_NO_LONGER_AVAILABLE' (-200279) error.
+    """
+
+    def __init__(self, task) -> None:
+        self._task = task
+        self._input_buf_size: int | None = None
+
+        # State of the buffered acquisition, guarded by the lock as it is
+        # shared with the producer thread.
+        self._lock = threading.Lock()
+        self._buffer: np.ndarray | None = None
+        self.start_time: float | None = None
+        self._acquired = 0
+        self._read_pos = 0
+        self._overrun = False
+
+        # Background producer and Every N Samples event state.
+        self._producer: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._events_fired = 0
+        self._producing = False
+
+    @property
+    def dtype(self) -> np.dtype:
+        """The NumPy dtype that can hold samples from every channel of the task."""
+
+        return self._task.channels.dtype
+
+    @property
+    def raw_dtype(self) -> np.dtype:
+        """The NumPy dtype that can hold the raw samples from every channel of the task."""
+
+        return self._task.channels.raw_dtype
+
+    @property
+    def input_buf_size(self) -> int:
+        """The number of samples per channel the buffer can hold."""
+
+        timing = self._task.timing
+
+        if self._input_buf_size is not None:
+            return self._input_buf_size
+        elif not timing.is_hardware_timed:
+            return 0
+        elif timing.is_finite:
+            return timing.samp_quant_samp_per_chan
+
+        return max(timing.samp_quant_samp_per_chan, _default_buffer_size(timing.samp_clk_rate))
+
+    @input_buf_size.setter
+    def input_buf_size(self, value: int) -> None:
+        self._input_buf_size = value
+
+    @property
+    def overrun(self) -> bool:
+        """Whether unread samples were overwritten since the Task started."""
+
+        self._acquire()
+
+        return self._overrun
+
+    @property
+    def curr_read_pos(self) -> int:
+        """The index of the next sample to be read."""
+
+        return self._read_pos
+
+    @property
+    def avail_samp_per_chan(self) -> int:
+        """The number of samples acquired into the buffer and not read yet."""
+
+        self._acquire()
+
+        return self._acquired - self._read_pos
+
+    @property
+    def total_samp_per_chan_acquired(self) -> int:
+        """The number of samples acquired since the Task started."""
+
+        self._acquire()
+
+        return self._acquired
+
+    def sample_times(self, first_sample: int, number_of_samples: int) -> np.ndarray:
+        """
+        Compute the timestamps of a block of samples from the Sample Clock.
+
+        Returns:
+            np.ndarray:
+
+            The timestamps, in seconds, from the clock of the Task.
+        """
+
+        rate = self._task.timing.samp_clk_rate
+
+        return self.start_time + (first_sample + np.arange(number_of_samples)) / rate
+
+    def read_many(
+        self,
+        number_of_samples_per_channel: int,
+        data: np.ndarray | None = None,
+        timeout: float = 10.0,
+        raw: bool = False,
+    ) -> np.ndarray:
+        """
+        Read the specified number of samples for each channel into a NumPy
+        array. Channels of the same kind are generated together as a batch.
+
+        Args:
+            number_of_samples_per_channel (int): The number of samples to read,
+                or READ_ALL_AVAILABLE for the samples currently available in
+                the buffer (or all samples, in finite mode).
+            data (np.ndarray, optional): A preallocated array shaped as
+                (channels, samples) to be filled. A new one is allocated if
+                not given.
+            timeout (float): How long to wait for the samples to be acquired,
+                in seconds. WAIT_INFINITELY waits forever.
+            raw (bool): Read the raw samples, as 'raw_dtype', without scaling
+                the ADC codes of the analog channels to volts.
+
+        Returns:
+            np.ndarray:
+
+            The array with one row of samples per channel, in the order the
+            channels were added to the task.
+        """
+
+        instrumentation, recorder = self._task.instrumentation, self._task.recorder
+        if instrumentation is None and recorder is None:
+            return self._read_many(number_of_samples_per_channel, data, timeout, raw)
+
+        start = time.perf_counter()
+        data = self._read_many(number_of_samples_per_channel, data, timeout, raw)
+
+        if instrumentation is not None:
+            instrumentation.record_read(time.perf_counter() - start, data.shape[1])
+        if recorder is not None:
+            recorder.write(data)
+
+        return data
+
+    def _read_many(
+        self, number_of_samples_per_channel: int, data: np.ndarray | None, timeout: float, raw: bool = False
+    ) -> np.ndarray:
+        """Same as 'read_many', without the instrumentation."""
+
+        timing = self._task.timing
+        channels = self._task.channels
+
+        # Software-timed reads generate the samples right away.
+        if not timing.is_hardware_timed:
+            data = self._allocate(number_of_samples_per_channel, data, raw)
+            samples = data if raw or not channels.scales[0] else np.empty(data.shape, dtype=self.raw_dtype)
+            self._fill(samples, np.full(number_of_samples_per_channel, self._task.clock.perf_counter()))
+
+            if samples is not data:
+                channels.scale(samples, data)
+
+            return data
+
+        # Buffered reads start the Task implicitly, like the original module.
+        if self._buffer is None:
+            self._task.start()
+
+        if number_of_samples_per_channel == READ_ALL_AVAILABLE:
+            if timing.is_finite:
+                number_of_samples_per_channel = timing.samp_quant_samp_per_chan - self._read_pos
+            else:
+                number_of_samples_per_channel = self.avail_samp_per_chan
+
+        data = self._allocate(number_of_samples_per_channel, data, raw)
+        self._wait_for(self._read_pos + number_of_samples_per_channel, timeout)
+
+        # The raw samples are scaled out of the lock, the producer doesn't
+        # have to wait for it.
+        samples = data if raw or not channels.scales[0] else np.empty(data.shape, dtype=self.raw_dtype)
+
+        with self._lock:
+            if self._overrun:
+                raise DaqError(_samples_no_longer_available_message, DAQmxErrors.SAMPLES_NO_LONGER_AVAILABLE)
+
+            self._copy(self._read_pos, samples)
+            self._read_pos += number_of_samples_per_channel
+
+        if samples is not data:
+            channels.scale(samples, data)
+
+        return data
+
+    def _start(self) -> None:
+        """Allocate the buffer, start the simulated Sample Clock and the producer."""
+
+        with self._lock:
+            self._buffer = np.empty((len(self._task.channels), self.input_buf_size), dtype=self.raw_dtype)
+            self._acquired = 0
+            self._read_pos = 0
+            self._overrun = False
+            self._events_fired = 0
+            self.start_time = self._task.clock.perf_counter()
+
+        self._stop_event.clear()
+
+        if isinstance(self._task.clock, VirtualClock):
+            self._task.clock.add_listener(self._produce_step)
+        else:
+            self._producer = threading.Thread(target=self._produce, name=f"{self._task!r} producer", daemon=True)
+            self._producer.start()
+
+    def _stop(self) -> None:
+        """Stop the producer and release the buffer, the unread samples are discarded."""
+
+        self._stop_event.set()
+
+        if isinstance(self._task.clock, VirtualClock):
+            self._task.clock.remove_listener(self._produce_step)
+
+        # The Task may be stopped from within an event callback.
+        if self._producer is not None and self._producer is not threading.current_thread():
+            self._producer.join()
+
+        self._producer = None
+
+        with self._lock:
+            self._buffer = None
+
+    def _produce(self) -> None:
+        """Run the producer steps in a thread until the Task stops."""
+
+        interval = _PRODUCER_INTERVAL
+
+        event = self._task._every_n_samples_event
+        if event is not None:
+            interval = min(interval, event[0] / self._task.timing.samp_clk_rate)
+
+        while self._produce_step():
+            self._stop_event.wait(interval)
+
+    def _produce_step(self) -> bool:
+        """
+        Fill the buffer and fire the Every N Samples events that are due.
+
+        Returns:
+            bool:
+
+            Whether the producer should keep running.
+        """
+
+        # Callbacks sleeping on a virtual clock would run the producer again.
+        if self._producing:
+            return True
+
+        self._producing = True
+        try:
+            self._acquire()
+
+            event = self._task._every_n_samples_event
+            if event is not None:
+                sample_interval, callback = event
+
+                # Fire one event per 'sample_interval' samples acquired, even if
+                # the producer fell behind and several are due at once.
+                while self._acquired // sample_interval > self._events_fired:
+                    self._events_fired += 1
+                    callback(self._task, EveryNSamplesEventType.ACQUIRED_INTO_BUFFER.value, sample_interval, None)
+
+                    if self._stop_event.is_set():
+                        return False
+
+            # Stop once a finite acquisition acquired all of its samples.
+            timing = self._task.timing
+            if timing.is_finite and self._acquired >= timing.samp_quant_samp_per_chan:
+                return False
+
+            return not self._stop_event.is_set()
+        finally:
+            self._producing = False
+
+    def _allocate(self, number_of_samples_per_channel: int, data: np.ndarray | None, raw: bool = False) -> np.ndarray:
+        """Allocate an array for the samples, raw or scaled, or validate the given one."""
+
+        shape = (len(self._task.channels), number_of_samples_per_channel)
+
+        if data is None:
+            return np.empty(shape, dtype=self.raw_dtype if raw else self.dtype)
+        elif data.shape != shape:
+            raise DaqError(
+                "Read cannot be performed because the NumPy array passed into this function is not shaped "
+                f"correctly.\n\nShape of NumPy Array provided: {data.shape}\n"
+                f"Shape of NumPy Array required: {shape}",
+                DAQmxErrors.UNKNOWN,
+            )
+
+        return data
+
+    def _fill(self, data: np.ndarray, times: np.ndarray) -> None:
+        """Generate new raw samples for every channel, taken at 'times', into the given array."""
+
+        # Channels wired to a signal sample it, like the analog ones quantize
+        # it, the random values of the others are generated in one go for each
+        # kind of channel.
+        channels = self._task.channels
+        wired, batches = channels.groups
+        for row, signal in wired:
+            data[row] = channels.kind(row).to_raw(signal.generate(times, self._task.rng))
+
+        for kind, rows, count in batches:
+            data[rows] = kind.values(self._task.rng, count, data.shape[1])
+
+    def _acquire(self) -> None:
+        """Write into the buffer the samples the Sample Clock ticked since the last call."""
+
+        with self._lock:
+            if self._buffer is not None:
+                self._acquire_locked()
+
+    def _acquire_locked(self) -> None:
+        """Same as '_acquire', for callers already holding the lock."""
+
+        timing = self._task.timing
+        # The tolerance keeps float rounding from delaying a sample by a tick.
+        elapsed = self._task.clock.perf_counter() - self.start_time
+        target = int(elapsed * timing.samp_clk_rate + 1e-6)
+
+        if timing.is_finite:
+            target = min(target, timing.samp_quant_samp_per_chan)
+
+        if target <= self._acquired:
+            return
+
+        # Unread samples are overwritten once the buffer wraps around, only the
+        # most recent ones need to be generated in that case.
+        size = self._buffer.shape[1]
+        if target - self._read_pos > size:
+            self._overrun = True
+
+        first = max(self._acquired, target - size)
+        start = first % size
+        end = start + (target - first)
+
+        if end <= size:
+            self._fill(self._buffer[:, start:end], self.sample_times(first, target - first))
+        else:
+            self._fill(self._buffer[:, start:], self.sample_times(first, size - start))
+            self._fill(self._buffer[:, : end - size], self.sample_times(first + size - start, end - size))
+
+        self._acquired = target
+
+    def _wait_for(self, last_sample: int, timeout: float) -> None:
+        """Wait until the samples before 'last_sample' are acquired into the buffer."""
+
+        timing = self._task.timing
+
+        if timing.is_finite and last_sample > timing.samp_quant_samp_per_chan:
+            raise DaqError(
+                "Some or all of the samples requested will never be available, as the task acquires only "
+                f"{timing.samp_quant_samp_per_chan} samples per channel.",
+                DAQmxErrors.SAMPLES_WILL_NEVER_BE_AVAILABLE,
+            )
+
+        clock = self._task.clock
+        deadline = None if timeout == WAIT_INFINITELY else clock.perf_counter() + timeout
+        ready_time = self.start_time + last_sample / timing.samp_clk_rate
+
+        while True:
+            self._acquire()
+
+            if self._overrun:
+                raise DaqError(_samples_no_longer_available_message, DAQmxErrors.SAMPLES_NO_LONGER_AVAILABLE)
+
+            if self._acquired >= last_sample:
+                return
+
+            now = clock.perf_counter()
+            if deadline is not None and now >= deadline:
+                raise DaqError(
+                    "Some or all of the samples requested have not yet been acquired.\n\n"
+                    "To wait for the samples to become available use a longer read timeout or read later "
+                    "in your program.",
+                    DAQmxErrors.SAMPLES_NOT_YET_AVAILABLE,
+                )
+
+            instrumentation = self._task.instrumentation
+            if instrumentation is None:
+                clock.sleep(max(0.0, min(ready_time, deadline or ready_time) - now))
+            else:
+                start = time.perf_counter()
+                clock.sleep(max(0.0, min(ready_time, deadline or ready_time) - now))
+                instrumentation.wait += time.perf_counter() - start
+
+    def _copy(self, first_sample: int, data: np.ndarray) -> None:
+        """Copy samples out of the buffer, starting at 'first_sample'."""
+
+        size = self._buffer.shape[1]
+        start = first_sample % size
+        end = start + data.shape[1]
+
+        if end <= size:
+            data[:] = self._buffer[:, start:end]
+        else:
+            data[:, : size - start] = self._buffer[:, start:]
+            data[:, size - start :] = self._buffer[:, : end - size]
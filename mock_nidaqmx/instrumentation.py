@@ -0,0 +1,168 @@
+import gc
+import json
+import math
+import time
+from contextlib import contextmanager
+from typing import Iterator, Self
+
+from .histogram import LogHistogram
+
+
+def _finite(value):
+    """Replace NaN and infinite values by None, recursively, so they are valid JSON."""
+
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    elif isinstance(value, list):
+        return [_finite(item) for item in value]
+    elif isinstance(value, float) and not math.isfinite(value):
+        return None
+
+    return value
+
+
+class Instrumentation:
+    """
+    Opt-in metrics of an acquisition. Tasks with an instrumentation count
+    their reads and the samples delivered, and record the latency of each
+    read and the time spent waiting for the Sample Clock within them. The
+    loop around the reads can time its own phases, like the analysis, and
+    the pauses of the garbage collector are recorded while it is running.
+
+    Tasks without an instrumentation only check that it is None once per
+    read, so it costs nothing when disabled.
+
+        >>> with Instrumentation() as metrics:
+        >>>     device = DAQ(instrumentation=metrics)
+        >>>     ...
+        >>>     with metrics.phase("analysis"):
+        >>>         ...
+        >>> metrics.to_json("metrics.json")
+    """
+
+    def __init__(self) -> None:
+        self.reads = 0
+        self.samples = 0
+        self.read_latency = LogHistogram()
+        self.wait = 0.0  # Time spent waiting for samples within the reads, in seconds.
+        self.phases: dict[str, list[float]] = {}  # The number of times and duration of each phase.
+
+        self.gc_collections = [0, 0, 0]  # Per generation.
+        self.gc_collected = 0
+        self.gc_pauses = LogHistogram()
+
+        self.start_time: float | None = None
+        self.end_time: float | None = None
+        self._gc_start: float | None = None
+
+    def start(self) -> None:
+        """Start the clock of the metrics and record the pauses of the garbage collector."""
+
+        self.start_time = time.perf_counter()
+        self.end_time = None
+
+        if self._on_gc not in gc.callbacks:
+            gc.callbacks.append(self._on_gc)
+
+    def stop(self) -> None:
+        """Stop the clock of the metrics and stop recording the garbage collector."""
+
+        self.end_time = time.perf_counter()
+
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+    def _on_gc(self, phase: str, info: dict) -> None:
+        """Record a collection of the garbage collector, called by 'gc.callbacks'."""
+
+        if phase == "start":
+            self._gc_start = time.perf_counter()
+        elif self._gc_start is not None:
+            self.gc_pauses.record(time.perf_counter() - self._gc_start)
+            self.gc_collections[info["generation"]] += 1
+            self.gc_collected += info["collected"]
+            self._gc_start = None
+
+    def record_read(self, latency: float, samples: int) -> None:
+        """Count a read of 'samples' samples per channel that took 'latency' seconds."""
+
+        self.reads += 1
+        self.samples += samples
+        self.read_latency.record(latency)
+
+    def add(self, name: str, duration: float) -> None:
+        """Count a run of a phase that took 'duration' seconds."""
+
+        phase = self.phases.setdefault(name, [0, 0.0])
+        phase[0] += 1
+        phase[1] += duration
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the code within the context as a run of a phase."""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        """
+        Summarize the metrics.
+
+        Returns:
+            dict:
+
+            The metrics, as JSON serializable values. Durations are in
+            seconds, undefined values are None.
+        """
+
+        end = self.end_time or time.perf_counter()
+        duration = end - self.start_time if self.start_time is not None else None
+
+        snapshot = {
+            "duration": duration,
+            "reads": self.reads,
+            "samples": self.samples,
+            "read_latency": self.read_latency.snapshot(),
+            "read_time": self.read_latency.total,
+            "wait_time": self.wait,
+            "phases": {name: {"count": count, "time": total} for name, (count, total) in self.phases.items()},
+            "gc": {
+                "collections": list(self.gc_collections),
+                "collected": self.gc_collected,
+                "pause_time": self.gc_pauses.total,
+                "pauses": self.gc_pauses.snapshot(),
+            },
+        }
+
+        return _finite(snapshot)
+
+    def to_json(self, path: str | None = None) -> str:
+        """
+        Export a snapshot of the metrics as JSON.
+
+        Args:
+            path (str | None): Also write it to this file, if given.
+
+        Returns:
+            str:
+
+            The JSON snapshot.
+        """
+
+        text = json.dumps(self.snapshot(), indent=2)
+
+        if path is not None:
+            with open(path, "w") as file:
+                file.write(text)
+
+        return text
@@ -0,0 +1,158 @@
+from .clock import Clock, VirtualClock
+from .histogram import LogHistogram
+
+# How long before a deadline the pacer stops sleeping and spins, in seconds.
+# Sleeps of the OS can overshoot by about a scheduler tick.
+SPIN_TIME = 0.002
+
+# How late past its deadline an iteration can start and still meet it, as a
+# fraction of the period. Wake-ups a few microseconds late are not misses.
+TOLERANCE = 0.5
+
+
+class Pacer:
+    """
+    Paces a software-timed loop at a fixed rate. The deadline of tick 'n' is
+    'start_time + n / rate', an absolute time, so the time the loop takes
+    doesn't make the rate drift. Each wait sleeps until shortly before the
+    deadline and spins on the clock for the rest, as sleeps alone are much
+    coarser than the period of fast loops.
+
+    A deadline is missed when the loop calls 'wait' more than 'tolerance'
+    periods after it, a loop slightly late runs right away. The following
+    deadlines that passed as well are skipped instead of being rushed, so a
+    stall doesn't cause a burst of iterations, and counts as a single miss.
+    How late each iteration started is recorded either way, to report the
+    precision of the rate.
+
+        >>> pacer = Pacer(10_000)
+        >>> while ...:
+        >>>     pacer.wait()
+        >>>     task.read()
+        >>> print(pacer.report())
+    """
+
+    def __init__(
+        self, rate: float, clock: Clock | None = None, spin_time: float = SPIN_TIME, tolerance: float = TOLERANCE
+    ) -> None:
+        """
+        Args:
+            rate (float): The number of iterations per second.
+            clock (Clock, optional): The clock to pace, the real time clock
+                by default. Waits on a 'VirtualClock' sleep until the deadline.
+            spin_time (float): How long before each deadline to stop
+                sleeping and spin, in seconds.
+            tolerance (float): How late past its deadline an iteration can
+                start and still meet it, as a fraction of the period.
+        """
+
+        self.rate = rate
+        self.clock = clock or Clock()
+        self.spin_time = spin_time
+        self.tolerance = tolerance
+
+        self.start_time: float | None = None
+        self.ticks = 0  # The deadlines elapsed, met, missed or skipped.
+        self.missed = 0
+        self.skipped = 0  # The deadlines passed over after the missed ones.
+        self.lateness = LogHistogram()  # How late each wait returned, in seconds.
+
+    @property
+    def period(self) -> float:
+        """The time between two deadlines, in seconds."""
+
+        return 1 / self.rate
+
+    def start(self, start_time: float | None = None) -> None:
+        """Start the schedule, at 'start_time' or now. Waiting starts it implicitly."""
+
+        self.start_time = self.clock.perf_counter() if start_time is None else start_time
+        self.ticks = 0
+        self.missed = 0
+        self.skipped = 0
+        self.lateness = LogHistogram()
+
+    def wait(self) -> bool:
+        """
+        Wait for the next deadline.
+
+        Returns:
+            bool:
+
+            Whether the deadline was met, False if it had already passed by
+            more than the tolerance.
+        """
+
+        if self.start_time is None:
+            self.start()
+
+        clock = self.clock
+        self.ticks += 1
+        deadline = self.start_time + self.ticks / self.rate
+        now = clock.perf_counter()
+
+        if now > deadline:
+            late = now - deadline
+            self.lateness.record(late)
+
+            # Slightly late iterations run right away.
+            if late <= self.tolerance / self.rate:
+                return True
+
+            # Skip the other deadlines that passed, the next iteration waits
+            # for the first one in the future.
+            skipped = int(late * self.rate)
+            self.ticks += skipped
+            self.skipped += skipped
+            self.missed += 1
+
+            return False
+
+        # Sleep most of the time, then spin until the deadline. The virtual
+        # clock only moves when it sleeps.
+        if isinstance(clock, VirtualClock):
+            clock.sleep(deadline - now)
+        else:
+            if deadline - now > self.spin_time:
+                clock.sleep(deadline - now - self.spin_time)
+
+            while clock.perf_counter() < deadline:
+                pass
+
+        self.lateness.record(clock.perf_counter() - deadline)
+
+        return True
+
+    @property
+    def achieved_rate(self) -> float:
+        """The number of iterations per second since the start."""
+
+        elapsed = self.clock.perf_counter() - self.start_time if self.start_time is not None else 0.0
+
+        # Each wait records its lateness once.
+        return self.lateness.count / elapsed if elapsed else 0.0
+
+    @property
+    def missed_percent(self) -> float:
+        """The percentage of the waits that missed their deadline."""
+
+        # Each wait records its lateness once.
+        return self.missed / self.lateness.count * 100 if self.lateness.count else 0.0
+
+    def report(self) -> str:
+        """
+        Describe the rate and its precision.
+
+        Returns:
+            str:
+
+            The target rate with the p99 lateness of the iterations, like
+            '10,000 S/s ±2.1µs (p99)', and the deadlines missed and skipped.
+        """
+
+        stats = self.lateness.snapshot()
+
+        return (
+            f"{self.rate:,.0f} S/s ±{stats['p99'] * 1e6:,.1f}µs (p99), max {stats['max'] * 1e6:,.1f}µs late, "
+            f"{self.missed} missed deadlines ({self.missed_percent:.2f}%), {self.skipped} skipped"
+        )
@@ -0,0 +1,195 @@
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import Iterator, Self
+
+import numpy as np
+from nidaqmx.error_codes import DAQmxErrors
+from nidaqmx.errors import DaqError
+
+# The file starts with the magic bytes and the length of a JSON header, then
+# holds a record per read: the time of the read and its number of samples per
+# channel, followed by the samples shaped as (channels, samples).
+MAGIC = b"MOCKDAQ\x01"
+_HEADER = struct.Struct("<I")
+_READ = struct.Struct("<dI")
+
+
+class Recorder:
+    """
+    Records every read of a Task into a compact binary file, with the time it
+    returned, so the exact samples can be served again by a
+    'mock_nidaqmx.replay.ReplayDevice'.
+    The samples are written as raw bytes through a buffered file, so
+    recording costs about a copy of each read.
+    """
+
+    def __init__(self, path: str | Path, task) -> None:
+        """
+        Args:
+            path (str | Path): The file to write, it is replaced if it exists.
+            task (DAQ.Task): The task being recorded.
+        """
+
+        self.path = Path(path)
+        self._task = task
+        self._file = None
+        self.dtype: np.dtype | None = None
+        self.reads = 0
+        self.samples = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _open(self, dtype: np.dtype) -> None:
+        """Write the header, once the channels and the Sample Clock of the task are known."""
+
+        task = self._task
+        self.dtype = np.dtype(dtype)
+        header = {
+            "device": task.device.name if task.device else None,
+            "channels": list(task.channels.names),
+            "dtype": self.dtype.str,
+            "rate": task.timing.samp_clk_rate if task.timing.is_hardware_timed else None,
+            "start_time": task.in_stream.start_time,
+        }
+
+        self._file = open(self.path, "wb", buffering=2**20)
+        encoded = json.dumps(header).encode()
+        self._file.write(MAGIC + _HEADER.pack(len(encoded)) + encoded)
+
+    def write(self, data: np.ndarray) -> None:
+        """
+        Append a read, shaped as (channels, samples). Every read must have
+        the dtype of the first one, a recording holds either the raw or the
+        scaled samples of the task.
+        """
+
+        if self._file is None:
+            self._open(data.dtype)
+
+        if data.dtype != self.dtype:
+            raise DaqError(
+                "The samples read are not the ones being recorded, raw and scaled reads can't be mixed.\n\n"
+                f"Type Read: {data.dtype}\nRecorded Type: {self.dtype}",
+                DAQmxErrors.UNKNOWN,
+            )
+
+        self._file.write(_READ.pack(self._task.clock.perf_counter(), data.shape[1]))
+        self._file.write(np.ascontiguousarray(data).data)
+
+        self.reads += 1
+        self.samples += data.shape[1]
+
+    def close(self) -> None:
+        """Flush the file, a recording without reads only holds the header."""
+
+        if self._file is None:
+            self._open(self._task.in_stream.dtype)
+
+        self._file.close()
+
+
+class Recording:
+    """
+    Reads a file written by a 'Recorder'. The file is memory mapped, the
+    samples of each read are served as read-only views of it. Close the
+    recording once done with it, or use it as a context manager. A last read
+    cut short, by a recording that was interrupted, is left out.
+
+        >>> with Recording("capture.daqrec") as recording:
+        >>>     for time, samples in recording:
+        >>>         ...
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+
+        with open(self.path, "rb") as file:
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._buffer[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a recording of the mock DAQ")
+
+        (length,) = _HEADER.unpack_from(self._buffer, len(MAGIC))
+        offset = len(MAGIC) + _HEADER.size
+        header = json.loads(self._buffer[offset : offset + length])
+        offset += length
+
+        self.device: str | None = header["device"]
+        self.channels: list[str] = header["channels"]
+        self.dtype = np.dtype(header["dtype"])
+        self.rate: float | None = header["rate"]
+        self.start_time: float | None = header["start_time"]
+
+        # Index the reads: their time, number of samples and data offset.
+        times, counts, offsets = [], [], []
+        row_size = len(self.channels) * self.dtype.itemsize
+        while offset + _READ.size <= len(self._buffer):
+            time, count = _READ.unpack_from(self._buffer, offset)
+            if offset + _READ.size + count * row_size > len(self._buffer):
+                break
+
+            offset += _READ.size
+            times.append(time)
+            counts.append(count)
+            offsets.append(offset)
+            offset += count * row_size
+
+        self.times = np.array(times, dtype=np.float64)
+        self.counts = np.array(counts, dtype=np.int64)
+        self._offsets = offsets
+
+        # The index of the first sample of each read.
+        self.first_samples = np.concatenate(([0], np.cumsum(self.counts)))[:-1]
+        self.length = int(self.counts.sum())
+
+    def close(self) -> None:
+        """
+        Unmap the file. The arrays returned by 'read' and 'samples' can be
+        views of it, they must be released first or a BufferError is raised.
+        """
+
+        self._buffer.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args, **kwargs) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def read(self, index: int) -> np.ndarray:
+        """The samples of a read, shaped as (channels, samples)."""
+
+        count = int(self.counts[index])
+
+        return np.frombuffer(
+            self._buffer, self.dtype, len(self.channels) * count, self._offsets[index]
+        ).reshape(len(self.channels), count)
+
+    def __iter__(self) -> Iterator[tuple[float, np.ndarray]]:
+        """Iterate over the time and samples of each read."""
+
+        for index in range(len(self)):
+            yield float(self.times[index]), self.read(index)
+
+    def samples(self, first: int, last: int) -> np.ndarray:
+        """The samples from index 'first' up to 'last', excluded, across reads."""
+
+        first, last = max(first, 0), min(last, self.length)
+        if first >= last:
+            return np.empty((len(self.channels), 0), dtype=self.dtype)
+
+        start = int(np.searchsorted(self.first_samples, first, side="right")) - 1
+        stop = int(np.searchsorted(self.first_samples, last, side="left"))
+
+        parts = []
+        for index in range(start, stop):
+            offset = int(self.first_samples[index])
+            parts.append(self.read(index)[:, max(first - offset, 0) : last - offset])
+
+        return parts[0] if len(parts) == 1 else np.concatenate(parts, axis=1)
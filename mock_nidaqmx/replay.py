@@ -0,0 +1,169 @@
+from functools import partial
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+from nidaqmx.constants import READ_ALL_AVAILABLE
+from nidaqmx.error_codes import DAQmxErrors
+from nidaqmx.errors import DaqError
+
+from .clock import Clock
+from .daq import DAQ
+from .in_stream import InStream
+from .recording import Recording
+
+
+class ReplayInStream(InStream):
+    """
+    Serves the samples of a recording instead of generating them. Reads
+    return the recorded samples in order, no matter how many samples the
+    original reads had, and the samples are timestamped by the recorded
+    Sample Clock. At the original pace, a read waits until the time the
+    recorded read that held its last sample returned.
+    """
+
+    def __init__(self, task, recording: Recording, pace: bool) -> None:
+        super().__init__(task)
+        self._recording = recording
+        self._pace = pace
+        self._replay_start: float | None = None
+
+    def _start(self) -> None:
+        """Start serving the recording, from its first sample."""
+
+        recording = self._recording
+        if list(self._task.channels.names) != recording.channels:
+            raise DaqError(
+                "The channels of the task don't match the recording.\n\n"
+                f"Task Channels: {self._task.channels.names}\nRecorded Channels: {recording.channels}",
+                DAQmxErrors.UNKNOWN,
+            )
+
+        if recording.rate is not None and self._task.timing.samp_clk_rate != recording.rate:
+            raise DaqError(
+                "The Sample Clock of the task doesn't match the recording.\n\n"
+                f"Task Rate: {self._task.timing.samp_clk_rate}\nRecorded Rate: {recording.rate}",
+                DAQmxErrors.UNKNOWN,
+            )
+
+        with self._lock:
+            self.start_time = recording.start_time
+            self._acquired = recording.length
+            self._read_pos = 0
+            self._overrun = False
+            self._replay_start = self._task.clock.perf_counter()
+
+    def _stop(self) -> None:
+        """Stop serving the recording."""
+
+        self._replay_start = None
+
+    def _acquire(self) -> None:
+        """Every recorded sample is available."""
+
+    def _read_many(
+        self, number_of_samples_per_channel: int, data: np.ndarray | None, timeout: float, raw: bool = False
+    ) -> np.ndarray:
+        """Serve the next recorded samples, see 'InStream.read_many'."""
+
+        if self._replay_start is None:
+            self._start()
+
+        # The samples are served as they were recorded, raw or scaled.
+        recording = self._recording
+        dtype = self.raw_dtype if raw else self.dtype
+        if recording.dtype != dtype:
+            raise DaqError(
+                "The samples requested are not the ones the recording holds.\n\n"
+                f"Type Requested: {np.dtype(dtype)}\nRecorded Type: {recording.dtype}",
+                DAQmxErrors.UNKNOWN,
+            )
+
+        if number_of_samples_per_channel == READ_ALL_AVAILABLE:
+            number_of_samples_per_channel = recording.length - self._read_pos
+
+        last = self._read_pos + number_of_samples_per_channel
+        if last > recording.length:
+            raise DaqError(
+                "Some or all of the samples requested will never be available, as the recording holds only "
+                f"{recording.length} samples per channel.",
+                DAQmxErrors.SAMPLES_WILL_NEVER_BE_AVAILABLE,
+            )
+
+        # Wait until the recorded read that held the last sample returned.
+        if self._pace and number_of_samples_per_channel:
+            index = int(np.searchsorted(recording.first_samples, last - 1, side="right")) - 1
+            ready_time = self._replay_start + recording.times[index] - recording.times[0]
+            self._task.clock.sleep(max(0.0, ready_time - self._task.clock.perf_counter()))
+
+        data = self._allocate(number_of_samples_per_channel, data, raw)
+        data[:] = recording.samples(self._read_pos, last)
+        self._read_pos = last
+
+        return data
+
+
+class ReplayDevice(DAQ):
+    """
+    A device that serves the reads of a recording to its tasks through the
+    same interface, to run the analysis again against a previous capture.
+    The tasks must have the recorded channels and Sample Clock rate. Close
+    the device to close the recording, or use it as a context manager.
+
+        >>> with ReplayDevice("capture.daqrec") as device:
+        >>>     base_test(test_case, device)
+    """
+
+    def __init__(self, path: str | Path, pace: bool = False, clock: Clock | None = None) -> None:
+        """
+        Args:
+            path (str | Path): The recording written by a 'Recorder'.
+            pace (bool): Serve the reads at the pace they were recorded,
+                instead of as fast as possible.
+            clock (Clock, optional): The clock the tasks run on, the real time
+                clock by default.
+        """
+
+        self.recording = Recording(path)
+        self.pace = pace
+
+        super().__init__(self.recording.device or "Dev1", clock)
+
+        self.Task = partial(ReplayTask, self)
+
+    def close(self) -> None:
+        """Close the recording, the tasks of the device can't read anymore."""
+
+        self.recording.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args, **kwargs) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"ReplayDevice {self.recording.path}"
+
+
+class ReplayTask(DAQ.Task):
+    """
+    Task of a 'ReplayDevice', every read is served from the recording.
+    """
+
+    def __init__(self, device: ReplayDevice) -> None:
+        super().__init__(device)
+        self.in_stream = ReplayInStream(self, device.recording, device.pace)
+
+    def start(self) -> None:
+        """Start serving the recording."""
+
+        self.in_stream._start()
+
+    def _read(self, number_of_samples_per_channel: int, timeout: float) -> list[list[float | int]]:
+        """Serve the next recorded samples as lists."""
+
+        return self.in_stream._read_many(number_of_samples_per_channel, None, timeout).tolist()
+
+    def __repr__(self) -> str:
+        return f"ReplayTask({self.device.recording.path})"
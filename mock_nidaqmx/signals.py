@@ -0,0 +1,392 @@
+import numpy as np
+
+
+class Impairment:
+    """
+    Base class for the faults that can be injected into a signal. Impairments
+    can change the duration of each state of a square wave before the samples
+    are generated, or change the generated samples themselves, either states
+    of digital signals or volts of analog ones.
+    """
+
+    def perturb(self, durations: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Change the duration of the next states of the square wave, in seconds."""
+
+        return durations
+
+    def apply(self, times: np.ndarray, samples: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Change a block of generated samples."""
+
+        return samples
+
+    def __repr__(self) -> str:
+        arguments = ", ".join(f"{key}={value!r}" for key, value in vars(self).items() if not key.startswith("_"))
+
+        return f"{self.__class__.__name__}({arguments})"
+
+
+class EdgeJitter(Impairment):
+    """
+    Delays or advances each transition by a random amount, uniformly
+    distributed within ±'max_jitter' seconds of the expected duration.
+    """
+
+    def __init__(self, max_jitter: float) -> None:
+        self.max_jitter = max_jitter
+
+    def perturb(self, durations: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        return durations + rng.uniform(-self.max_jitter, self.max_jitter, len(durations))
+
+
+class RandomToggles(Impairment):
+    """
+    Toggles the state of the signal at random samples, the signal stays
+    inverted until the next toggle.
+    """
+
+    def __init__(self, probability: float) -> None:
+        """
+        Args:
+            probability (float): The probability of each sample to toggle the
+                state of the signal.
+        """
+
+        self.probability = probability
+        self._inverted = 0
+
+    def apply(self, times: np.ndarray, samples: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        toggles = rng.random(len(samples)) < self.probability
+
+        # The signal is inverted after an odd number of toggles.
+        inverted = (np.cumsum(toggles) + self._inverted) & 1
+        if len(inverted):
+            self._inverted = inverted[-1]
+
+        return samples ^ inverted.astype(samples.dtype)
+
+
+class Glitches(Impairment):
+    """
+    Toggles the state of the signal for single random samples.
+    """
+
+    def __init__(self, probability: float) -> None:
+        """
+        Args:
+            probability (float): The probability of each sample to be toggled.
+        """
+
+        self.probability = probability
+
+    def apply(self, times: np.ndarray, samples: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        return samples ^ (rng.random(len(samples)) < self.probability).astype(samples.dtype)
+
+
+class StuckAt(Impairment):
+    """
+    Holds the signal at a fixed state during a time window.
+    """
+
+    def __init__(self, value: int, start: float, duration: float = np.inf) -> None:
+        """
+        Args:
+            value (int): The state the signal is stuck at.
+            start (float): When the fault starts, in seconds since the signal
+                started.
+            duration (float): How long the fault lasts, in seconds. Forever by
+                default.
+        """
+
+        self.value = value
+        self.start = start
+        self.duration = duration
+        self._origin: float | None = None
+
+    def apply(self, times: np.ndarray, samples: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        if self._origin is None and len(times):
+            self._origin = times[0]
+
+        elapsed = times - self._origin
+        stuck = (elapsed >= self.start) & (elapsed < self.start + self.duration)
+
+        return np.where(stuck, np.asarray(self.value, dtype=samples.dtype), samples)
+
+
+class GaussianNoise(Impairment):
+    """
+    Adds white Gaussian noise to an analog signal.
+    """
+
+    def __init__(self, std: float) -> None:
+        """
+        Args:
+            std (float): The standard deviation of the noise, in volts.
+        """
+
+        self.std = std
+
+    def apply(self, times: np.ndarray, samples: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        return samples + rng.normal(0.0, self.std, len(samples))
+
+
+class Drift(Impairment):
+    """
+    Offsets an analog signal by an amount that grows linearly since the
+    signal started, like a sensor warming up.
+    """
+
+    def __init__(self, rate: float) -> None:
+        """
+        Args:
+            rate (float): How fast the offset grows, in volts per second.
+        """
+
+        self.rate = rate
+        self._origin: float | None = None
+
+    def apply(self, times: np.ndarray, samples: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        if self._origin is None and len(times):
+            self._origin = times[0]
+
+        return samples + self.rate * (times - self._origin)
+
+
+class Signal:
+    """
+    Base class for the signals wired to the terminals of a DAQ device. Signals
+    generate whole blocks of samples with NumPy, and are called with increasing
+    sample times, as a stream.
+    """
+
+    # NumPy dtype of the generated samples.
+    dtype = None
+
+    def generate(self, times: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """
+        Generate the samples of the signal at the given times.
+
+        Args:
+            times (np.ndarray): When each sample is taken, in seconds.
+            rng (np.random.Generator): The generator for random impairments.
+
+        Returns:
+            np.ndarray:
+
+            The samples, with the same shape as 'times'.
+        """
+
+        raise NotImplementedError()
+
+    def __repr__(self) -> str:
+        arguments = ", ".join(f"{key}={value!r}" for key, value in vars(self).items() if not key.startswith("_"))
+
+        return f"{self.__class__.__name__}({arguments})"
+
+
+class SquareWave(Signal):
+    """
+    Digital square wave with the given period and duty cycle. The time of each
+    transition is scheduled ahead of the samples, so impairments that change
+    the duration of the states are consistent between blocks of samples.
+    """
+
+    dtype = np.uint8
+
+    def __init__(
+        self,
+        period: float,
+        duty_cycle: float = 0.5,
+        initial_state: int = 0,
+        impairments: tuple[Impairment, ...] = (),
+    ) -> None:
+        """
+        Args:
+            period (float): The period of the wave, in seconds.
+            duty_cycle (float): The fraction of the period the wave is HIGH.
+            initial_state (int): The state of the wave when it starts, which
+                is at the time of the first sample generated.
+            impairments (tuple[Impairment, ...]): Faults injected into the
+                wave, in order.
+        """
+
+        self.period = period
+        self.duty_cycle = duty_cycle
+        self.initial_state = initial_state
+        self.impairments = tuple(impairments)
+
+        # Scheduled transitions, the ones in the past are dropped but counted,
+        # as the state after a transition depends on how many happened.
+        self._transitions = np.empty(0)
+        self._dropped = 0
+        self._last_transition: float | None = None
+
+    def _durations(self, count: int) -> np.ndarray:
+        """The nominal duration of the next 'count' states, in seconds."""
+
+        # The state before the next transition depends on how many happened.
+        state = self.initial_state ^ ((self._dropped + len(self._transitions)) & 1)
+        high, low = self.period * self.duty_cycle, self.period * (1 - self.duty_cycle)
+
+        durations = np.full(count, low)
+        durations[(1 - state) :: 2] = high
+
+        return durations
+
+    def _schedule(self, until: float, rng: np.random.Generator) -> None:
+        """Schedule transitions until one happens after 'until'."""
+
+        while self._last_transition <= until:
+            count = int((until - self._last_transition) / self.period * 2) + 2
+
+            durations = self._durations(count)
+            for impairment in self.impairments:
+                durations = impairment.perturb(durations, rng)
+
+            transitions = self._last_transition + np.cumsum(durations)
+            self._transitions = np.concatenate((self._transitions, transitions))
+            self._last_transition = transitions[-1]
+
+    def generate(self, times: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        if not len(times):
+            return np.empty(0, dtype=self.dtype)
+
+        # The wave starts with the first sample generated.
+        if self._last_transition is None:
+            self._last_transition = times[0]
+
+        self._schedule(times[-1], rng)
+
+        # Drop the transitions before this block, they are not needed anymore.
+        past = np.searchsorted(self._transitions, times[0], side="right")
+        self._transitions = self._transitions[past:]
+        self._dropped += past
+
+        count = self._dropped + np.searchsorted(self._transitions, times, side="right")
+        samples = (self.initial_state ^ (count & 1)).astype(self.dtype)
+
+        for impairment in self.impairments:
+            samples = impairment.apply(times, samples, rng)
+
+        return samples
+
+
+class AnalogSignal(Signal):
+    """
+    Base class for the analog signals, generated as float64 volts. The analog
+    input channels quantize them like their ADC does. The waveform starts at
+    the time of the first sample generated, and is computed from the time
+    since then, so it's consistent between blocks of samples.
+    """
+
+    dtype = np.float64
+
+    def __init__(self, impairments: tuple[Impairment, ...] = ()) -> None:
+        self.impairments = tuple(impairments)
+        self._origin: float | None = None
+
+    def waveform(self, elapsed: np.ndarray) -> np.ndarray:
+        """The volts of the signal, 'elapsed' seconds after it started."""
+
+        raise NotImplementedError()
+
+    def generate(self, times: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        if not len(times):
+            return np.empty(0, dtype=self.dtype)
+
+        if self._origin is None:
+            self._origin = times[0]
+
+        samples = self.waveform(times - self._origin)
+
+        for impairment in self.impairments:
+            samples = impairment.apply(times, samples, rng)
+
+        return samples
+
+
+class SineWave(AnalogSignal):
+    """
+    Analog sine wave with the given frequency, amplitude and offset.
+    """
+
+    def __init__(
+        self,
+        frequency: float,
+        amplitude: float = 1.0,
+        offset: float = 0.0,
+        phase: float = 0.0,
+        impairments: tuple[Impairment, ...] = (),
+    ) -> None:
+        """
+        Args:
+            frequency (float): The frequency of the wave, in hertz.
+            amplitude (float): The peak amplitude of the wave, in volts.
+            offset (float): The mean of the wave, in volts.
+            phase (float): The phase of the wave when it starts, in radians.
+            impairments (tuple[Impairment, ...]): Faults injected into the
+                wave, in order.
+        """
+
+        super().__init__(impairments)
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.offset = offset
+        self.phase = phase
+
+    def waveform(self, elapsed: np.ndarray) -> np.ndarray:
+        return self.offset + self.amplitude * np.sin(2 * np.pi * self.frequency * elapsed + self.phase)
+
+
+class AnalogSquareWave(AnalogSignal):
+    """
+    Analog square wave with the given period and duty cycle, that swings
+    between two levels with linear edges. Like 'SquareWave', it starts LOW
+    and rises after the LOW part of the period. Each edge starts at its
+    nominal time and takes 'rise_time' to reach the other level, so the
+    edges cross the middle level half the rise time late, and the duty
+    cycle is kept.
+    """
+
+    def __init__(
+        self,
+        period: float,
+        low: float = 0.0,
+        high: float = 5.0,
+        duty_cycle: float = 0.5,
+        rise_time: float = 0.0,
+        impairments: tuple[Impairment, ...] = (),
+    ) -> None:
+        """
+        Args:
+            period (float): The period of the wave, in seconds.
+            low (float): The LOW level, in volts.
+            high (float): The HIGH level, in volts.
+            duty_cycle (float): The fraction of the period the wave is HIGH.
+            rise_time (float): How long each edge takes to go from one level
+                to the other, in seconds. The edges are instant by default.
+            impairments (tuple[Impairment, ...]): Faults injected into the
+                wave, in order.
+        """
+
+        super().__init__(impairments)
+        self.period = period
+        self.low = low
+        self.high = high
+        self.duty_cycle = duty_cycle
+        self.rise_time = rise_time
+
+    def waveform(self, elapsed: np.ndarray) -> np.ndarray:
+        position = np.mod(elapsed, self.period)
+        rising = self.period * (1 - self.duty_cycle)
+
+        if self.rise_time > 0:
+            # The falling edge starts with each period, except the first one.
+            level = np.where(
+                position >= rising,
+                np.clip((position - rising) / self.rise_time, 0.0, 1.0),
+                np.where(elapsed >= self.period, np.clip(1 - position / self.rise_time, 0.0, 1.0), 0.0),
+            )
+        else:
+            level = (position >= rising).astype(np.float64)
+
+        return self.low + (self.high - self.low) * level
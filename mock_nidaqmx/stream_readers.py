@@ -0,0 +1,98 @@
+import numpy as np
+from nidaqmx.error_codes import DAQmxErrors
+from nidaqmx.errors import DaqError
+
+
+class ChannelReaderBase:
+    """
+    Base class for the stream readers, mimics the original 'nidaqmx' module.
+    """
+
+    # NumPy dtype that the arrays passed to the read methods must have.
+    dtype = None
+
+    # Whether the reader reads the raw samples, without scaling them.
+    raw = False
+
+    def __init__(self, task_in_stream) -> None:
+        self._in_stream = task_in_stream
+        self._task = task_in_stream._task
+
+    def _read_many(self, data: np.ndarray, number_of_samples_per_channel: int) -> int:
+        """Validate the array dtype and fill it with samples from the task."""
+
+        if data.dtype != self.dtype:
+            raise DaqError(
+                "Read cannot be performed because the NumPy array passed into this function is not of the "
+                f"correct type.\n\nType of NumPy Array provided: {data.dtype}\n"
+                f"Type of NumPy Array required: {np.dtype(self.dtype)}",
+                DAQmxErrors.UNKNOWN,
+            )
+
+        self._in_stream.read_many(number_of_samples_per_channel, data, raw=self.raw)
+
+        return number_of_samples_per_channel
+
+
+class AnalogMultiChannelReader(ChannelReaderBase):
+    """
+    Reads samples from one or more analog input channels as float64 volts.
+    """
+
+    dtype = np.float64
+
+    def read_many_sample(self, data: np.ndarray, number_of_samples_per_channel: int) -> int:
+        """
+        Fill a preallocated array shaped as (channels, samples) with samples.
+
+        Returns:
+            int:
+
+            The number of samples read for each channel.
+        """
+
+        return self._read_many(data, number_of_samples_per_channel)
+
+
+class DigitalMultiChannelReader(ChannelReaderBase):
+    """
+    Reads samples from one or more digital input channels as uint8 values.
+    """
+
+    dtype = np.uint8
+
+    def read_many_sample_port_byte(self, data: np.ndarray, number_of_samples_per_channel: int) -> int:
+        """
+        Fill a preallocated array shaped as (channels, samples) with samples.
+
+        Returns:
+            int:
+
+            The number of samples read for each channel.
+        """
+
+        return self._read_many(data, number_of_samples_per_channel)
+
+
+class AnalogUnscaledReader(ChannelReaderBase):
+    """
+    Reads samples from one or more analog input channels as the int16 codes
+    of the ADC, without scaling them to volts. They take a quarter of the
+    memory of float64 volts, the 'ai_dev_scaling_coeff' of each channel
+    scales them when needed.
+    """
+
+    dtype = np.int16
+    raw = True
+
+    def read_int16(self, data: np.ndarray, number_of_samples_per_channel: int) -> int:
+        """
+        Fill a preallocated array shaped as (channels, samples) with raw samples.
+
+        Returns:
+            int:
+
+            The number of samples read for each channel.
+        """
+
+        return self._read_many(data, number_of_samples_per_channel)
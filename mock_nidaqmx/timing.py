@@ -0,0 +1,53 @@
+from nidaqmx.constants import AcquisitionType, Edge
+
+
+class Timing:
+    """
+    Holds the Sample Clock configuration of a Task, mimics the 'timing'
+    property of the original 'nidaqmx' module.
+    """
+
+    def __init__(self, task) -> None:
+        self._task = task
+        self.samp_clk_rate: float | None = None
+        self.samp_quant_samp_mode: AcquisitionType | None = None
+        self.samp_quant_samp_per_chan: int | None = None
+
+    @property
+    def is_hardware_timed(self) -> bool:
+        """Whether the Sample Clock was configured, otherwise reads are software-timed."""
+
+        return self.samp_clk_rate is not None
+
+    @property
+    def is_finite(self) -> bool:
+        """Whether the Task acquires a finite number of samples."""
+
+        return self.samp_quant_samp_mode == AcquisitionType.FINITE
+
+    def cfg_samp_clk_timing(
+        self,
+        rate: float,
+        source: str = "",
+        active_edge: Edge = Edge.RISING,
+        sample_mode: AcquisitionType = AcquisitionType.FINITE,
+        samps_per_chan: int = 1000,
+    ) -> None:
+        """
+        Configure the simulated on-board Sample Clock. The 'source' and
+        'active_edge' arguments are accepted for compatibility only.
+
+        Args:
+            rate (float): The sampling rate in samples per channel per second.
+            sample_mode (AcquisitionType): Acquire a finite number of samples
+                or acquire continuously until the Task is stopped.
+            samps_per_chan (int): The number of samples to acquire in finite
+                mode, or used to size the buffer in continuous mode.
+        """
+
+        if rate <= 0:
+            raise ValueError("The sampling rate must be greater than zero.")
+
+        self.samp_clk_rate = float(rate)
+        self.samp_quant_samp_mode = sample_mode
+        self.samp_quant_samp_per_chan = samps_per_chan
@@ -1,9 +1,13 @@
 import re
-from typing import Optional
+from bisect import bisect_right
+from collections.abc import Iterator, Sequence
+from functools import lru_cache
+from itertools import accumulate, chain
 
 from nidaqmx.errors import DaqError
 
-# Copied from the original 'nidaqmx' module
+# Based on the original 'nidaqmx' module, with precompiled patterns, cached
+# parsing and lazy ranges.
 
 _invalid_range_syntax_message = (
     "Syntax for a range of objects in the input string is invalid.\n\n"
@@ -14,6 +18,171 @@ _invalid_range_syntax_message = (
     "objects."
 )
 
+# A name that ends with a number, as the base name and the number.
+_trailing_number = re.compile("(.*[^0-9])?([0-9]+)$")
+
+# Each side of a range, as the name before the number and the number.
+_range_side = re.compile("(.*?)([0-9]+)$")
+
+
+class ChannelRange(Sequence):
+    """
+    Lazy range of channel names, like 'Dev1/ai0:7'. The names are formatted
+    when they are accessed, so ranges of any size take constant memory.
+    """
+
+    __slots__ = ("prefix", "first", "last", "width")
+
+    def __init__(self, prefix: str, first: int, last: int, width: int = 0) -> None:
+        """
+        Args:
+            prefix (str): The name before the number of each channel.
+            first (int): The number of the first channel.
+            last (int): The number of the last channel, included. The range
+                is reversed if it is lower than 'first'.
+            width (int): The minimum number of digits, zero padded.
+        """
+
+        self.prefix = prefix
+        self.first = first
+        self.last = last
+        self.width = width
+
+    def __len__(self) -> int:
+        return abs(self.last - self.first) + 1
+
+    def _name(self, number: int) -> str:
+        return f"{self.prefix}{number:0{self.width}d}" if self.width else f"{self.prefix}{number}"
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("channel range index out of range")
+
+        return self._name(self.first + index if self.last >= self.first else self.first - index)
+
+    def __iter__(self) -> Iterator[str]:
+        step = 1 if self.last >= self.first else -1
+
+        return map(self._name, range(self.first, self.last + step, step))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ChannelRange):
+            return hash(self) == hash(other) and (self.prefix, self.first, self.last, self.width) == (
+                other.prefix,
+                other.first,
+                other.last,
+                other.width,
+            )
+
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((self.prefix, self.first, self.last, self.width))
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.prefix!r}, {self.first}, {self.last}, width={self.width})"
+
+
+class ChannelList(Sequence):
+    """
+    Lazy list of the channel names of a channel string, made of single names
+    and of 'ChannelRange' parts. It can be measured, indexed and iterated
+    without expanding the ranges.
+    """
+
+    __slots__ = ("parts", "_offsets")
+
+    def __init__(self, parts: tuple[str | ChannelRange, ...]) -> None:
+        self.parts = parts
+
+        # The index of the first channel of each part.
+        self._offsets = (0, *accumulate(1 if isinstance(part, str) else len(part) for part in parts))
+
+    def __len__(self) -> int:
+        return self._offsets[-1]
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("channel list index out of range")
+
+        part = bisect_right(self._offsets, index) - 1
+        if isinstance(self.parts[part], str):
+            return self.parts[part]
+
+        return self.parts[part][index - self._offsets[part]]
+
+    def __iter__(self) -> Iterator[str]:
+        return chain.from_iterable((part,) if isinstance(part, str) else part for part in self.parts)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.parts!r})"
+
+
+@lru_cache(maxsize=1024)
+def parse_channel_string(channel_names: str) -> ChannelList:
+    """
+    Parse a comma-delimited list of channel names, with the same rules as
+    'unflatten_channel_string', into a lazy list. Results are cached by the
+    input string, they are immutable.
+
+    Args:
+        channel_names (str): The list or range of physical or virtual channels.
+
+    Returns:
+        ChannelList:
+
+        The physical or virtual channel names.
+    """
+
+    parts = []
+    for channel in channel_names.strip().split(","):
+        if not channel:
+            continue
+
+        channel = channel.strip()
+        colon_index = channel.find(":")
+
+        if colon_index == -1:
+            parts.append(channel)
+            continue
+
+        m_before = _range_side.match(channel[:colon_index])
+        m_after = _range_side.match(channel[colon_index + 1 :])
+
+        if not m_before or not m_after:
+            raise DaqError(_invalid_range_syntax_message, error_code=-200498)
+
+        if m_after.group(1) and (m_before.group(1).lower() != m_after.group(1).lower()):
+            raise DaqError(_invalid_range_syntax_message, error_code=-200498)
+
+        num_before_str = m_before.group(2)
+        num_before = int(num_before_str)
+        num_after = int(m_after.group(2))
+
+        # If there are any leading 0s in the first number, we want to ensure
+        # match that width. This is established precedence in the DAQmx
+        # algorithm.
+        num_min_width = 0
+        if num_before > 0 and len(num_before_str.lstrip("0")) < len(num_before_str):
+            num_min_width = len(num_before_str)
+
+        if abs(num_after - num_before) + 1 >= 15000:
+            raise DaqError(_invalid_range_syntax_message, error_code=-200498)
+
+        parts.append(ChannelRange(m_before.group(1), num_before, num_after, num_min_width))
+
+    return ChannelList(tuple(parts))
+
 
 def flatten_channel_string(channel_names):
     """
@@ -39,56 +208,41 @@ def flatten_channel_string(channel_names):
         The resulting comma-delimited list of physical or virtual channel
         names.
     """
-    unflattened_channel_names = []
-    for channel_name in channel_names:
-        unflattened_channel_names.extend(unflatten_channel_string(channel_name))
-
-    # Go through the channel names and flatten them.
+    # Go through the channel names and flatten them. The current group of
+    # names is kept as (base_name, start_index, start_index_str, end_index,
+    # end_index_str).
     flattened_channel_list = []
-    previous = {"base_name": "", "start_index": -1, "end_index": -1}
-    for channel_name in unflattened_channel_names:
-        m = re.search("(.*[^0-9])?([0-9]+)$", channel_name)
+    previous = ("", -1, "", -1, "")
+    for channel_name in chain.from_iterable(map(_split_channel_string, channel_names)):
+        m = _trailing_number.search(channel_name)
         if not m:
             # If the channel name doesn't end in a valid number, just use the
             # channel name as-is.
             flattened_channel_list.append(_channel_info_to_flattened_name(previous))
-            previous = {
-                "base_name": channel_name,
-                "start_index": -1,
-                "start_index_str": "",
-                "end_index": -1,
-                "end_index_str": "",
-            }
+            previous = (channel_name, -1, "", -1, "")
         else:
             # If the channel name ends in a valid number, we may need to flatten
             # this channel with subsequent channels in the x:y format.
-            current_base_name = m.group(1)
-            current_index_str = m.group(2)
+            current_base_name, current_index_str = m.groups()
             current_index = int(current_index_str)
+            base_name, start_index, start_index_str, end_index, _ = previous
 
-            if current_base_name == previous["base_name"] and (
-                (current_index == previous["end_index"] + 1 and previous["end_index"] >= previous["start_index"])
-                or (current_index == previous["end_index"] - 1 and previous["end_index"] <= previous["start_index"])
+            if current_base_name == base_name and (
+                (current_index == end_index + 1 and end_index >= start_index)
+                or (current_index == end_index - 1 and end_index <= start_index)
             ):
                 # If the current channel name has the same base name as the
                 # previous and it's end index differs by 1, change the end
                 # index value. It gets flattened later.
-                previous["end_index"] = current_index
-                previous["end_index_str"] = current_index_str
+                previous = (base_name, start_index, start_index_str, current_index, current_index_str)
             else:
                 # If the current channel name has the same base name as the
                 # previous or it's end index differs by more than 1, it doesn't
                 # get flattened with the previous channel.
                 flattened_channel_list.append(_channel_info_to_flattened_name(previous))
-                previous = {
-                    "base_name": current_base_name,
-                    "start_index": current_index,
-                    "start_index_str": current_index_str,
-                    "end_index": current_index,
-                    "end_index_str": current_index_str,
-                }
-
-    # Convert the final channel dictionary to a flattened string
+                previous = (current_base_name, current_index, current_index_str, current_index, current_index_str)
+
+    # Convert the final channel group to a flattened string
     flattened_channel_list.append(_channel_info_to_flattened_name(previous))
 
     # Remove empty strings in list, convert to comma-delimited string, then trim
@@ -96,18 +250,32 @@ def flatten_channel_string(channel_names):
     return ",".join([_f for _f in flattened_channel_list if _f]).strip()
 
 
+def _split_channel_string(channel_names: str) -> Sequence[str]:
+    """
+    Parse a channel string, single names are returned as they are, without
+    filling the cache with them.
+    """
+
+    if "," in channel_names or ":" in channel_names:
+        return parse_channel_string(channel_names)
+
+    channel_names = channel_names.strip()
+
+    return (channel_names,) if channel_names else ()
+
+
 def _channel_info_to_flattened_name(channel_info):
     """
     Simple method to generate a flattened channel name.
     """
-    if channel_info["start_index"] == -1:
-        return channel_info["base_name"]
-    elif channel_info["start_index"] == channel_info["end_index"]:
-        return "{}{}".format(channel_info["base_name"], channel_info["start_index_str"])
+    base_name, start_index, start_index_str, end_index, end_index_str = channel_info
+
+    if start_index == -1:
+        return base_name
+    elif start_index == end_index:
+        return f"{base_name}{start_index_str}"
     else:
-        return "{}{}:{}".format(
-            channel_info["base_name"], channel_info["start_index_str"], channel_info["end_index_str"]
-        )
+        return f"{base_name}{start_index_str}:{end_index_str}"
 
 
 def unflatten_channel_string(channel_names):
@@ -134,61 +302,5 @@ def unflatten_channel_string(channel_names):
         The list of physical or virtual channel names. Each element of the
         list contains a single channel.
     """
-    channel_list_to_return = []
-    channel_list = [c for c in channel_names.strip().split(",") if c]
-
-    for channel in channel_list:
-        channel = channel.strip()
-        colon_index = channel.find(":")
-
-        if colon_index == -1:
-            channel_list_to_return.append(channel)
-        else:
-            before = channel[:colon_index]
-            after = channel[colon_index + 1 :]
-
-            m_before = re.match("(.*?)([0-9]+)$", before)
-            m_after = re.match("(.*?)([0-9]+)$", after)
-
-            if not m_before or not m_after:
-                raise DaqError(_invalid_range_syntax_message, error_code=-200498)
-
-            if m_after.group(1) and (m_before.group(1).lower() != m_after.group(1).lower()):
-                raise DaqError(_invalid_range_syntax_message, error_code=-200498)
-
-            num_before_str = m_before.group(2)
-            num_before = int(num_before_str)
-            num_after_str = m_after.group(2)
-            num_after = int(num_after_str)
-
-            num_min_width = 0
-            # If there are any leading 0s in the first number, we want to ensure
-            # match that width. This is established precedence in the DAQmx
-            # algorithm.
-            if num_before > 0 and len(num_before_str.lstrip("0")) < len(num_before_str):
-                num_min_width = len(num_before_str)
-
-            num_max = max([num_before, num_after])
-            num_min = min([num_before, num_after])
-            number_of_channels = (num_max - num_min) + 1
-
-            if number_of_channels >= 15000:
-                raise DaqError(_invalid_range_syntax_message, error_code=-200498)
-
-            colon_expanded_channel = []
-            for i in range(number_of_channels):
-                current_number = num_min + i
-                if num_min_width > 0:
-                    # Using fstrings to create format strings. Braces for days!
-                    zero_padded_format_specifier = f"{{:0{num_min_width}d}}"
-                    current_number_str = zero_padded_format_specifier.format(current_number)
-                else:
-                    current_number_str = str(current_number)
-                colon_expanded_channel.append(f"{m_before.group(1)}{current_number_str}")
-
-            if num_after < num_before:
-                colon_expanded_channel.reverse()
-
-            channel_list_to_return.extend(colon_expanded_channel)
-
-    return channel_list_to_return
+    # A new list, as the cached parsed names are shared.
+    return list(parse_channel_string(channel_names))
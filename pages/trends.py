@@ -0,0 +1,84 @@
+import os
+from datetime import datetime, timedelta
+
+import streamlit as st
+from plotly import graph_objects as go
+from plotly.subplots import make_subplots
+
+import db
+
+# How long the trends are cached, in seconds.
+CACHE_TTL = int(os.environ.get("CACHE_TTL", 600))
+
+
+@st.cache_data(ttl=CACHE_TTL)
+def get_names() -> list[str]:
+    """The name of every test with a summary."""
+
+    return sorted(db.Summary.objects.distinct("name"))
+
+
+@st.cache_data(ttl=CACHE_TTL)
+def get_trends(name: str | None, since: datetime | None) -> list[dict]:
+    """The daily trends, aggregated by the database from the run summaries."""
+
+    return db.trends(name, since)
+
+
+# Configure page.
+st.set_page_config(page_title="Trends", page_icon="📈", layout="wide", initial_sidebar_state="expanded")
+
+# Select the test and the period of the trends.
+name = st.sidebar.selectbox("Name", ["All tests", *get_names()])
+days = st.sidebar.selectbox("Period", [30, 90, 365, None], format_func=lambda days: f"{days} days" if days else "All")
+
+# Divider.
+st.sidebar.divider()
+
+# Refresh button, it drops the cached trends to fetch new runs.
+if st.sidebar.button("Refresh"):
+    get_names.clear()
+    get_trends.clear()
+    st.rerun()
+
+since = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days) if days else None
+rows = get_trends(None if name == "All tests" else name, since)
+
+st.title("Trends")
+if not rows:
+    st.text("No runs in this period.")
+    st.stop()
+
+# Create a graph of pass rate and of jitters over time, a line per test.
+fig = make_subplots(rows=2, cols=1, shared_xaxes=True, subplot_titles=("Passed (%)", "Jitter (ms)"))
+for test in sorted({row["name"] for row in rows}):
+    test_rows = [row for row in rows if row["name"] == test]
+    x = [row["day"] for row in test_rows]
+
+    fig.add_trace(
+        go.Scatter(x=x, y=[row["passed"] / row["runs"] * 100 for row in test_rows], name=test, legendgroup=test),
+        row=1,
+        col=1,
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=x,
+            y=[row["max"] for row in test_rows],
+            name=f"{test} max",
+            legendgroup=test,
+            line=dict(dash="dot"),
+        ),
+        row=2,
+        col=1,
+    )
+    fig.add_trace(
+        go.Scatter(x=x, y=[row["mean"] for row in test_rows], name=f"{test} mean", legendgroup=test),
+        row=2,
+        col=1,
+    )
+
+fig.update_layout(height=700, yaxis=dict(range=[-5, 105]))
+
+# Display graph and the table of trends.
+st.plotly_chart(fig, use_container_width=True)
+st.dataframe(rows, use_container_width=True)
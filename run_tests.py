@@ -0,0 +1,208 @@
+import argparse
+import io
+import multiprocessing
+import os
+import queue
+import random
+import sys
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+from datetime import datetime as dt
+from uuid import uuid4
+
+
+@dataclass
+class CaseResult:
+    """
+    Result of the tests of a single test case, run in a worker process.
+    """
+
+    name: str
+    output: str  # Everything the tests printed, then the report of the runner.
+    tests: int
+    failures: int
+    errors: int
+    skipped: int
+    duration: float  # In seconds.
+    core: int | None  # The core the worker was pinned to, if any.
+
+    @property
+    def passed(self) -> bool:
+        """Whether no test failed or raised an error."""
+
+        return not (self.failures or self.errors)
+
+
+# The core the current worker process is pinned to, and the queue of free
+# cores it returns it to once its test case is done.
+_core: int | None = None
+_cores: "multiprocessing.Queue | None" = None
+
+# How long a new worker waits for a free core before running unpinned, in
+# case a worker died without returning its core.
+_CORE_TIMEOUT = 10  # In seconds
+
+
+def _pin_worker(cores: multiprocessing.Queue) -> None:
+    """Pin the worker process to the next free core, where supported."""
+
+    global _core, _cores
+
+    _cores = cores
+    try:
+        _core = cores.get(timeout=_CORE_TIMEOUT)
+    except queue.Empty:
+        _core = None
+
+    if _core is not None:
+        os.sched_setaffinity(0, {_core})
+
+
+def run_case(name: str, test_ids: list[str]) -> CaseResult:
+    """
+    Run the tests of a test case and capture their output.
+
+    Args:
+        name (str): The name of the test case.
+        test_ids (list[str]): The dotted names of its tests.
+
+    Returns:
+        CaseResult:
+
+        The output and counts of the tests.
+    """
+
+    stream = io.StringIO()
+    start = time.perf_counter()
+
+    try:
+        with redirect_stdout(stream):
+            suite = unittest.defaultTestLoader.loadTestsFromNames(test_ids)
+            result = unittest.TextTestRunner(stream=stream, verbosity=2).run(suite)
+
+            # The results are stored in the background, and the workers exit
+            # without running the 'atexit' hooks, so wait until they are written.
+            # Results that couldn't be stored count as an error of the case.
+            storage_errors = 0
+            if "db" in sys.modules:
+                try:
+                    sys.modules["db"].results.flush()
+                except Exception as error:
+                    print(f"ERROR: The results of {name} couldn't be stored: {error!r}")
+                    storage_errors = 1
+    finally:
+        # The worker exits after this test case, the next one gets its core.
+        if _cores is not None:
+            _cores.put(_core)
+
+    return CaseResult(
+        name,
+        stream.getvalue(),
+        result.testsRun,
+        len(result.failures),
+        len(result.errors) + storage_errors,
+        len(result.skipped),
+        time.perf_counter() - start,
+        _core,
+    )
+
+
+def discover(start_dir: str = ".", pattern: str = "test*.py") -> dict[str, list[str]]:
+    """
+    Find the tests and group them by test case, in the order they are found.
+
+    Returns:
+        dict[str, list[str]]:
+
+        The dotted names of the tests of each test case.
+    """
+
+    def flatten(suite: unittest.TestSuite):
+        for test in suite:
+            if isinstance(test, unittest.TestSuite):
+                yield from flatten(test)
+            else:
+                yield test
+
+    cases: dict[str, list[str]] = {}
+    for test in flatten(unittest.defaultTestLoader.discover(start_dir, pattern)):
+        # Modules that fail to import are loaded as a single failing test.
+        name = test.id().rsplit(".", 1)[0]
+        cases.setdefault(name, []).append(test.id())
+
+    return cases
+
+
+def available_cores() -> list[int | None]:
+    """The cores this process can run on, or a placeholder per CPU if unknown."""
+
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+
+    return [None] * (os.cpu_count() or 1)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run each test case in its own process, pinned to its own core.")
+    parser.add_argument("-s", "--start-dir", default=".", help="Directory to start the discovery from.")
+    parser.add_argument("-p", "--pattern", default="test*.py", help="Pattern to match the test files.")
+    parser.add_argument("-j", "--workers", type=int, help="Number of worker processes, one per free core by default.")
+    args = parser.parse_args()
+
+    # Every test case stores its results under the same run, the workers
+    # inherit these variables from this process.
+    os.environ.setdefault("TESTS_UUID", uuid4().hex)
+    os.environ.setdefault("TESTS_TIMESTAMP", dt.now().isoformat())
+    os.environ.setdefault("TESTS_SEED", str(random.randrange(2**32)))
+    uuid, timestamp, seed = os.environ["TESTS_UUID"], os.environ["TESTS_TIMESTAMP"], os.environ["TESTS_SEED"]
+    print(f"UUID: {uuid}, TIMESTAMP: {timestamp}, SEED: {seed}")
+
+    cases = discover(args.start_dir, args.pattern)
+    cores = available_cores()
+    workers = max(1, min(args.workers or len(cores), len(cases)))
+
+    # Hand out a different core to each worker, they share them round-robin
+    # if there are more workers than cores.
+    # Workers that run a single task each can't be forked, they are spawned.
+    context = multiprocessing.get_context("spawn")
+    cores_queue = context.Queue()
+    for i in range(workers):
+        cores_queue.put(cores[i % len(cores)])
+
+    # Each test case runs in a new worker process, so they don't share module
+    # globals like the database sink, the caches or the random generators.
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        workers, context, initializer=_pin_worker, initargs=(cores_queue,), max_tasks_per_child=1
+    ) as executor:
+        futures = [executor.submit(run_case, name, test_ids) for name, test_ids in cases.items()]
+
+        # Print the results in the order the test cases were found, no matter
+        # which one finishes first.
+        results = []
+        for future in futures:
+            result = future.result()
+            results.append(result)
+
+            core = "" if result.core is None else f" on core {result.core}"
+            print(f"\n{'=' * 70}\n{result.name} ({result.duration:.1f}s{core})\n{'=' * 70}")
+            print(result.output, end="", flush=True)
+
+    duration = time.perf_counter() - start
+    tests = sum(result.tests for result in results)
+    failed = [result.name for result in results if not result.passed]
+
+    print(f"\n{'-' * 70}\nRan {tests} tests in {len(results)} test cases in {duration:.3f}s with {workers} workers")
+    if failed:
+        print(f"\nFAILED ({len(failed)} test cases): {', '.join(failed)}")
+        return 1
+
+    print("\nOK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
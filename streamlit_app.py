@@ -1,75 +1,171 @@
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
 import streamlit as st
 from plotly import graph_objects as go
 
 import db
+from capture_store import Capture, CaptureStore
+from waveform import decimate, step_trace
+
+# How long the lists of tests and the tests data are cached, in seconds. Runs
+# never change once stored, new ones show up after this time or a refresh.
+CACHE_TTL = int(os.environ.get("CACHE_TTL", 600))
+
+# The plots are decimated to up to 4 points per bucket, to keep the browser
+# responsive with captures of any length.
+PLOT_BUCKETS = 2_000
+
+
+@st.cache_resource
+def get_backend() -> "MongoBackend | SQLiteBackend":
+    """Connect to the database once for every session of the app."""
+
+    return db.get_backend()
+
+
+@st.cache_data(ttl=CACHE_TTL)
+def get_timestamps() -> list[datetime]:
+    """The timestamp of every run, newest first."""
+
+    # The distinct values are read from the '(timestamp, name)' index without
+    # fetching the tests.
+    return sorted(db.Test.objects.distinct("timestamp"), reverse=True)
+
+
+@st.cache_data(ttl=CACHE_TTL)
+def get_names(timestamp: datetime) -> list[str]:
+    """The name of every test of a run."""
+
+    return sorted(db.Test.objects(timestamp=timestamp).distinct("name"))
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=64)
+def get_test(timestamp: datetime, name: str) -> SimpleNamespace:
+    """The decoded data of a test, with its times and states as numpy arrays."""
+
+    test = db.Test.objects(timestamp=timestamp, name=name).first()
+
+    return SimpleNamespace(uuid=test.uuid, passed=test.passed, log=test.log, times=test.times, states=test.states)
+
+
+@st.cache_resource(ttl=CACHE_TTL)
+def get_capture(uuid: str, test_case: str) -> Capture | None:
+    """The memory-mapped raw capture of a test, if it was archived."""
+
+    store = CaptureStore(os.environ["CAPTURE_DIR"]) if os.environ.get("CAPTURE_DIR") else None
+    if store is None or not store.exists(uuid, test_case):
+        return None
+
+    return store.open(uuid, test_case)
+
 
 # Configure page.
 st.set_page_config(page_title="Tests Data", page_icon="📈", layout="wide", initial_sidebar_state="expanded")
 
+# Connect to the database.
+get_backend()
+
 # Select which tests to display based on timestamp.
-entries = test_data = db.Test.objects()
-timestamps = sorted(set([entry.timestamp for entry in entries]), reverse=True)
-timestamp = st.sidebar.selectbox("Timestamp", timestamps)
+timestamp = st.sidebar.selectbox("Timestamp", get_timestamps())
 
 # Select which test to display based on name.
-entries = test_data = db.Test.objects(timestamp=timestamp)
-tests = sorted(set([entry.name for entry in entries]))
-name = st.sidebar.selectbox("Name", tests)
+name = st.sidebar.selectbox("Name", get_names(timestamp))
 
 # Divider.
 st.sidebar.divider()
 
-# Refresh button.
+# Refresh button, it drops the cached data to fetch new runs.
 if st.sidebar.button("Refresh"):
+    get_timestamps.clear()
+    get_names.clear()
+    get_test.clear()
+    get_capture.clear()
     st.rerun()
 
-# Get test data.
-test_data = db.Test.objects(timestamp=timestamp, name=name).first()
-
-# Extract data and format it to be displayed in the graph.
-x, y = [], []
-for i, _ in enumerate(test_data.states):
-    x.append(test_data.times[i])
-    y.append(0 if test_data.states[i] == 1 else 1)
-
-    x.append(test_data.times[i])
-    y.append(test_data.states[i])
-
-# Create graph.
-fig = go.Figure()
-fig.add_trace(
-    go.Scatter(
-        x=x,
-        y=y,
-        name="Signal",
-        mode="lines",
-        line=dict(color="limegreen" if test_data.passed else "orangered"),
-        showlegend=False,
-        hovertemplate="Time: %{x:.3f}<extra></extra>",
-    )
-)
-
-# Configure graph layout.
-fig.update_layout(
-    xaxis=dict(
-        title="Time",
-        tickmode="linear",
-        dtick=1,
-        range=[x[0] - 0.1, x[-1] + 0.1],
-        showgrid=True,
-        showline=True,
-    ),
-    yaxis=dict(
-        title="State",
-        range=[-0.1, 1.1],
-        dtick=1,
-    ),
-    width=1400,
-    height=400,
-)
-
-# Display graph and log.
+# Get test data, repeated views are served from the cache.
+test_data = get_test(timestamp, name)
+
+# Build the step trace of the signal from its transitions.
+x, y = step_trace(test_data.times, test_data.states)
+
+# Display the uuid of the test.
 st.title(f"Test uuid:")
 st.text(f"{test_data.uuid}")
-st.plotly_chart(fig)
+
+# Tests of a signal that never changed state have no transitions to plot.
+if not len(x):
+    st.warning("No transitions, the signal never changed state during the test.")
+else:
+    # Select the time range to display, the trace is decimated for each viewport
+    # so zooming in shows more details.
+    start, end = float(x[0]), float(x[-1])
+    if end > start:
+        start, end = st.slider("Viewport (s)", start, end, (start, end), step=0.001)
+    x, y = decimate(x, y, start, end, PLOT_BUCKETS)
+    margin = max((end - start) * 0.01, 0.001)
+
+    # Create graph.
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scatter(
+            x=x,
+            y=y,
+            name="Signal",
+            mode="lines",
+            line=dict(color="limegreen" if test_data.passed else "orangered"),
+            showlegend=False,
+            hovertemplate="Time: %{x:.3f}<extra></extra>",
+        )
+    )
+
+    # Configure graph layout.
+    fig.update_layout(
+        xaxis=dict(
+            title="Time",
+            tickmode="linear" if end - start > 5 else "auto",
+            dtick=1,
+            range=[start - margin, end + margin],
+            showgrid=True,
+            showline=True,
+        ),
+        yaxis=dict(
+            title="State",
+            range=[-0.1, 1.1],
+            dtick=1,
+        ),
+        width=1400,
+        height=400,
+    )
+
+    # Display graph.
+    st.plotly_chart(fig)
+
+# Display the raw samples of a time window, if the capture was archived.
+# Tests of multiple channels are stored as "<test case> <channel>".
+test_case, _, channel = name.partition(" ")
+capture = get_capture(test_data.uuid, test_case)
+if capture is not None:
+    duration = capture.end_time - capture.start_time
+
+    # Only the samples of the window are read from disk.
+    start, end = st.slider("Raw samples (s)", 0.0, duration, (0.0, min(duration, 1.0)), step=0.001)
+    samples, times = capture.window(capture.start_time + start, capture.start_time + end)
+    row = capture.channels.index(channel) if channel else 0
+
+    raw_x, raw_y = decimate(times - capture.start_time, samples[row], buckets=PLOT_BUCKETS)
+
+    raw = go.Figure(
+        go.Scattergl(
+            x=raw_x,
+            y=raw_y,
+            mode="lines",
+            line=dict(color="limegreen" if test_data.passed else "orangered", shape="hv"),
+            hovertemplate="Time: %{x:.5f}<extra></extra>",
+        )
+    )
+    raw.update_layout(xaxis=dict(title="Time"), yaxis=dict(title="State", range=[-0.1, 1.1], dtick=1), height=300)
+    st.plotly_chart(raw, use_container_width=True)
+
 st.text(test_data.log)
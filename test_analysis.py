@@ -0,0 +1,205 @@
+import unittest
+
+import numpy as np
+
+from analysis import (
+    JitterAnalyzer,
+    JitterResult,
+    MultiChannelJitterAnalyzer,
+    OnlineJitterStats,
+    analyze_channels,
+    analyze_jitter,
+    find_transitions,
+    format_table,
+)
+
+PERIOD = 2_000  # In ms
+MAX_JITTER = 10  # In ms
+RATE = 20_000  # In samples per second
+
+
+class TestAnalyzeJitter(unittest.TestCase):
+    """
+    Test the vectorized jitter analysis against synthetic square waves.
+    """
+
+    def test_find_transitions(self) -> None:
+        samples = np.array([1, 1, 0, 0, 0, 1, 0], dtype=np.uint8)
+
+        np.testing.assert_array_equal(find_transitions(samples), [2, 5, 6])
+        np.testing.assert_array_equal(find_transitions(samples.astype(bool)), [2, 5, 6])
+
+    def test_clean_signal(self) -> None:
+        # A 0.5Hz square wave starting right after a transition.
+        times = np.arange(10 * RATE) / RATE
+        samples = ((times // (PERIOD / 2 / 1000)) % 2 == 0).astype(np.uint8)
+
+        result = analyze_jitter(samples, times, PERIOD, MAX_JITTER)
+
+        self.assertEqual(result.transitions, 9)
+        self.assertTrue(result.passed)
+        self.assertEqual(result.failed_percent, 0)
+        self.assertLess(result.max, 1000 / RATE)
+        np.testing.assert_allclose(result.times, np.arange(1, 10), atol=1 / RATE)
+        np.testing.assert_array_equal(result.states, [0, 1, 0, 1, 0, 1, 0, 1, 0])
+
+    def test_glitch(self) -> None:
+        times = np.arange(10 * RATE) / RATE
+        samples = ((times // (PERIOD / 2 / 1000)) % 2 == 0).astype(np.uint8)
+
+        # A single sample glitch creates two transitions way off the period.
+        samples[RATE // 2] ^= 1
+
+        result = analyze_jitter(samples, times, PERIOD, MAX_JITTER)
+
+        self.assertEqual(result.transitions, 11)
+        self.assertFalse(result.passed)
+        np.testing.assert_array_equal(np.flatnonzero(result.failed), [0, 1, 2])
+        self.assertAlmostEqual(result.failed_percent, 3 / 11 * 100)
+
+    def test_no_transitions(self) -> None:
+        result = analyze_jitter(np.zeros(100, dtype=np.uint8), np.arange(100) / RATE, PERIOD, MAX_JITTER)
+
+        # A signal that never changes state fails.
+        self.assertEqual(result.transitions, 0)
+        self.assertFalse(result.passed)
+        self.assertTrue(np.isnan(result.mean))
+        self.assertFalse(OnlineJitterStats(MAX_JITTER).snapshot().passed)
+
+
+class TestOnlineJitterStats(unittest.TestCase):
+    """
+    Test that the bounded-memory stats match the ones of a whole capture.
+    """
+
+    def test_chunked_capture(self) -> None:
+        # A jittery 0.5Hz square wave with a single sample glitch.
+        rng = np.random.default_rng(0)
+        times = np.arange(60 * RATE) / RATE
+        edges = np.cumsum(1 + rng.uniform(-0.02, 0.02, 60))
+        samples = (np.searchsorted(edges, times) % 2).astype(np.uint8)
+        samples[:100] = 0
+        samples[100] = 1
+        samples[RATE * 30] ^= 1
+
+        result = analyze_jitter(samples[100:], times[100:], PERIOD, MAX_JITTER)
+
+        # Analyze the same capture in chunks that don't align with transitions.
+        analyzer = JitterAnalyzer(PERIOD, MAX_JITTER)
+        chunks = [
+            analyzer.update(samples[i : i + 4_096], times[i : i + 4_096]) for i in range(100, len(samples), 4_096)
+        ]
+        stats = analyzer.stats.snapshot()
+
+        self.assertEqual(stats.transitions, result.transitions)
+        self.assertAlmostEqual(stats.failed_percent, result.failed_percent)
+        self.assertAlmostEqual(stats.mean, result.mean)
+        self.assertAlmostEqual(stats.std, result.std)
+        self.assertAlmostEqual(stats.min, result.min)
+        self.assertAlmostEqual(stats.max, result.max)
+        self.assertEqual(stats.histogram.sum(), result.transitions)
+        np.testing.assert_allclose(np.concatenate([chunk.times for chunk in chunks]), result.times)
+
+    def test_per_transition(self) -> None:
+        jitters = np.array([-3.0, 12.0, 0.5, -25.0])
+        stats = OnlineJitterStats(MAX_JITTER)
+
+        for jitter in jitters:
+            stats.update(jitter)
+
+        snapshot = stats.snapshot()
+
+        self.assertEqual(snapshot.failed, 2)
+        self.assertAlmostEqual(snapshot.mean, np.abs(jitters).mean())
+        self.assertAlmostEqual(snapshot.std, np.abs(jitters).std())
+        self.assertEqual(snapshot.histogram[np.searchsorted(snapshot.bins, -25.0, side="right") - 1], 1)
+
+    def test_merge(self) -> None:
+        jitters = np.array([-3.0, 12.0, 0.5, -25.0, 7.0])
+        first, second = OnlineJitterStats(MAX_JITTER), OnlineJitterStats(MAX_JITTER)
+        first.update(jitters[:2])
+        second.update(jitters[2:])
+
+        first.merge(second)
+        snapshot = first.snapshot()
+
+        self.assertEqual(snapshot.transitions, 5)
+        self.assertEqual(snapshot.failed, 2)
+        self.assertAlmostEqual(snapshot.mean, np.abs(jitters).mean())
+        self.assertAlmostEqual(snapshot.std, np.abs(jitters).std())
+        self.assertEqual(snapshot.max, 25.0)
+        self.assertEqual(snapshot.histogram.sum(), 5)
+
+
+class TestMultiChannel(unittest.TestCase):
+    """
+    Test the analysis of all the channels of a capture at once.
+    """
+
+    def setUp(self) -> None:
+        # Jittery 0.5Hz square waves out of phase, one of them never changes.
+        rng = np.random.default_rng(0)
+        self.times = np.arange(30 * RATE) / RATE
+        self.channels = [f"Dev1/port0/line{i}" for i in range(4)]
+        self.samples = np.zeros((4, len(self.times)), dtype=np.uint8)
+
+        for row in self.samples[:3]:
+            edges = rng.uniform(0, 1) + np.cumsum(1 + rng.uniform(-0.02, 0.02, 30))
+            row[:] = np.searchsorted(edges, self.times) % 2
+
+    def expected(self, row: np.ndarray) -> JitterResult:
+        """Analyze a single channel from its first transition."""
+
+        edges = find_transitions(row)
+        if not len(edges):
+            return analyze_jitter(row[:0], self.times[:0], PERIOD, MAX_JITTER)
+
+        return analyze_jitter(row[edges[0] :], self.times[edges[0] :], PERIOD, MAX_JITTER)
+
+    def test_chunked_capture(self) -> None:
+        analyzer = MultiChannelJitterAnalyzer(self.channels, PERIOD, MAX_JITTER)
+        chunks = [
+            analyzer.update(self.samples[:, i : i + 4_096], self.times[i : i + 4_096])
+            for i in range(0, len(self.times), 4_096)
+        ]
+
+        for channel, row in enumerate(self.samples):
+            expected = self.expected(row)
+            stats = analyzer.stats[channel].snapshot()
+
+            self.assertEqual(stats.transitions, expected.transitions)
+            self.assertAlmostEqual(stats.failed_percent, expected.failed_percent)
+            np.testing.assert_allclose(np.concatenate([chunk[channel].jitters for chunk in chunks]), expected.jitters)
+            np.testing.assert_array_equal(np.concatenate([chunk[channel].states for chunk in chunks]), expected.states)
+
+        # The channel without transitions is never synced.
+        np.testing.assert_array_equal(analyzer.synced, [True, True, True, False])
+
+    def test_process_pool(self) -> None:
+        serial = analyze_channels(self.samples, self.times, PERIOD, MAX_JITTER)
+        parallel = analyze_channels(self.samples, self.times, PERIOD, MAX_JITTER, max_workers=2)
+
+        self.assertEqual(len(parallel), len(self.channels))
+        for channel, row in enumerate(self.samples):
+            np.testing.assert_allclose(serial[channel].jitters, self.expected(row).jitters)
+            np.testing.assert_allclose(parallel[channel].jitters, serial[channel].jitters)
+            np.testing.assert_allclose(parallel[channel].times, serial[channel].times)
+
+    def test_table(self) -> None:
+        analyzer = MultiChannelJitterAnalyzer(self.channels, PERIOD, MAX_JITTER)
+        analyzer.update(self.samples, self.times)
+
+        lines = format_table(self.channels, [stats.snapshot() for stats in analyzer.stats])
+
+        self.assertEqual(len(lines), len(self.channels) + 1)
+        self.assertTrue(lines[0].startswith("Channel"))
+        self.assertTrue(lines[1].startswith("Dev1/port0/line0"))
+        self.assertTrue(lines[1].endswith("FAIL") or lines[1].endswith("PASS"))
+        self.assertIn("nan", lines[4])
+
+        # The channel that never changes state fails.
+        self.assertTrue(lines[4].endswith("FAIL"))
+
+
+if __name__ == "__main__":
+    unittest.main()
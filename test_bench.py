@@ -0,0 +1,51 @@
+import unittest
+
+from bench import BENCHMARKS, Benchmark, Comparison, compare, run_benchmark
+
+
+class TestBench(unittest.TestCase):
+    """
+    Test the timing of the benchmarks and the comparison to a baseline.
+    """
+
+    def test_run_benchmark(self) -> None:
+        calls = []
+        result = run_benchmark(Benchmark("append", lambda: lambda: calls.append(1), 10, "items"), 3, 0.01)
+
+        # The calls are calibrated to last at least 'min_time' per repeat.
+        self.assertEqual(result.repeats, 3)
+        self.assertEqual(len(result.times), 3)
+        self.assertGreater(result.calls, 1)
+        self.assertLessEqual(result.min, result.median)
+        self.assertAlmostEqual(result.throughput, 10 / result.median)
+        self.assertEqual(result.unit, "items")
+
+    def test_benchmarks(self) -> None:
+        # Every hot path can be set up and called once.
+        for benchmark in BENCHMARKS:
+            if "jitter_analysis" in benchmark.name or "samples=10000" in benchmark.name:
+                continue
+
+            with self.subTest(benchmark=benchmark.name):
+                benchmark.setup()()
+
+    def test_compare(self) -> None:
+        results = [
+            run_benchmark(Benchmark("fast", lambda: lambda: None), 1, 0.001),
+            run_benchmark(Benchmark("new", lambda: lambda: None), 1, 0.001),
+        ]
+        baseline = {"results": [{"name": "fast", "median": results[0].median * 2}, {"name": "old", "median": 1.0}]}
+
+        # Only the benchmarks present in both are compared.
+        (comparison,) = compare(results, baseline)
+        self.assertEqual(comparison.name, "fast")
+        self.assertAlmostEqual(comparison.ratio, 0.5)
+        self.assertFalse(comparison.regressed(0.25))
+
+        # Only slowdowns over the threshold are regressions.
+        self.assertFalse(Comparison("slow", 1.0, 1.2).regressed(0.25))
+        self.assertTrue(Comparison("slow", 1.0, 1.3).regressed(0.25))
+
+
+if __name__ == "__main__":
+    unittest.main()
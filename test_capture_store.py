@@ -0,0 +1,77 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from capture_store import CaptureStore
+
+RATE = 20_000  # In samples per second
+
+
+class TestCaptureStore(unittest.TestCase):
+    """
+    Test the raw capture archive and its memory-mapped reads.
+    """
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = CaptureStore(directory.name)
+
+        # A capture of 3 channels over several segments.
+        rng = np.random.default_rng(0)
+        self.times = 100 + np.arange(35_000) / RATE
+        self.samples = rng.integers(0, 2, (3, len(self.times)), dtype=np.uint8)
+        self.channels = ["Dev1/port0/line0", "Dev1/port0/line1", "Dev1/port0/line2"]
+
+        with self.store.create("uuid", "TestSignal", self.channels, np.uint8, segment_size=10_000) as writer:
+            # Chunks that don't align with the segments.
+            for i in range(0, len(self.times), 4_096):
+                writer.write(self.samples[:, i : i + 4_096], self.times[i : i + 4_096])
+
+    def test_read(self) -> None:
+        capture = self.store.open("uuid", "TestSignal")
+
+        self.assertEqual(len(capture), len(self.times))
+        self.assertEqual(capture.channels, self.channels)
+        self.assertEqual(capture.start_time, self.times[0])
+        self.assertEqual(capture.end_time, self.times[-1])
+
+        # Reads across segments.
+        samples, times = capture.read(9_000, 31_000)
+        np.testing.assert_array_equal(samples, self.samples[:, 9_000:31_000])
+        np.testing.assert_array_equal(times, self.times[9_000:31_000])
+
+        # The unwritten part of the last segment is not read.
+        samples, times = capture.read(34_000, 40_000)
+        self.assertEqual(samples.shape, (3, 1_000))
+
+    def test_window(self) -> None:
+        capture = self.store.open("uuid", "TestSignal")
+
+        # A window within a segment is a view of the memory map.
+        samples, times = capture.window(100.6, 100.9)
+        self.assertIsInstance(samples.base, np.memmap)
+        self.assertFalse(samples.flags.writeable)
+        np.testing.assert_array_equal(samples, self.samples[:, 12_000:18_000])
+        np.testing.assert_array_equal(times, self.times[12_000:18_000])
+
+        # Windows out of the capture are empty or clipped.
+        self.assertEqual(capture.window(0, 50)[0].shape, (3, 0))
+        self.assertEqual(capture.window(101.5, 200)[1][-1], self.times[-1])
+
+    def test_index(self) -> None:
+        self.assertEqual(self.store.captures(), [("uuid", "TestSignal")])
+        self.assertTrue(self.store.exists("uuid", "TestSignal"))
+        self.assertFalse(self.store.exists("uuid", "TestOther"))
+
+        # Names are escaped to be valid paths.
+        with self.store.create("other", "Test Dev1/port0", ["Dev1/port0/line0"], np.uint8) as writer:
+            writer.write(self.samples[:1, :10], self.times[:10])
+
+        self.assertEqual(self.store.captures("other"), [("other", "Test Dev1/port0")])
+        self.assertEqual(len(self.store.open("other", "Test Dev1/port0")), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
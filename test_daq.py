@@ -2,10 +2,69 @@ import random
 import time
 import unittest
 
+import numpy as np
+
 from mock_nidaqmx import DAQ
+from mock_nidaqmx.histogram import LogHistogram
+from mock_nidaqmx.pacer import Pacer
 
 TEST_DURATION = 11  # In seconds
 MIN_SAMPLES_PER_SECOND = 100
+MAX_GAP = 10  # In ms, the longest time allowed between two reads.
+MAX_LONG_GAPS_PER_SECOND = 0.5  # The gaps longer than 'MAX_GAP' allowed, per second of reads.
+PACED_RATE = 10_000  # In samples per second
+MAX_MISSED_PERCENT = 1  # Of the deadlines of the paced reads.
+
+
+def check_sampling(
+    test_case: unittest.TestCase, samples_per_second: float, gaps: LogHistogram, pacer: Pacer | None = None
+) -> None:
+    """
+    Print the sampling rate and the distribution of the gaps between reads,
+    and assert both the average rate and the number of gaps longer than
+    'MAX_GAP', as stalls break the 10ms resolution even if the average rate
+    is high enough. Up to 'MAX_LONG_GAPS_PER_SECOND' of them let the hiccups
+    of the OS scheduler pass, while a stall once per second still fails,
+    however many short gaps surround it. Paced reads must meet their
+    deadlines as well.
+    """
+
+    stats = gaps.snapshot()
+    long_gaps = gaps.count_above(MAX_GAP / 1e3)
+
+    # The gaps add up to the duration of the reads.
+    max_long_gaps = int(MAX_LONG_GAPS_PER_SECOND * gaps.total)
+
+    # Print the results
+    print(f"\n\n{test_case.__class__.__name__}.{test_case.test_read.__name__}()")
+    print(f"\tSamples per second: {samples_per_second:,.0f}")
+    print(
+        f"\tGaps: p50 {stats['p50'] * 1e3:.3f}ms, p99 {stats['p99'] * 1e3:.3f}ms, "
+        f"p99.9 {stats['p99.9'] * 1e3:.3f}ms, Max: {stats['max'] * 1e3:.3f}ms, Over {MAX_GAP}ms: {long_gaps}"
+    )
+
+    missed_percent = 0.0
+    if pacer:
+        missed_percent = pacer.missed_percent
+        print(f"\tPaced at {pacer.report()}")
+
+    # Print "FAIL" if the number of samples per second is less than the
+    # minimum, if too many reads came too late or missed their deadline.
+    if (
+        samples_per_second < MIN_SAMPLES_PER_SECOND
+        or long_gaps > max_long_gaps
+        or missed_percent > MAX_MISSED_PERCENT
+    ):
+        print("\t\tFAIL")
+    else:
+        print("\t\tPASS")
+
+    # Assert that the number of samples per second is greater than or equal
+    # to the minimum, and that almost every gap between reads is within the
+    # maximum.
+    test_case.assertGreaterEqual(samples_per_second, MIN_SAMPLES_PER_SECOND)
+    test_case.assertLessEqual(long_gaps, max_long_gaps, f"Gaps between reads longer than {MAX_GAP}ms")
+    test_case.assertLessEqual(missed_percent, MAX_MISSED_PERCENT)
 
 
 class TestDaqSampling(unittest.TestCase):
@@ -20,8 +79,10 @@ class TestDaqSampling(unittest.TestCase):
         # Init the device
         device = DAQ()
 
-        # Init the variables to track the sampling process.
+        # Init the variables to track the sampling process, the time between
+        # consecutive reads is counted in a histogram.
         samples_count = 0
+        gaps = LogHistogram()
 
         # Context manager to mimic the original 'nidaqmx' module.
         with device.Task() as task:
@@ -30,10 +91,13 @@ class TestDaqSampling(unittest.TestCase):
             task.di_channels.add_di_chan("Dev1/0")
 
             # Perform reads.
-            start = time.perf_counter()
+            start = previous = time.perf_counter()
             while True:
-                # Store the current time to be constant for each iteration.
+                # Store the current time to be constant for each iteration, and
+                # count the gap since the previous read.
                 now = time.perf_counter()
+                gaps.record(now - previous)
+                previous = now
 
                 # Perform a read and count sample as read.
                 task.read()
@@ -46,23 +110,10 @@ class TestDaqSampling(unittest.TestCase):
         # Store the end time of the iterations.
         end = now
 
-        # Calculate the number of samples per second
+        # Calculate the number of samples per second, and check it along with
+        # the gaps between reads.
         samples_per_second = samples_count / (end - start)
-
-        # Print the results
-        print(f"\n\n{self.__class__.__name__}.{self.test_read.__name__}()")
-        print(f"\tSamples per second: {samples_per_second:,.0f}")
-
-        # Print "FAIL" if the number of samples per second is less than the
-        # minimum
-        if samples_per_second < MIN_SAMPLES_PER_SECOND:
-            print("\t\tFAIL")
-        else:
-            print("\t\tPASS")
-
-        # Assert that the number of samples per second is greater than or equal
-        # to the minimum
-        self.assertGreaterEqual(samples_per_second, MIN_SAMPLES_PER_SECOND)
+        check_sampling(self, samples_per_second, gaps)
 
 
 class TestDaqSamplingIrregular(unittest.TestCase):
@@ -76,8 +127,10 @@ class TestDaqSamplingIrregular(unittest.TestCase):
         # Init the device
         device = DAQ()
 
-        # Init the variables to track the sampling process.
+        # Init the variables to track the sampling process, the time between
+        # consecutive reads is counted in a histogram.
         samples_count = 0
+        gaps = LogHistogram()
 
         # Context manager to mimic the original 'nidaqmx' module.
         with device.Task() as task:
@@ -86,10 +139,13 @@ class TestDaqSamplingIrregular(unittest.TestCase):
             task.di_channels.add_di_chan("Dev1/0")
 
             # Perform reads.
-            start = time.perf_counter()
+            start = previous = time.perf_counter()
             while True:
-                # Store the current time to be constant for each iteration.
+                # Store the current time to be constant for each iteration, and
+                # count the gap since the previous read.
                 now = time.perf_counter()
+                gaps.record(now - previous)
+                previous = now
 
                 # Perform a read, count sample as read and sleep random amount
                 # of time.
@@ -104,23 +160,86 @@ class TestDaqSamplingIrregular(unittest.TestCase):
         # Store the end time of the iterations.
         end = now
 
-        # Calculate the number of samples per second
+        # Calculate the number of samples per second, and check it along with
+        # the gaps between reads.
         samples_per_second = samples_count / (end - start)
+        check_sampling(self, samples_per_second, gaps)
+
+
+class TestDaqSamplingStalls(unittest.TestCase):
+    """
+    Test that regular stalls fail the sampling check. At 50k reads per second,
+    a 30ms stall once per second is 11 gaps out of 550k, which don't show in
+    any percentile of the gaps, nor in the average rate.
+    """
+
+    def test_read(self) -> None:
+        # Simulate the gaps of the reads, stalling once per second.
+        gaps = LogHistogram()
+        gaps.record_many(np.full(550_000, 2e-5))
+        gaps.record_many(np.full(TEST_DURATION, 0.03))
+
+        with self.assertRaisesRegex(AssertionError, f"longer than {MAX_GAP}ms"):
+            check_sampling(self, 50_000, gaps)
+
+        # A single hiccup of the OS scheduler passes.
+        gaps = LogHistogram()
+        gaps.record_many(np.full(550_000, 2e-5))
+        gaps.record(0.03)
+
+        check_sampling(self, 50_000, gaps)
+
+
+class TestDaqSamplingPaced(unittest.TestCase):
+    """
+    Test the DAQ sampling at a fixed rate of 'PACED_RATE', with each read
+    paced against an absolute deadline instead of polling as fast as possible
+    or sleeping a fixed amount of time. Besides the rate and the gaps, the
+    reads must meet their deadlines.
+    """
+
+    def test_read(self) -> None:
+        # Init the device
+        device = DAQ()
+
+        # Init the variables to track the sampling process, the time between
+        # consecutive reads is counted in a histogram.
+        samples_count = 0
+        gaps = LogHistogram()
+        pacer = Pacer(PACED_RATE)
+
+        # Context manager to mimic the original 'nidaqmx' module.
+        with device.Task() as task:
+
+            # Configure the channel for the task to read.
+            task.di_channels.add_di_chan("Dev1/0")
+
+            # Perform reads.
+            start = previous = time.perf_counter()
+            pacer.start(start)
+            while True:
+                # Wait for the deadline of the read, then store the current
+                # time and count the gap since the previous read.
+                pacer.wait()
+                now = time.perf_counter()
+                gaps.record(now - previous)
+                previous = now
+
+                # Perform a read and count sample as read.
+                task.read()
+                samples_count += 1
 
-        # Print the results
-        print(f"\n\n{self.__class__.__name__}.{self.test_read.__name__}()")
-        print(f"\tSamples per second: {samples_per_second:,.0f}")
+                # Break the loop if the test duration is reached.
+                if (now - start) > TEST_DURATION:
+                    break
 
-        # Print "FAIL" if the number of samples per second is less than the
-        # minimum
-        if samples_per_second < MIN_SAMPLES_PER_SECOND:
-            print("\t\tFAIL")
-        else:
-            print("\t\tPASS")
+        # Store the end time of the iterations.
+        end = now
 
-        # Assert that the number of samples per second is greater than or equal
-        # to the minimum
-        self.assertGreaterEqual(samples_per_second, MIN_SAMPLES_PER_SECOND)
+        # Calculate the number of samples per second, and check it along with
+        # the gaps between reads and the deadlines missed.
+        samples_per_second = samples_count / (end - start)
+        check_sampling(self, samples_per_second, gaps, pacer)
 
 
 if __name__ == "__main__":
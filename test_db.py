@@ -0,0 +1,303 @@
+import os
+import threading
+import time
+import unittest
+from datetime import datetime as dt
+from unittest.mock import patch
+
+import bson
+import numpy as np
+from mongoengine import ValidationError
+from pymongo.errors import AutoReconnect
+
+import db
+from local_db import SQLiteBackend
+
+
+class FlakySink(db.ResultSink):
+    """
+    Sink that stores the batches in memory instead of the database, and fails
+    the first writes.
+    """
+
+    def __init__(self, failures: int, delay: float = 0.0, **kwargs) -> None:
+        super().__init__(retry_delay=0.001, **kwargs)
+        self.failures = failures
+        self.delay = delay
+        self.batches: list[list[db.Test]] = []
+
+    def _connect(self) -> None:
+        pass
+
+    def _insert(self, documents: list[db.Test]) -> None:
+        time.sleep(self.delay)
+
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("Connection reset")
+
+        self.batches.append(documents)
+
+
+def make_test(i: int) -> db.Test:
+    return db.Test(name=f"Test{i}", times=[0.0], states=[0], passed=True, log="log", uuid="uuid", timestamp=dt.now())
+
+
+class TestResultSink(unittest.TestCase):
+    """
+    Test that the results are written in the background, in batches.
+    """
+
+    def test_batches(self) -> None:
+        sink = FlakySink(failures=2, batch_size=50)
+        block = threading.Event()
+
+        # Hold the writer with the first batch until every document is queued.
+        insert = sink._insert
+        sink._insert = lambda documents: block.wait() and insert(documents)
+        for i in range(120):
+            sink.put(make_test(i))
+        block.set()
+
+        # The other documents are batched, with the failed writes retried.
+        self.assertTrue(sink.flush(timeout=5))
+        self.assertLessEqual(len(sink.batches), 4)
+        self.assertLessEqual(max(len(batch) for batch in sink.batches), 50)
+        self.assertEqual([test.name for batch in sink.batches for test in batch], [f"Test{i}" for i in range(120)])
+        self.assertTrue(sink.close(timeout=5))
+
+    def test_slow_database(self) -> None:
+        sink = FlakySink(failures=0, delay=0.5)
+
+        # Queueing doesn't wait for the database.
+        start = time.perf_counter()
+        sink.put(make_test(0))
+        self.assertLess(time.perf_counter() - start, 0.1)
+
+        self.assertFalse(sink.flush(timeout=0.01))
+        self.assertTrue(sink.close(timeout=5))
+        self.assertEqual(len(sink.batches), 1)
+
+    def test_dropped(self) -> None:
+        sink = FlakySink(failures=10, retries=2)
+        sink.put(make_test(0))
+
+        self.assertTrue(sink.close(timeout=5))
+        self.assertEqual(len(sink.batches), 0)
+        self.assertEqual(len(sink.dropped), 1)
+        self.assertEqual(sink.dropped_count, 1)
+
+    def test_dropped_bounded(self) -> None:
+        sink = FlakySink(failures=100, retries=0, max_dropped=2)
+        for i in range(5):
+            sink.put(make_test(i))
+
+        # Only the last dropped documents are kept, all of them are counted.
+        self.assertTrue(sink.close(timeout=5))
+        self.assertEqual(sink.dropped_count, 5)
+        self.assertEqual([test.name for test in sink.dropped], ["Test3", "Test4"])
+
+    def test_configuration_error(self) -> None:
+        sink = FlakySink(failures=0)
+
+        def insert(documents: list[db.Test]) -> None:
+            raise KeyError("DB_HOST")
+
+        # Errors that retrying can't fix are raised by the next flush, once.
+        sink._insert = insert
+        sink.put(make_test(0))
+        with self.assertRaises(KeyError):
+            sink.flush(timeout=5)
+
+        self.assertEqual(sink.dropped_count, 1)
+        self.assertTrue(sink.flush(timeout=5))
+
+        sink.put(make_test(1))
+        with self.assertRaises(KeyError):
+            sink.close(timeout=5)
+        self.assertIsNone(sink._thread)
+
+    def test_missing_setting(self) -> None:
+        sink = db.ResultSink()
+        environ = {key: value for key, value in os.environ.items() if key not in ("DB_HOST", "DB_BACKEND")}
+
+        # A missing setting is raised as soon as the first result is queued,
+        # instead of dropping every result at exit.
+        with patch.dict(os.environ, environ, clear=True), patch.object(db, "_backend", None):
+            with self.assertRaisesRegex(KeyError, "DB_HOST is not set"):
+                sink.put(make_test(0))
+
+        self.assertIsNone(sink._thread)
+        self.assertTrue(sink.close(timeout=5))
+        self.assertEqual(sink.dropped_count, 0)
+
+    def test_invalid(self) -> None:
+        # Invalid documents are rejected right away, as 'save' does.
+        with self.assertRaises(ValidationError):
+            FlakySink(failures=0).put(db.Test(name="Test"))
+
+
+class FakeGridFS:
+    """In-memory GridFS with the methods used by the array fields."""
+
+    files: dict[bson.ObjectId, bytes] = {}
+
+    def __init__(self, database) -> None:
+        pass
+
+    def put(self, data: bytes) -> bson.ObjectId:
+        file_id = bson.ObjectId()
+        self.files[file_id] = data
+        return file_id
+
+    def get(self, file_id: bson.ObjectId):
+        return type("File", (), {"read": lambda _: self.files[file_id]})()
+
+
+class TestArrayFields(unittest.TestCase):
+    """
+    Test the binary encoding of the times and states of the tests.
+    """
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        self.times = np.cumsum(1 + rng.uniform(-0.01, 0.01, 10_000))
+        self.states = (np.arange(10_000) % 2).astype(np.uint8)
+
+    def test_round_trip(self) -> None:
+        test = make_test(0)
+        test.times, test.states = self.times, self.states
+        test.validate()
+
+        son = test.to_mongo()
+        loaded = db.Test._from_son(son)
+
+        # Timestamps are rounded to the tick, states are exact.
+        np.testing.assert_allclose(loaded.times, self.times, atol=1e-6)
+        np.testing.assert_array_equal(loaded.states, self.states)
+        self.assertEqual(loaded.states.dtype, np.uint8)
+
+        # Much smaller than arrays of BSON doubles and integers.
+        lists = {"times": self.times.tolist(), "states": self.states.tolist()}
+        self.assertLess(len(bson.encode(son)) * 5, len(bson.encode(lists)))
+
+    def test_lists(self) -> None:
+        # Documents stored with lists are loaded as arrays.
+        son = make_test(0).to_mongo()
+        son["times"], son["states"] = [0.5, 1.5], [1, 0]
+        loaded = db.Test._from_son(son)
+
+        np.testing.assert_array_equal(loaded.times, [0.5, 1.5])
+        np.testing.assert_array_equal(loaded.states, [1, 0])
+
+    def test_gridfs(self) -> None:
+        test = make_test(0)
+        test.times = self.times
+
+        # Large payloads are stored in a GridFS file.
+        backend = type("Backend", (), {"files": FakeGridFS(None)})()
+        with patch.object(db, "_backend", backend), patch.object(db.Test.times, "max_inline_size", 1_000):
+            son = test.to_mongo()
+            loaded = db.Test._from_son(son)
+
+        self.assertIn("file", son["times"])
+        self.assertNotIn("data", son["times"])
+        np.testing.assert_allclose(loaded.times, self.times, atol=1e-6)
+
+    def test_invalid_states(self) -> None:
+        test = make_test(0)
+        test.states = [0, 2]
+
+        with self.assertRaises(ValidationError):
+            test.validate()
+
+
+class TestLocalBackend(unittest.TestCase):
+    """
+    Test the offline SQLite backend through the same API as MongoDB.
+    """
+
+    def setUp(self) -> None:
+        patcher = patch.object(db, "_backend", SQLiteBackend(":memory:"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_save_and_query(self) -> None:
+        timestamp = dt.now()
+        for i in range(3):
+            test = make_test(i % 2)
+            test.timestamp = timestamp
+            test.save()
+
+        # Datetimes are rounded to milliseconds, as in MongoDB.
+        timestamps = db.Test.objects.distinct("timestamp")
+        self.assertEqual(len(timestamps), 1)
+        self.assertEqual(timestamps[0], timestamp.replace(microsecond=timestamp.microsecond // 1000 * 1000))
+
+        self.assertEqual(sorted(db.Test.objects.distinct("name")), ["Test0", "Test1"])
+        self.assertEqual(db.Test.objects(timestamp=timestamps[0], name="Test0").count(), 2)
+
+        test = db.Test.objects(name="Test1").first()
+        np.testing.assert_array_equal(test.times, [0.0])
+        self.assertIsNone(db.Test.objects(name="Test2").first())
+
+    def test_sink(self) -> None:
+        sink = db.ResultSink()
+        for i in range(10):
+            sink.put(make_test(i))
+
+        self.assertTrue(sink.close(timeout=5))
+        self.assertEqual([test.name for test in db.Test.objects], [f"Test{i}" for i in range(10)])
+
+    def test_trends(self) -> None:
+        # Two days of runs of two tests, one of them failed.
+        for day, name, passed, maximum in [(1, "TestA", True, 2.0), (1, "TestA", False, 20.0), (2, "TestB", True, 1.0)]:
+            db.Summary(
+                name=name,
+                uuid=f"uuid{day}",
+                timestamp=dt(2024, 1, day, 12),
+                passed=passed,
+                mean=maximum / 2,
+                std=0.0,
+                min=0.0,
+                max=maximum,
+                failed_percent=0.0 if passed else 50.0,
+                samples_per_second=20_000.0,
+                transitions=10,
+                host="host",
+                origin="local",
+            ).save()
+
+        rows = db.trends()
+
+        self.assertEqual(
+            [(row["day"], row["name"]) for row in rows], [("2024-01-01", "TestA"), ("2024-01-02", "TestB")]
+        )
+        self.assertEqual((rows[0]["runs"], rows[0]["passed"]), (2, 1))
+        self.assertEqual(rows[0]["max"], 20.0)
+        self.assertEqual(rows[0]["mean"], 5.5)
+        self.assertEqual(rows[0]["failed_percent"], 25.0)
+
+        # The trends of a single test, or from a given day.
+        self.assertEqual([row["name"] for row in db.trends("TestB")], ["TestB"])
+        self.assertEqual([row["day"] for row in db.trends(since=dt(2024, 1, 2))], ["2024-01-02"])
+
+    def test_indexes(self) -> None:
+        # The selectors of the app are served from the indexes.
+        self.assertEqual(
+            [index["fields"] for index in db.Test._meta["index_specs"]],
+            [[("timestamp", -1), ("name", 1)], [("uuid", 1)]],
+        )
+
+        connection = db._backend._connection
+        db.Test.objects.count()
+        plan = connection.execute('EXPLAIN QUERY PLAN SELECT DISTINCT "timestamp" FROM "test"').fetchall()
+        self.assertIn("COVERING INDEX test_timestamp_name", plan[0][-1])
+
+    def test_unknown_field(self) -> None:
+        with self.assertRaises(ValueError):
+            db.Test.objects(times=[0.0]).first()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,895 @@
+import gc
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+import nidaqmx.utils
+from nidaqmx.constants import READ_ALL_AVAILABLE, AcquisitionType
+from nidaqmx.error_codes import DAQmxErrors
+from nidaqmx.errors import DaqError
+
+from mock_nidaqmx import DAQ
+from mock_nidaqmx.clock import VirtualClock
+from mock_nidaqmx.daq import AI_SCALING_COEFF, AIChannel, DIChannel
+from mock_nidaqmx.histogram import LogHistogram
+from mock_nidaqmx.instrumentation import Instrumentation
+from mock_nidaqmx.pacer import Pacer
+from mock_nidaqmx.recording import Recording
+from mock_nidaqmx.replay import ReplayDevice
+from mock_nidaqmx.signals import (
+    AnalogSquareWave,
+    Drift,
+    EdgeJitter,
+    GaussianNoise,
+    Glitches,
+    RandomToggles,
+    SineWave,
+    Signal,
+    SquareWave,
+    StuckAt,
+)
+from mock_nidaqmx.stream_readers import AnalogMultiChannelReader, AnalogUnscaledReader, DigitalMultiChannelReader
+from mock_nidaqmx.utils import ChannelRange, flatten_channel_string, parse_channel_string, unflatten_channel_string
+
+RATE = 20_000  # In samples per second
+
+
+class TestBulkRead(unittest.TestCase):
+    """
+    Test the vectorized read path of the mock DAQ.
+    """
+
+    def test_analog_reader(self) -> None:
+        with DAQ().Task() as task:
+            task.ai_channels.add_ai_voltage_chan("Dev1/ai0:7")
+
+            # Fill a caller-supplied buffer.
+            data = np.empty((8, 1_000))
+            samples = AnalogMultiChannelReader(task.in_stream).read_many_sample(data, 1_000)
+
+            self.assertEqual(samples, 1_000)
+            self.assertTrue(np.all((data >= -5) & (data <= 5)))
+
+    def test_digital_reader(self) -> None:
+        with DAQ().Task() as task:
+            task.di_channels.add_di_chan("Dev1/port0/line0:12")
+
+            # Allocate a new buffer with the task dtype.
+            data = task.in_stream.read_many(1_000)
+
+            self.assertEqual(data.shape, (13, 1_000))
+            self.assertEqual(data.dtype, np.uint8)
+            self.assertTrue(np.all(data <= 1))
+
+            # Arrays with the wrong shape are rejected.
+            with self.assertRaises(DaqError):
+                DigitalMultiChannelReader(task.in_stream).read_many_sample_port_byte(np.empty((1, 10), np.uint8), 10)
+
+            # Arrays with the wrong dtype too.
+            with self.assertRaises(DaqError):
+                DigitalMultiChannelReader(task.in_stream).read_many_sample_port_byte(np.empty((13, 10)), 10)
+
+    def test_mixed_channels(self) -> None:
+        with DAQ().Task() as task:
+            task.ai_channels.add_ai_voltage_chan("Dev1/ai0:1")
+            task.di_channels.add_di_chan("Dev1/port0/line0:2")
+
+            # Rows follow the order the channels were added, in a dtype that
+            # holds every kind of sample.
+            data = task.in_stream.read_many(100)
+
+            self.assertEqual(data.shape, (5, 100))
+            self.assertEqual(data.dtype, np.float64)
+            self.assertTrue(np.all(np.abs(data[:2]) <= 5))
+            self.assertTrue(np.all((data[2:] == 0) | (data[2:] == 1)))
+
+    def test_matches_task_read(self) -> None:
+        reads = []
+        for read in ("task", "read_many", "readers"):
+            with DAQ(seed=0).Task() as task:
+                task.ai_channels.add_ai_voltage_chan("Dev1/ai0:3")
+
+                # The same seed gives the same samples, whatever the read path.
+                if read == "task":
+                    reads.append(np.array(task.read(100)))
+                elif read == "read_many":
+                    reads.append(task.in_stream.read_many(100))
+                else:
+                    data = np.empty((4, 100))
+                    AnalogMultiChannelReader(task.in_stream).read_many_sample(data, 100)
+                    reads.append(data)
+
+        self.assertEqual(reads[0].shape, (4, 100))
+        np.testing.assert_array_equal(reads[1], reads[0])
+        np.testing.assert_array_equal(reads[2], reads[0])
+
+        with DAQ(seed=0).Task() as task:
+            task.di_channels.add_di_chan("Dev1/port0/line0:3")
+            expected = task.read(100)
+
+        with DAQ(seed=0).Task() as task:
+            task.di_channels.add_di_chan("Dev1/port0/line0:3")
+            data = np.empty((4, 100), dtype=np.uint8)
+            DigitalMultiChannelReader(task.in_stream).read_many_sample_port_byte(data, 100)
+
+        self.assertEqual(data.tolist(), expected)
+
+
+class TestHardwareTimedRead(unittest.TestCase):
+    """
+    Test the buffered acquisition driven by the simulated Sample Clock.
+    """
+
+    def test_finite(self) -> None:
+        with DAQ().Task() as task:
+            task.di_channels.add_di_chan("Dev1/0")
+            task.timing.cfg_samp_clk_timing(RATE, samps_per_chan=1_000)
+
+            # Every sample is read only once the Sample Clock ticked it.
+            task.start()
+            data = task.in_stream.read_many(READ_ALL_AVAILABLE)
+            elapsed = time.perf_counter() - task.in_stream.start_time
+
+            self.assertEqual(data.shape, (1, 1_000))
+            self.assertGreaterEqual(elapsed, 1_000 / RATE)
+            self.assertTrue(task.is_task_done())
+
+            # Reading past the last sample fails.
+            with self.assertRaises(DaqError) as context:
+                task.read()
+
+            self.assertEqual(context.exception.error_type, DAQmxErrors.SAMPLES_WILL_NEVER_BE_AVAILABLE)
+
+    def test_timestamps(self) -> None:
+        with DAQ().Task() as task:
+            task.di_channels.add_di_chan("Dev1/0")
+            task.timing.cfg_samp_clk_timing(RATE, sample_mode=AcquisitionType.CONTINUOUS)
+
+            task.read(100)
+            first = task.in_stream.curr_read_pos
+            times = task.in_stream.sample_times(first, 100)
+
+            self.assertEqual(first, 100)
+            np.testing.assert_allclose(np.diff(times), 1 / RATE)
+            self.assertAlmostEqual(times[0], task.in_stream.start_time + 100 / RATE)
+
+    def test_timeout(self) -> None:
+        with DAQ().Task() as task:
+            task.di_channels.add_di_chan("Dev1/0")
+            task.timing.cfg_samp_clk_timing(RATE, sample_mode=AcquisitionType.CONTINUOUS)
+
+            with self.assertRaises(DaqError) as context:
+                task.read(RATE, timeout=0.01)
+
+            self.assertEqual(context.exception.error_type, DAQmxErrors.SAMPLES_NOT_YET_AVAILABLE)
+
+    def test_overrun(self) -> None:
+        with DAQ().Task() as task:
+            task.di_channels.add_di_chan("Dev1/0")
+            task.timing.cfg_samp_clk_timing(RATE, sample_mode=AcquisitionType.CONTINUOUS)
+            task.in_stream.input_buf_size = 100
+
+            # Let the Sample Clock wrap around the buffer before reading.
+            task.start()
+            time.sleep(0.05)
+
+            with self.assertRaises(DaqError) as context:
+                task.read(10)
+
+            self.assertEqual(context.exception.error_type, DAQmxErrors.SAMPLES_NO_LONGER_AVAILABLE)
+
+
+class TestEveryNSamplesEvent(unittest.TestCase):
+    """
+    Test the callbacks fired by the background producer.
+    """
+
+    def test_callback(self) -> None:
+        blocks = []
+
+        def callback(task, event_type, number_of_samples, callback_data) -> int:
+            blocks.append(task.in_stream.read_many(number_of_samples))
+            return 0
+
+        with DAQ().Task() as task:
+            task.di_channels.add_di_chan("Dev1/port0/line0:3")
+            task.timing.cfg_samp_clk_timing(RATE, sample_mode=AcquisitionType.CONTINUOUS)
+            task.register_every_n_samples_acquired_into_buffer_event(200, callback)
+
+            task.start()
+            time.sleep(0.1)
+            task.stop()
+
+        self.assertGreater(len(blocks), 0)
+        self.assertEqual(blocks[0].shape, (4, 200))
+
+    def test_slow_consumer(self) -> None:
+        def callback(task, event_type, number_of_samples, callback_data) -> int:
+            time.sleep(0.02)
+            return 0
+
+        with DAQ().Task() as task:
+            task.di_channels.add_di_chan("Dev1/0")
+            task.timing.cfg_samp_clk_timing(RATE, sample_mode=AcquisitionType.CONTINUOUS)
+            task.in_stream.input_buf_size = 200
+            task.register_every_n_samples_acquired_into_buffer_event(100, callback)
+
+            # The callback never reads, so the buffer wraps around.
+            task.start()
+            time.sleep(0.05)
+
+            self.assertTrue(task.in_stream.overrun)
+
+
+class TestVirtualClock(unittest.TestCase):
+    """
+    Test that tasks on a virtual clock run faster than real time and repeatably.
+    """
+
+    def capture(self) -> tuple[np.ndarray, int, float]:
+        events = []
+        clock = VirtualClock()
+
+        with DAQ(clock=clock, seed=1).Task() as task:
+            task.di_channels.add_di_chan("Dev1/port0/line0:3")
+            task.timing.cfg_samp_clk_timing(RATE, sample_mode=AcquisitionType.CONTINUOUS)
+            task.register_every_n_samples_acquired_into_buffer_event(RATE, lambda *args: events.append(args))
+
+            # Capture a minute of samples.
+            data = np.concatenate([task.in_stream.read_many(RATE) for _ in range(60)], axis=1)
+
+        return data, len(events), clock.now
+
+    def test_capture(self) -> None:
+        start = time.perf_counter()
+        data, events, now = self.capture()
+
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertAlmostEqual(now, 60)
+        self.assertEqual(events, 60)
+
+        # The same seed generates the same samples.
+        np.testing.assert_array_equal(data, self.capture()[0])
+
+
+class TestSignals(unittest.TestCase):
+    """
+    Test the vectorized signal generators and impairments.
+    """
+
+    def capture(self, signal: Signal, seconds: float = 10, block: int = 4_096) -> np.ndarray:
+        rng = np.random.default_rng(0)
+        times = np.arange(int(seconds * RATE)) / RATE
+
+        # Generate the signal in blocks, as the Sample Clock does.
+        return np.concatenate([signal.generate(times[i : i + block], rng) for i in range(0, len(times), block)])
+
+    def test_square_wave(self) -> None:
+        samples = self.capture(SquareWave(2, duty_cycle=0.25))
+        edges = np.flatnonzero(np.diff(samples)) + 1
+
+        # HIGH for 0.5s and LOW for 1.5s, starting LOW.
+        np.testing.assert_array_equal(edges, np.cumsum([1.5, 0.5, 1.5, 0.5, 1.5, 0.5, 1.5, 0.5, 1.5]) * RATE)
+        self.assertEqual(samples[0], 0)
+
+    def test_edge_jitter(self) -> None:
+        samples = self.capture(SquareWave(2, impairments=(EdgeJitter(0.02),)))
+        durations = np.diff(np.flatnonzero(np.diff(samples))) / RATE
+
+        self.assertTrue(np.all(np.abs(durations - 1) <= 0.02 + 1 / RATE))
+        self.assertTrue(np.any(np.abs(durations - 1) > 0.001))
+
+    def test_toggles_and_glitches(self) -> None:
+        clean = self.capture(SquareWave(2))
+        toggled = self.capture(SquareWave(2, impairments=(RandomToggles(1 / RATE),)))
+        glitched = self.capture(SquareWave(2, impairments=(Glitches(1 / RATE),)))
+
+        # Toggles invert the signal for a while, glitches for single samples.
+        self.assertGreater(np.count_nonzero(toggled != clean), RATE / 100)
+        self.assertLess(np.count_nonzero(glitched != clean), RATE / 100)
+        self.assertGreater(np.count_nonzero(glitched != clean), 0)
+
+    def test_stuck_at(self) -> None:
+        samples = self.capture(SquareWave(2, impairments=(StuckAt(1, 3, 4),)))
+
+        self.assertTrue(np.all(samples[3 * RATE : 7 * RATE] == 1))
+        self.assertFalse(np.all(samples[7 * RATE :] == 1))
+
+    def test_sine_wave(self) -> None:
+        samples = self.capture(SineWave(50, amplitude=2, offset=1), seconds=1)
+        times = np.arange(RATE) / RATE
+
+        np.testing.assert_allclose(samples, 1 + 2 * np.sin(2 * np.pi * 50 * times), atol=1e-9)
+
+    def test_analog_square_wave(self) -> None:
+        samples = self.capture(AnalogSquareWave(2, low=-1, high=4, duty_cycle=0.25, rise_time=0.01))
+
+        # The edges start at the nominal times and cross the middle level
+        # half the rise time late, so the duty cycle is kept.
+        crossings = (np.flatnonzero(np.diff(samples > 1.5)) + 1) / RATE
+        edges = np.cumsum([1.5, 0.5, 1.5, 0.5, 1.5, 0.5, 1.5, 0.5, 1.5])
+        np.testing.assert_allclose(crossings, edges + 0.005, atol=1 / RATE)
+        self.assertEqual((samples.min(), samples.max()), (-1, 4))
+        self.assertAlmostEqual(samples[int(1.5 * RATE) + 50], 1.5 - 2.5 / 2)
+
+        # Instant edges are steps.
+        self.assertEqual(len(np.unique(self.capture(AnalogSquareWave(2), seconds=4))), 2)
+
+    def test_noise_and_drift(self) -> None:
+        noisy = self.capture(SineWave(10, impairments=(GaussianNoise(0.1),)), seconds=1)
+        drifting = self.capture(SineWave(10, impairments=(Drift(0.5),)), seconds=4)
+        clean = self.capture(SineWave(10), seconds=4)
+
+        self.assertAlmostEqual(np.std(noisy - clean[:RATE]), 0.1, delta=0.005)
+        np.testing.assert_allclose(drifting - clean, 0.5 * np.arange(4 * RATE) / RATE)
+
+    def test_connect(self) -> None:
+        device = DAQ(clock=VirtualClock(), seed=1)
+        device.connect("Dev1/port0/line0:1", SquareWave(0.1))
+
+        with device.Task() as task:
+            task.di_channels.add_di_chan("Dev1/port0/line0:2")
+            task.timing.cfg_samp_clk_timing(RATE, samps_per_chan=RATE)
+            data = task.in_stream.read_many(RATE)
+
+        # Both wired lines sample the wave, the last one is random.
+        self.assertEqual(np.count_nonzero(np.diff(data[0])), 19)
+        np.testing.assert_array_equal(data[0], data[1])
+        self.assertGreater(np.count_nonzero(np.diff(data[2])), 1_000)
+
+
+class TestChannelTable(unittest.TestCase):
+    """
+    Test the channels of a Task, stored as a table.
+    """
+
+    def test_lookup(self) -> None:
+        with DAQ(seed=0).Task() as task:
+            task.ai_channels.add_ai_voltage_chan("Dev1/ai0:7")
+            task.di_channels.add_di_chan("Dev1/port0/line0:1")
+
+            self.assertEqual(len(task.channels), 10)
+            self.assertIn("Dev1/ai3", task.channels)
+            self.assertEqual(task.channels.index("Dev1/port0/line1"), 9)
+            self.assertIsInstance(task.channels["Dev1/ai3"], AIChannel)
+            self.assertEqual(task.channels["Dev1/ai3"].name, "Dev1/ai3")
+            self.assertIsInstance(task.channels[-1], DIChannel)
+            self.assertEqual([channel.name for channel in task.channels][:2], ["Dev1/ai0", "Dev1/ai1"])
+            self.assertEqual(task.in_stream.dtype, np.float64)
+
+            with self.assertRaises(KeyError):
+                task.channels["Dev1/ai8"]
+
+            # The same channel can't be added twice.
+            with self.assertRaises(DaqError) as context:
+                task.ai_channels.add_ai_voltage_chan("Dev1/ai7")
+            self.assertEqual(context.exception.error_code, DAQmxErrors.CHAN_ALREADY_IN_TASK)
+
+        self.assertEqual(len(task.channels), 0)
+
+    def test_groups(self) -> None:
+        device = DAQ(seed=0)
+        device.connect("Dev1/port0/line1", SquareWave(0.1))
+
+        with device.Task() as task:
+            task.di_channels.add_di_chan("Dev1/port0/line0:3")
+            task.ai_channels.add_ai_voltage_chan("Dev1/ai0:1")
+            wired, batches = task.channels.groups
+
+            # Each kind of channel is generated as a single batch.
+            self.assertEqual([row for row, _ in wired], [1])
+            self.assertEqual(batches[0][0], AIChannel)
+            self.assertEqual((batches[0][1], batches[0][2]), (slice(4, 6), 2))
+            self.assertEqual(batches[1][0], DIChannel)
+            np.testing.assert_array_equal(batches[1][1], [0, 2, 3])
+
+            data = task.in_stream.read_many(10)
+            self.assertTrue(np.all((data[[0, 2, 3]] == 0) | (data[[0, 2, 3]] == 1)))
+            self.assertTrue(np.all(np.abs(data[4:]) <= 5))
+
+    def test_single_read(self) -> None:
+        with DAQ(seed=0).Task() as task:
+            task.ai_channels.add_ai_voltage_chan("Dev1/ai0")
+            task.di_channels.add_di_chan("Dev1/0")
+            (analog,), (digital,) = task.read()
+
+        self.assertLessEqual(abs(analog), 5)
+        self.assertIn(digital, (0, 1))
+
+
+class TestChannelStrings(unittest.TestCase):
+    """
+    Test the channel string parsing against the original 'nidaqmx' module.
+    """
+
+    CHANNELS = (
+        "",
+        "Dev1/ai0",
+        "Dev1/ai0:7",
+        "Dev1/ai7:0",
+        "Dev1/ai008:010, Dev1/ai3:1,Dev1/port0/line0",
+        "Dev1/ai0:Dev1/ai3",
+        "Dev1/ai09:11",
+        "Dev1/ai00:2",
+        "Dev1/ai10:08",
+        "Dev1/port0/line0:12, Dev2/port1/line5",
+        " Dev1/ai0 ,, Dev1/ai1:1,",
+        "cDAQ1Mod1/ai0:3,cDAQ1Mod2/ai2",
+        "Voltage, Current",
+        "0:3",
+        "Dev1/ai0:14998",
+    )
+
+    def test_unflatten(self) -> None:
+        for channels in self.CHANNELS:
+            with self.subTest(channels=channels):
+                self.assertEqual(unflatten_channel_string(channels), nidaqmx.utils.unflatten_channel_string(channels))
+
+    def test_flatten(self) -> None:
+        for channels in self.CHANNELS:
+            names = nidaqmx.utils.unflatten_channel_string(channels)
+            with self.subTest(channels=channels):
+                self.assertEqual(flatten_channel_string(names), nidaqmx.utils.flatten_channel_string(names))
+                self.assertEqual(flatten_channel_string([channels]), nidaqmx.utils.flatten_channel_string([channels]))
+
+    def test_invalid(self) -> None:
+        for channels in ("Dev1/ai0:", "Dev1/ai:3", "Dev1/ai0:Dev2/ai3", "Dev1/ai0:15000"):
+            with self.subTest(channels=channels):
+                with self.assertRaises(DaqError) as context:
+                    parse_channel_string(channels)
+                self.assertEqual(context.exception.error_code, -200498)
+
+    def test_lazy_range(self) -> None:
+        channels = parse_channel_string("Dev1/ai3, Dev1/ai0014998:1")
+
+        # The range is kept as a single part, the names are built on access.
+        self.assertEqual(channels.parts, ("Dev1/ai3", ChannelRange("Dev1/ai", 14998, 1, width=7)))
+        self.assertEqual(len(channels), 14_999)
+        self.assertEqual((channels[0], channels[1], channels[-1]), ("Dev1/ai3", "Dev1/ai0014998", "Dev1/ai0000001"))
+        self.assertEqual(channels[1:4], ["Dev1/ai0014998", "Dev1/ai0014997", "Dev1/ai0014996"])
+        self.assertEqual(list(channels)[-2:], ["Dev1/ai0000002", "Dev1/ai0000001"])
+        with self.assertRaises(IndexError):
+            channels[14_999]
+
+        # The parsed strings are cached.
+        self.assertIs(parse_channel_string("Dev1/ai3, Dev1/ai0014998:1"), channels)
+
+
+class TestLogHistogram(unittest.TestCase):
+    """
+    Test the log bucketed histogram of the gaps between reads.
+    """
+
+    def test_percentiles(self) -> None:
+        values = np.random.default_rng(0).lognormal(-9, 1, 100_000)
+        histogram = LogHistogram()
+        for value in values[:50_000]:
+            histogram.record(value)
+        histogram.record_many(values[50_000:])
+
+        # Percentiles are never underestimated, and are within a bucket.
+        for percentile in (50, 99, 99.9):
+            exact = np.percentile(values, percentile)
+            self.assertGreaterEqual(histogram.percentile(percentile), exact)
+            self.assertLessEqual(histogram.percentile(percentile), exact * (1 + 1 / histogram.sub_buckets))
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot["count"], 100_000)
+        self.assertEqual(snapshot["max"], values.max())
+        self.assertEqual(histogram.percentile(100), values.max())
+        self.assertAlmostEqual(snapshot["mean"], values.mean())
+
+    def test_count_above(self) -> None:
+        histogram = LogHistogram()
+        histogram.record_many(np.full(550_000, 2e-5))
+        histogram.record_many(np.full(11, 0.03))
+
+        # Rare long values are counted even when no percentile shows them.
+        self.assertEqual(histogram.count_above(0.01), 11)
+        self.assertLess(histogram.percentile(99.9), 0.01)
+        self.assertEqual(histogram.count_above(1e-5), 550_011)
+        self.assertEqual(histogram.count_above(0.05), 0)
+
+        # Values within the bucket of the threshold are counted, never missed.
+        self.assertEqual(histogram.count_above(0.0299), 11)
+
+    def test_out_of_range(self) -> None:
+        histogram = LogHistogram(min_value=1e-6, max_value=1)
+        histogram.record_many([0, 1e-9, 10])
+        histogram.record(0)
+
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.counts[0], 3)
+        self.assertEqual(histogram.counts[-1], 1)
+        self.assertLessEqual(histogram.percentile(50), 1e-6)
+        self.assertEqual(histogram.percentile(100), 10)
+
+    def test_merge(self) -> None:
+        first, second = LogHistogram(), LogHistogram()
+        first.record(0.001)
+        second.record_many([0.002, 0.03])
+        first.merge(second)
+
+        self.assertEqual((first.count, first.min, first.max), (3, 0.001, 0.03))
+        self.assertTrue(np.isnan(LogHistogram().percentile(50)))
+
+
+class TestInstrumentation(unittest.TestCase):
+    """
+    Test the opt-in metrics of the reads.
+    """
+
+    def test_reads(self) -> None:
+        with Instrumentation() as metrics:
+            device = DAQ(clock=VirtualClock(), seed=0, instrumentation=metrics)
+
+            with device.Task() as task:
+                task.di_channels.add_di_chan("Dev1/port0/line0:1")
+                task.read()
+
+                task.timing.cfg_samp_clk_timing(RATE, sample_mode=AcquisitionType.CONTINUOUS)
+                data = np.empty((2, 100), dtype=np.uint8)
+                reader = DigitalMultiChannelReader(task.in_stream)
+                for _ in range(3):
+                    with metrics.phase("analysis"):
+                        reader.read_many_sample_port_byte(data, 100)
+
+            # Garbage collections are recorded while the metrics run.
+            self.assertIn(metrics._on_gc, gc.callbacks)
+            gc.collect()
+
+        self.assertNotIn(metrics._on_gc, gc.callbacks)
+
+        snapshot = json.loads(metrics.to_json())
+        self.assertEqual((snapshot["reads"], snapshot["samples"]), (4, 301))
+        self.assertEqual(snapshot["read_latency"]["count"], 4)
+        self.assertEqual(snapshot["phases"]["analysis"]["count"], 3)
+        self.assertGreaterEqual(snapshot["gc"]["collections"][2], 1)
+        self.assertGreater(snapshot["duration"], 0)
+
+    def test_disabled(self) -> None:
+        with DAQ(seed=0).Task() as task:
+            task.di_channels.add_di_chan("Dev1/0")
+            task.read()
+
+            self.assertIsNone(task.instrumentation)
+
+        # Undefined stats are exported as null.
+        snapshot = json.loads(Instrumentation().to_json())
+        self.assertIsNone(snapshot["read_latency"]["p50"])
+        self.assertIsNone(snapshot["duration"])
+
+
+class TestPacer(unittest.TestCase):
+    """
+    Test the pacing of loops against absolute deadlines.
+    """
+
+    def test_rate(self) -> None:
+        clock = VirtualClock(start=5)
+        pacer = Pacer(1_000, clock)
+
+        # The loop takes some time, which doesn't delay the next deadline.
+        for _ in range(100):
+            self.assertTrue(pacer.wait())
+            clock.advance(0.0003)
+
+        self.assertAlmostEqual(clock.now, 5.1003)
+        self.assertEqual((pacer.ticks, pacer.missed), (100, 0))
+        self.assertAlmostEqual(pacer.achieved_rate, 100 / 0.1003)
+
+    def test_missed_deadlines(self) -> None:
+        clock = VirtualClock()
+        pacer = Pacer(1_000, clock)
+        pacer.wait()
+
+        # A stall of 3.5 periods misses the next deadline and skips 2 more.
+        clock.advance(0.0035)
+        self.assertFalse(pacer.wait())
+        self.assertEqual((pacer.ticks, pacer.missed, pacer.skipped), (4, 1, 2))
+
+        # The schedule resumes at the next deadline in the future.
+        self.assertTrue(pacer.wait())
+        self.assertAlmostEqual(clock.now, 0.005)
+        self.assertIn("1 missed deadlines (33.33%), 2 skipped", pacer.report())
+
+    def test_tolerance(self) -> None:
+        clock = VirtualClock()
+        pacer = Pacer(1_000, clock, tolerance=0.25)
+        pacer.wait()
+
+        # Iterations late by less than the tolerance meet their deadline and
+        # run right away, their lateness is still recorded.
+        clock.advance(0.0012)
+        self.assertTrue(pacer.wait())
+        self.assertAlmostEqual(clock.now, 0.0022)
+        self.assertEqual(pacer.missed, 0)
+        self.assertAlmostEqual(pacer.lateness.max, 0.0002)
+
+        # Later ones miss it.
+        clock.advance(0.0011)
+        self.assertFalse(pacer.wait())
+        self.assertEqual((pacer.ticks, pacer.missed, pacer.skipped), (3, 1, 0))
+
+    def test_no_drift(self) -> None:
+        clock = VirtualClock(start=5)
+        pacer = Pacer(2_000, clock)
+        rng = np.random.default_rng(0)
+
+        # Loops that take a different time on each iteration, up to 90% of
+        # the period, don't delay the deadlines that follow.
+        for _ in range(10_000):
+            self.assertTrue(pacer.wait())
+            clock.advance(rng.uniform(0, 0.9 / pacer.rate))
+
+        # The next wait returns exactly at the 10,001st deadline, there is no
+        # drift to accumulate.
+        pacer.wait()
+        self.assertAlmostEqual(clock.now, 5 + 10_001 / 2_000, places=9)
+        self.assertEqual((pacer.ticks, pacer.missed, pacer.skipped), (10_001, 0, 0))
+        self.assertAlmostEqual(pacer.ticks / pacer.rate, 5.0005, places=9)
+
+    def test_real_time(self) -> None:
+        pacer = Pacer(2_000)
+        start = time.perf_counter()
+        for _ in range(100):
+            pacer.wait()
+
+        # Deadlines are absolute, so the last wait returns right after the
+        # last deadline, 50ms after the start unless the OS stalled the loop
+        # and deadlines were skipped.
+        elapsed = time.perf_counter() - start
+        self.assertGreaterEqual(elapsed, 0.05)
+        self.assertGreaterEqual(elapsed, pacer.ticks / pacer.rate)
+        self.assertEqual(pacer.ticks - pacer.skipped, 100)
+        self.assertLess(pacer.lateness.percentile(50), 0.001)
+
+
+class TestRecordAndReplay(unittest.TestCase):
+    """
+    Test the recording of the reads and their replay.
+    """
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name, "capture.daqrec")
+
+    def record(self) -> tuple[np.ndarray, np.ndarray]:
+        """Record reads of different sizes from a wired and a random channel."""
+
+        device = DAQ(clock=VirtualClock(), seed=0)
+        device.connect("Dev1/port0/line0", SquareWave(0.1, impairments=(EdgeJitter(0.01),)))
+
+        with device.Task() as task:
+            task.di_channels.add_di_chan("Dev1/port0/line0:1")
+            task.timing.cfg_samp_clk_timing(RATE, sample_mode=AcquisitionType.CONTINUOUS)
+            task.record(self.path)
+
+            data = np.concatenate([task.in_stream.read_many(size) for size in (100, 2_500, 0, 400)], axis=1)
+            times = task.in_stream.sample_times(0, data.shape[1])
+
+        return data, times
+
+    def test_recording(self) -> None:
+        data, _ = self.record()
+
+        with Recording(self.path) as recording:
+            self.assertEqual(recording.channels, ["Dev1/port0/line0", "Dev1/port0/line1"])
+            self.assertEqual((recording.dtype, recording.rate, recording.start_time), (np.uint8, RATE, 0))
+            self.assertEqual((len(recording), recording.length), (4, 3_000))
+            np.testing.assert_array_equal(recording.counts, [100, 2_500, 0, 400])
+            np.testing.assert_array_equal(recording.times, [100 / RATE, 0.13, 0.13, 0.15])
+            np.testing.assert_array_equal(recording.read(1), data[:, 100:2_600])
+            np.testing.assert_array_equal(recording.samples(50, 2_700), data[:, 50:2_700])
+
+        # The samples are stored raw, next to a small header per read.
+        self.assertLess(self.path.stat().st_size, data.nbytes + 300)
+
+    def test_replay(self) -> None:
+        data, times = self.record()
+
+        with ReplayDevice(self.path) as device, device.Task() as task:
+            task.di_channels.add_di_chan("Dev1/port0/line0:1")
+            task.timing.cfg_samp_clk_timing(RATE, sample_mode=AcquisitionType.CONTINUOUS)
+            reader = DigitalMultiChannelReader(task.in_stream)
+
+            # The reads don't need to match the recorded ones.
+            replayed = np.empty((2, 1_000), dtype=np.uint8)
+            for i in range(3):
+                reader.read_many_sample_port_byte(replayed, 1_000)
+                np.testing.assert_array_equal(replayed, data[:, i * 1_000 : (i + 1) * 1_000])
+
+            np.testing.assert_array_equal(task.in_stream.sample_times(0, 3_000), times)
+
+            with self.assertRaises(DaqError) as context:
+                task.in_stream.read_many(1)
+            self.assertEqual(context.exception.error_code, DAQmxErrors.SAMPLES_WILL_NEVER_BE_AVAILABLE)
+
+    def test_original_pace(self) -> None:
+        data, _ = self.record()
+        clock = VirtualClock(start=10)
+
+        with ReplayDevice(self.path, pace=True, clock=clock) as device, device.Task() as task:
+            task.di_channels.add_di_chan("Dev1/port0/line0:1")
+            task.timing.cfg_samp_clk_timing(RATE, sample_mode=AcquisitionType.CONTINUOUS)
+
+            # Each read waits for the recorded read that held its last sample.
+            task.in_stream.read_many(50)
+            self.assertEqual(clock.now, 10)
+            task.in_stream.read_many(100)
+            self.assertAlmostEqual(clock.now, 10.125)
+            task.in_stream.read_many(READ_ALL_AVAILABLE)
+            self.assertAlmostEqual(clock.now, 10.145)
+
+    def test_software_timed(self) -> None:
+        with DAQ(seed=0).Task() as task:
+            task.di_channels.add_di_chan("Dev1/0")
+            task.record(self.path)
+            reads = [task.read() for _ in range(5)]
+
+        with ReplayDevice(self.path) as device, device.Task() as task:
+            task.di_channels.add_di_chan("Dev1/0")
+            self.assertEqual([task.read() for _ in range(5)], reads)
+
+        with self.assertRaises(DaqError):
+            with ReplayDevice(self.path) as device, device.Task() as task:
+                task.di_channels.add_di_chan("Dev1/1")
+                task.read()
+
+    def test_mixed_reads(self) -> None:
+        with DAQ(seed=0).Task() as task:
+            task.ai_channels.add_ai_voltage_chan("Dev1/ai0:1")
+            task.record(self.path)
+            volts = task.in_stream.read_many(100)
+
+            # Raw codes would replay as volts, they can't be recorded after them.
+            with self.assertRaises(DaqError):
+                task.read_raw(100)
+
+        with Recording(self.path) as recording:
+            self.assertEqual((recording.dtype, len(recording)), (np.float64, 1))
+            np.testing.assert_array_equal(recording.read(0), volts)
+
+    def test_truncated(self) -> None:
+        data, _ = self.record()
+        content = self.path.read_bytes()
+
+        # A recording interrupted within the samples or the header of its
+        # last read holds the reads before it only.
+        for size in (len(content) - 10, len(content) - 400 * 2 - 5):
+            self.path.write_bytes(content[:size])
+
+            with Recording(self.path) as recording:
+                np.testing.assert_array_equal(recording.counts, [100, 2_500, 0])
+                np.testing.assert_array_equal(recording.samples(0, 3_000), data[:, :2_600])
+
+    def test_close(self) -> None:
+        data, _ = self.record()
+
+        # The samples served are views of the file, it stays mapped until
+        # they are released.
+        with Recording(self.path) as recording:
+            samples = recording.read(0)
+            with self.assertRaises(BufferError):
+                recording.close()
+
+            np.testing.assert_array_equal(samples, data[:, :100])
+            del samples
+
+        with self.assertRaises(ValueError):
+            recording.read(0)
+
+        # Closing a device closes its recording, the replay tasks copy the
+        # samples they serve so they can still be used.
+        with ReplayDevice(self.path) as device, device.Task() as task:
+            task.di_channels.add_di_chan("Dev1/port0/line0:1")
+            task.timing.cfg_samp_clk_timing(RATE, sample_mode=AcquisitionType.CONTINUOUS)
+            replayed = task.in_stream.read_many(100)
+
+        np.testing.assert_array_equal(replayed, data[:, :100])
+        with self.assertRaises(ValueError):
+            device.recording.read(0)
+
+        # Files that are not recordings are rejected.
+        self.path.write_bytes(b"not a recording")
+        with self.assertRaisesRegex(ValueError, "is not a recording of the mock DAQ"):
+            Recording(self.path)
+
+
+class TestRawRead(unittest.TestCase):
+    """
+    Test the raw 14bit ADC codes of the analog channels and their scaling.
+    """
+
+    def test_scale(self) -> None:
+        codes = np.arange(-8192, 8192, dtype=np.int16)
+
+        # Any polynomial, scalars are scaled the same way as arrays.
+        coefficients = (0.1, 1e-3, 2e-8, -3e-12)
+        expected = np.polynomial.polynomial.polyval(codes, coefficients)
+        np.testing.assert_allclose(AIChannel.scale(codes, coefficients), expected)
+        self.assertAlmostEqual(AIChannel.scale(1_000, coefficients), 1.117)
+
+        # The nominal coefficients span the ±5 V range.
+        volts = AIChannel.scale(codes)
+        self.assertEqual((volts[0], volts[-1]), (-5, 5 - 10 / 2**14))
+        np.testing.assert_array_equal(AIChannel.to_raw(volts), codes)
+        np.testing.assert_array_equal(AIChannel.to_raw([-7, 7, 1e-4]), [-8192, 8191, 0])
+
+    def test_unscaled_reader(self) -> None:
+        scaled, raw = [], []
+        for read_raw in (False, True):
+            with DAQ(seed=0).Task() as task:
+                task.ai_channels.add_ai_voltage_chan("Dev1/ai0:3")
+                task.di_channels.add_di_chan("Dev1/0")
+                task.ai_channels.add_ai_voltage_chan("Dev1/ai4")
+
+                if read_raw:
+                    raw = task.read_raw(1_000)
+                else:
+                    scaled = task.in_stream.read_many(1_000)
+
+        # The same samples, scaled or not.
+        self.assertEqual(raw.dtype, np.int16)
+        self.assertTrue(np.all((raw >= -8192) & (raw <= 8191)))
+        np.testing.assert_array_equal(AIChannel.scale(raw[[0, 1, 2, 3, 5]]), scaled[[0, 1, 2, 3, 5]])
+        np.testing.assert_array_equal(raw[4], scaled[4])
+
+        with DAQ(seed=0).Task() as task:
+            task.ai_channels.add_ai_voltage_chan("Dev1/ai0:7")
+            data = np.empty((8, 1_000), dtype=np.int16)
+
+            self.assertEqual(AnalogUnscaledReader(task.in_stream).read_int16(data, 1_000), 1_000)
+            self.assertGreater(len(np.unique(data)), 1_000)
+
+            # Scaled arrays are rejected.
+            with self.assertRaises(DaqError):
+                AnalogUnscaledReader(task.in_stream).read_int16(np.empty((8, 1_000)), 1_000)
+
+    def test_calibration(self) -> None:
+        device = DAQ(clock=VirtualClock(), seed=0)
+        device.connect("Dev1/ai0:1", SineWave(50, amplitude=4))
+        device.calibrate("Dev1/ai1", (0.5, 2e-3, 0.0, 0.0))
+
+        with device.Task() as task:
+            task.ai_channels.add_ai_voltage_chan("Dev1/ai0:2")
+            task.timing.cfg_samp_clk_timing(RATE, samps_per_chan=RATE)
+            data = task.in_stream.read_many(RATE)
+
+            self.assertEqual(task.channels["Dev1/ai0"].ai_dev_scaling_coeff, list(AI_SCALING_COEFF))
+            self.assertEqual(task.channels["Dev1/ai1"].ai_dev_scaling_coeff, [0.5, 2e-3])
+
+        # The wave is quantized by the ADC, and each channel scales the same
+        # codes with its own coefficients.
+        wave = 4 * np.sin(2 * np.pi * 50 * np.arange(RATE) / RATE)
+        self.assertLessEqual(np.max(np.abs(data[0] - wave)), AI_SCALING_COEFF[1] / 2)
+        np.testing.assert_allclose(data[1], 0.5 + 2e-3 * data[0] / AI_SCALING_COEFF[1])
+        self.assertTrue(np.all(np.abs(data[2]) <= 5))
+
+    def test_replay(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "capture.daqrec"
+
+            with DAQ(seed=0).Task() as task:
+                task.ai_channels.add_ai_voltage_chan("Dev1/ai0:1")
+                task.record(path)
+                raw = task.read_raw(100)
+
+            # Raw recordings take a quarter of the space and replay as they were recorded.
+            with Recording(path) as recording:
+                self.assertEqual(recording.dtype, np.int16)
+
+            with ReplayDevice(path) as device, device.Task() as task:
+                task.ai_channels.add_ai_voltage_chan("Dev1/ai0:1")
+                np.testing.assert_array_equal(task.read_raw(100), raw)
+
+                with self.assertRaises(DaqError):
+                    task.in_stream.read_many(1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from run_tests import discover, run_case
+
+
+class TestRunner(unittest.TestCase):
+    """
+    Test the discovery and the isolated run of the test cases.
+    """
+
+    def test_discover(self) -> None:
+        cases = discover(pattern="test_analysis.py")
+
+        # Test cases are grouped in the order they are defined.
+        self.assertEqual(list(cases)[0], "test_analysis.TestAnalyzeJitter")
+        self.assertIn("test_analysis.TestAnalyzeJitter.test_glitch", cases["test_analysis.TestAnalyzeJitter"])
+
+    def test_run_case(self) -> None:
+        name = "test_analysis.TestOnlineJitterStats"
+        result = run_case(name, discover(pattern="test_analysis.py")[name])
+
+        self.assertEqual(result.name, name)
+        self.assertEqual(result.tests, 3)
+        self.assertTrue(result.passed)
+        self.assertIn("test_merge", result.output)
+
+
+if __name__ == "__main__":
+    unittest.main()
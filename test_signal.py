@@ -1,250 +1,289 @@
+import os
 import random
-import time
+import socket
+import tempfile
 import unittest
+from contextlib import nullcontext
+from dataclasses import fields
 from datetime import datetime as dt
-from unittest.mock import patch
+from pathlib import Path
+from unittest import mock
 from uuid import uuid4
 
 import numpy as np
+from nidaqmx.constants import AcquisitionType
 
 import db
+from analysis import JitterResult, MultiChannelJitterAnalyzer, OnlineJitterStats, format_table
+from capture_store import CaptureStore
 from mock_nidaqmx import DAQ
+from mock_nidaqmx.clock import Clock, VirtualClock
+from mock_nidaqmx.instrumentation import Instrumentation
+from mock_nidaqmx.replay import ReplayDevice
+from mock_nidaqmx.signals import EdgeJitter, Glitches, RandomToggles, Signal, SquareWave, StuckAt
+from mock_nidaqmx.stream_readers import DigitalMultiChannelReader
 
 TEST_DURATION = 11  # In seconds
 MAX_JITTER = 10  # In ms
 PERIOD = 2_000  # In ms
+SAMPLE_RATE = 20_000  # In samples per second
+CHUNK_SIZE = 10_000  # In samples
+NOISE_RATE = 0.75  # In random state changes per second
 
-tests_uuid = uuid4().hex
-tests_timestamp = dt.now()
+# The tests run on a virtual clock, faster than real time, unless the
+# 'REAL_TIME' environment variable is set to 1. Set 'TESTS_SEED' to reproduce
+# the random signals of a previous run. 'TESTS_UUID' and 'TESTS_TIMESTAMP'
+# are set by 'run_tests.py', so the test cases it runs in separate processes
+# are stored under the same run.
+REAL_TIME = os.environ.get("REAL_TIME") == "1"
 
-print(f"UUID: {tests_uuid}, TIMESTAMP: {tests_timestamp}")
+# The raw samples of each test are archived in this directory, by uuid and
+# test name, if the 'CAPTURE_DIR' environment variable is set.
+CAPTURE_DIR = os.environ.get("CAPTURE_DIR")
 
+# The metrics of the reads, the analysis and the garbage collector of each
+# test are written as '<METRICS_DIR>/<uuid>/<test name>.json' if the
+# 'METRICS_DIR' environment variable is set.
+METRICS_DIR = os.environ.get("METRICS_DIR")
 
-def base_test(test_case: unittest.TestCase, device: DAQ) -> None:
-    """
-    A base test to make the code cleaner and more reusable. It is used by alld
-    tests in this file.
-    """
+# Every read of each test is recorded as '<RECORD_DIR>/<uuid>/<test name>.daqrec'
+# if the 'RECORD_DIR' environment variable is set, to replay it later with
+# 'mock_nidaqmx.replay.ReplayDevice'.
+RECORD_DIR = os.environ.get("RECORD_DIR")
 
-    # Init the variables to track the sampling process.
-    delays = np.array([])
-    states = np.array([])
-    samples_count = 0
-    prev_state = None
-    prev_time = None
+tests_uuid = os.environ.get("TESTS_UUID") or uuid4().hex
+tests_timestamp = dt.fromisoformat(os.environ["TESTS_TIMESTAMP"]) if "TESTS_TIMESTAMP" in os.environ else dt.now()
+tests_seed = int(os.environ.get("TESTS_SEED", random.randrange(2**32)))
 
-    # Context manager to mimic the original 'nidaqmx' module.
-    with device.Task() as task:
+# The runner prints the values of the run itself.
+if "TESTS_UUID" not in os.environ:
+    print(f"UUID: {tests_uuid}, TIMESTAMP: {tests_timestamp}, SEED: {tests_seed}")
 
-        # Configure the channel for the task to read.
-        task.di_channels.add_di_chan("Dev1/0")
 
-        # Wait for the first state transition.
-        while True:
-            # Perform a read.
-            state = task.read()
+def make_device(signal: Signal, terminals: str = "Dev1/0") -> DAQ:
+    """Create a device with the signal under test wired to the given terminals."""
 
-            # Init the previous state if it's None.
-            if prev_state is None:
-                prev_state = state
+    instrumentation = Instrumentation() if METRICS_DIR else None
+    device = DAQ(clock=Clock() if REAL_TIME else VirtualClock(), seed=tests_seed, instrumentation=instrumentation)
+    device.connect(terminals, signal)
 
-            # Break on first state transition.
-            if state != prev_state:
-                prev_time = time.perf_counter()
-                prev_state = state
-                break
+    return device
 
-        # Perform reads.
-        start = time.perf_counter()
-        while True:
-            # Store the current time to be constant for each iteration.
-            now = time.perf_counter()
 
-            # Perform a read and count sample as read.
-            state = task.read()
-            samples_count += 1
+def base_test(test_case: unittest.TestCase, device: DAQ, channels: str = "Dev1/0") -> list[list[JitterResult]]:
+    """
+    A base test to make the code cleaner and more reusable. It is used by all
+    tests in this file. All the 'channels' are sampled by the same task and
+    analyzed at once, each one from its own first transition.
 
-            # Limiting the sampling rate yields more reliable results.
-            time.sleep(1 / 5_000_000)
+    Returns:
+        list[list[JitterResult]]:
 
-            # Store delay time and state in list if state changed.
-            if state != prev_state:
-                delays = np.append(delays, (now - prev_time))
-                states = np.append(states, state)
-                prev_state = state
-                prev_time = now
+        The results of the analysis of each chunk, for each channel.
+    """
 
-            # Break the loop if the test duration is reached.
-            if (now - start) > TEST_DURATION:
-                break
+    failures = ""
+    results: list[list[JitterResult]] = []
 
-    # Store the end time of the iterations.
-    end = now
+    def analyze_chunk(samples: np.ndarray, times: np.ndarray) -> None:
+        """Analyze a chunk of samples of every channel and log which transitions failed."""
 
-    # Compute jitters from the delays. The first delay is discarded as it
-    # did not start synchonized with the square wave.
-    jitters = delays * 1000 - (PERIOD / 2)
+        nonlocal failures
 
-    # Compute the percentage of failed samples, number of samples per
-    # second. And mean, std, min and max of the absolute values of the
-    # jitters.
-    jitters_abs = np.abs(jitters)
+        results.append(analyzer.update(samples, times))
 
-    failed_percent = np.sum(jitters_abs > MAX_JITTER) / len(jitters) * 100
-    samples_per_second = samples_count / (end - start)
+        for channel, (name, result) in enumerate(zip(analyzer.channels, results[-1])):
+            if result.transitions:
+                transition_times[channel].append(result.times)
+                transition_states[channel].append(result.states)
+
+            label = f"{name} " if len(analyzer.channels) > 1 else ""
+
+            for i in np.flatnonzero(result.failed):
+                transition = result.first_transition + i
+                failures += f"\n\t\tFAIL - Jitter of {label}transition {transition:03} is over {MAX_JITTER}ms: "
+                failures += f"{result.jitters[i]:8.3f}ms"
+
+    # Time the phases of the loop and the garbage collector if the device is
+    # instrumented, the reads are timed by the task itself.
+    metrics = device.instrumentation
+    phase = metrics.phase if metrics else lambda name: nullcontext()
+    if metrics:
+        metrics.start()
+
+    # Context manager to mimic the original 'nidaqmx' module.
+    with device.Task() as task:
+
+        # Configure the channels for the task to read and its Sample Clock.
+        task.di_channels.add_di_chan(channels)
+        task.timing.cfg_samp_clk_timing(SAMPLE_RATE, sample_mode=AcquisitionType.CONTINUOUS)
+        reader = DigitalMultiChannelReader(task.in_stream)
+        names = [channel.name for channel in task.channels]
+
+        if RECORD_DIR:
+            task.record(Path(RECORD_DIR, tests_uuid, f"{test_case.__class__.__name__}.daqrec"))
+
+        # Init the fixed size buffer for the raw capture, it is filled by the
+        # DAQ Sample Clock and analyzed every 'CHUNK_SIZE' samples so memory
+        # doesn't grow with the test duration. Only the transitions and
+        # failures are kept.
+        data = np.empty((len(names), CHUNK_SIZE), dtype=np.uint8)
+        analyzer = MultiChannelJitterAnalyzer(names, PERIOD, MAX_JITTER)
+
+        # The times and states of the transitions of each channel, only the
+        # chunks with transitions are kept, so memory grows with the
+        # transitions found instead of the test duration.
+        transition_times: list[list[np.ndarray]] = [[] for _ in names]
+        transition_states: list[list[np.ndarray]] = [[] for _ in names]
+        samples_count = 0
+
+        # Archive the raw capture as well, if enabled.
+        capture = None
+        if CAPTURE_DIR:
+            capture = CaptureStore(CAPTURE_DIR).create(tests_uuid, test_case.__class__.__name__, names, data.dtype)
 
-    jitters_mean = jitters_abs.mean()
-    jitters_std = jitters_abs.std()
-    jitters_min = jitters_abs.min()
-    jitters_max = jitters_abs.max()
+        # Perform reads.
+        task.start()
+        start = task.in_stream.sample_times(0, 1)[0]
+        while True:
+            # Read a chunk of samples, they are timestamped by the Sample Clock.
+            first_sample = task.in_stream.curr_read_pos
+            reader.read_many_sample_port_byte(data, CHUNK_SIZE)
+            times = task.in_stream.sample_times(first_sample, CHUNK_SIZE)
+
+            # Analyze the chunk and count its samples as read.
+            with phase("analysis"):
+                analyze_chunk(data, times)
+            samples_count += CHUNK_SIZE
+
+            if capture:
+                with phase("capture"):
+                    capture.write(data, times)
+
+            # Break the loop once every channel was captured for the test
+            # duration after its first transition, or if one of them didn't
+            # change state during the first period.
+            elapsed = times[-1] - analyzer.start_times
+            if np.all(elapsed > TEST_DURATION) or (times[-1] - start) > TEST_DURATION + PERIOD / 1000:
+                break
+
+        if capture:
+            capture.close()
+
+    # Export the metrics of the test.
+    if metrics:
+        metrics.stop()
+        path = Path(METRICS_DIR, tests_uuid, f"{test_case.__class__.__name__}.json")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        metrics.to_json(path)
+
+    # Store the end time of the capture.
+    end = times[-1]
+
+    # Get the stats of each channel and of the whole capture.
+    channel_stats = [stats.snapshot() for stats in analyzer.stats]
+    total = OnlineJitterStats(MAX_JITTER)
+    for stats in analyzer.stats:
+        total.merge(stats)
+    stats = total.snapshot()
+    samples_per_second = samples_count / (end - start)
 
     # Prepare log message with results and stats.
     log_message = f""
     log_message += f"\n{test_case.__class__.__name__}"
-    log_message += f"\n\tMean: {jitters_mean:.3f}ms, Std: {jitters_std:.3f}ms, "
-    log_message += f"Min: {jitters_min:.3f}ms, Max: {jitters_max:.3f}ms"
+    log_message += f"\n\tMean: {stats.mean:.3f}ms, Std: {stats.std:.3f}ms, "
+    log_message += f"Min: {stats.min:.3f}ms, Max: {stats.max:.3f}ms"
     log_message += f"\n\tSamples per second: {samples_per_second:,.0f}, "
-    log_message += f"Transitions: {len(jitters)}, Failed: {failed_percent:.1f}%"
+    log_message += f"Transitions: {stats.transitions}, Failed: {stats.failed_percent:.1f}%"
 
-    # Init variable to store if test passed or failed.
-    passed = False
+    # Log the stats of each channel in a table.
+    if len(names) > 1:
+        log_message += "".join(f"\n\t{line}" for line in format_table(names, channel_stats))
 
-    # Check if all jitters are less then 'MAX_JITTER'. If not, log which
-    # transition failed and what was it's jitter.
-    for i, jitter in enumerate(jitters):
-        if abs(jitter) > MAX_JITTER:
-            log_message += f"\n\t\tFAIL - Jitter of transition {i:03} is over {MAX_JITTER}ms: {jitter:8.3f}ms"
+    # Log which transitions failed and what was their jitter.
+    log_message += failures
 
-    # If no jitters failed, then log "PASS" and set passed variable to True.
-    if failed_percent == 0:
+    # Log the channels that never changed state, they fail as well.
+    synced = analyzer.synced
+    dead = [name for i, name in enumerate(names) if not synced[i] or not channel_stats[i].transitions]
+    for name in dead:
+        log_message += f"\n\t\tFAIL - No transitions on {name}"
+
+    # The test passes only if every channel passed, then log "PASS".
+    passed = all(stats.passed for stats in channel_stats) and not dead
+    if passed:
         log_message += "\n\t\tPASS"
-        passed = True
 
-    # Print log message and wait a little to prevent Github Actions from
-    # showing the messages out of order.
+    # Print log message.
     print(f"{log_message}\n", flush=True)
-    time.sleep(1)
 
-    # Store results in the database
-    test = db.Test(
-        name=f"{test_case.__class__.__name__}",
-        times=np.cumsum(delays),
-        states=states,
-        passed=passed,
-        log=log_message,
+    # Queue the results to be stored in the database in the background, one
+    # test per channel.
+    for i, name in enumerate(names):
+        test = db.Test(
+            name=f"{test_case.__class__.__name__}" + (f" {name}" if len(names) > 1 else ""),
+            times=np.concatenate(transition_times[i]) if transition_times[i] else np.empty(0),
+            states=np.concatenate(transition_states[i]) if transition_states[i] else np.empty(0, dtype=np.uint8),
+            passed=channel_stats[i].passed,
+            log=log_message,
+            uuid=tests_uuid,
+            timestamp=tests_timestamp,
+        )
+        db.results.put(test)
+
+    # Queue a summary of the test as well, for the trends over time. Stats are
+    # undefined if there were no transitions.
+    values = (stats.mean, stats.std, stats.min, stats.max)
+    mean, std, minimum, maximum = (None if np.isnan(value) else value for value in values)
+    summary = db.Summary(
+        name=test_case.__class__.__name__,
         uuid=tests_uuid,
         timestamp=tests_timestamp,
+        passed=passed,
+        mean=mean,
+        std=std,
+        min=minimum,
+        max=maximum,
+        failed_percent=stats.failed_percent,
+        samples_per_second=samples_per_second,
+        transitions=stats.transitions,
+        host=socket.gethostname(),
+        origin="github-actions" if os.environ.get("GITHUB_ACTIONS") == "true" else "local",
     )
-    test.save()
+    db.results.put(summary)
 
-    # Assert that all jitters are less then 'MAX_JITTER'.
-    for jitter in jitters:
-        test_case.assertLessEqual(abs(jitter), MAX_JITTER)
+    # Assert that every channel changed state and that all jitters are less
+    # then 'MAX_JITTER'.
+    test_case.assertFalse(dead, f"No transitions on {', '.join(dead)}")
+    test_case.assertLessEqual(stats.max if stats.transitions else 0, MAX_JITTER)
+
+    return results
 
 
 class TestSignalJitter(unittest.TestCase):
     """
-    Test if the signal jitter is within acceptable range.
+    Test if the signal jitter is within acceptable range. The signal is a
+    square wave of 0.5Hz and 50% duty cycle.
     """
 
-    def __init__(self, methodName: str = "runTest") -> None:
-        """
-        Init the class and it's parent.
-        """
-
-        # Init parent with the required arguments.
-        super().__init__(methodName)
-
-        # Global class variables to track the state changes
-        self.next_state_change_time = time.perf_counter()
-        self.current_state = 0
-
-    def side_effect_read(self, *args: list, **kwargs: dict) -> int:
-        """
-        Patch the 'read_digital()' function of the DAQ class to generate a
-        square wave of 0.5Hz and 50% duty cycle.
-
-        Returns:
-            int:
-
-            A 1 or 0 value for HIGH and LOW respectively.
-        """
-
-        # Store the current time to be constant for each function call.
-        now = time.perf_counter()
-
-        # If it is time to change the state then do so and compute the time
-        # for the next state change.
-        if now > self.next_state_change_time:
-            self.current_state = not self.current_state
-
-            self.next_state_change_time = now + (PERIOD / 2 / 1000)
-
-        return self.current_state
-
     def test_read(self) -> None:
-        # Context manager to patch "read()" function of the DAQ.Task class.
-        with patch.object(DAQ.Task, "read", side_effect=self.side_effect_read):
+        device = make_device(SquareWave(PERIOD / 1000))
 
-            # Init the device
-            device = DAQ()
-
-            # Run the base test with the patched device.
-            base_test(self, device)
+        # Run the base test with the device.
+        base_test(self, device)
 
 
 class TestSignalJitterNoise(unittest.TestCase):
     """
     Test if the signal jitter is within acceptable range. A random jitter noise
-    is injected into the signal to simulate a test failure.
+    of ±(2 * MAX_JITTER) is injected into the signal to simulate a test failure.
     """
 
-    def __init__(self, methodName: str = "runTest") -> None:
-        """
-        Init the class and it's parent.
-        """
-
-        # Init parent with the required arguments.
-        super().__init__(methodName)
-
-        # Global class variables to track the state changes
-        self.next_state_change_time = time.perf_counter()
-        self.current_state = 0
-
-    def side_effect_read(self, *args: list, **kwargs: dict) -> int:
-        """
-        Patch the 'read_digital()' function of the DAQ class to generate a
-        square wave of 0.5Hz and 50% duty cycle. A jitter of +-(2 * MAX_JITTER)
-        delay will be injected to simulate jitter in the signal.
-
-        Returns:
-            int:
-
-            A 1 or 0 value for HIGH and LOW respectively.
-        """
-
-        # Store the current time to be constant for each function call.
-        now = time.perf_counter()
-
-        # If it is time to change the state then do so and compute the time
-        # for the next state change.
-        if now > self.next_state_change_time:
-            self.current_state = not self.current_state
-
-            self.next_state_change_time = now + (PERIOD / 2 / 1000)
-            self.next_state_change_time += random.uniform(-MAX_JITTER * 2 / 1000, MAX_JITTER * 2 / 1000)
-
-        return self.current_state
-
     def test_read(self) -> None:
-        # Context manager to patch "read()" function of the DAQ.Task class.
-        with patch.object(DAQ.Task, "read", side_effect=self.side_effect_read):
-
-            # Init the device
-            device = DAQ()
+        device = make_device(SquareWave(PERIOD / 1000, impairments=(EdgeJitter(MAX_JITTER * 2 / 1000),)))
 
-            # Run the base test with the patched device.
-            base_test(self, device)
+        # Run the base test with the device.
+        base_test(self, device)
 
 
 class TestSignalRandomness(unittest.TestCase):
@@ -253,124 +292,95 @@ class TestSignalRandomness(unittest.TestCase):
     are randomly injected into the signal to simulate a test failure.
     """
 
-    def __init__(self, methodName: str = "runTest") -> None:
-        """
-        Init the class and it's parent.
-        """
-
-        # Init parent with the required arguments.
-        super().__init__(methodName)
-
-        # Global class variables to track the state changes
-        self.next_state_change_time = time.perf_counter()
-        self.current_state = 0
-
-    def side_effect_read(self, *args: list, **kwargs: dict) -> int:
-        """
-        Patch the 'read_digital()' function of the DAQ class to generate a
-        square wave of 0.5Hz and 50% duty cycle. Random state changes are
-        injected into the signal.
-
-        Returns:
-            int:
-
-            A 1 or 0 value for HIGH and LOW respectively.
-        """
-
-        # Store the current time to be constant for each function call.
-        now = time.perf_counter()
-
-        # Inject random state transitions.
-        if random.random() < 0.000075:
-            self.current_state = not self.current_state
-            return self.current_state
-
-        # If it is time to change the state then do so and compute the time
-        # for the next state change.
-        if now > self.next_state_change_time:
-            self.current_state = not self.current_state
-
-            self.next_state_change_time = now + (PERIOD / 2 / 1000)
-
-        return self.current_state
-
     def test_read(self) -> None:
-        # Context manager to patch "read()" function of the DAQ.Task class.
-        with patch.object(DAQ.Task, "read", side_effect=self.side_effect_read):
-
-            # Init the device
-            device = DAQ()
+        device = make_device(SquareWave(PERIOD / 1000, impairments=(RandomToggles(NOISE_RATE / SAMPLE_RATE),)))
 
-            # Run the base test with the patched device.
-            base_test(self, device)
+        # Run the base test with the device.
+        base_test(self, device)
 
 
 class TestSignalSingleSampleNoise(unittest.TestCase):
     """
     Test if the signal jitter is within acceptable range. Random state changes
-    are injected for a single sample of the signal to simulate a test failure.
+    are injected for a single sample of the signal to simulate a fluke.
     """
 
-    def __init__(self, methodName: str = "runTest") -> None:
-        """
-        Init the class and it's parent.
-        """
+    def test_read(self) -> None:
+        device = make_device(SquareWave(PERIOD / 1000, impairments=(Glitches(NOISE_RATE / SAMPLE_RATE),)))
 
-        # Init parent with the required arguments.
-        super().__init__(methodName)
+        # Run the base test with the device.
+        base_test(self, device)
 
-        # Global class variables to track the state changes
-        self.next_state_change_time = time.perf_counter()
-        self.current_state = 0
-        self.is_random = True
 
-    def side_effect_read(self, *args: list, **kwargs: dict) -> int:
-        """
-        Patch the 'read_digital()' function of the DAQ class to generate a
-        square wave of 0.5Hz and 50% duty cycle. Random state changes are
-        injected into the signal for a single sample to simulate a fluke.
+class TestSignalStuckAt(unittest.TestCase):
+    """
+    Test if the signal jitter is within acceptable range. The signal gets stuck
+    HIGH for a few periods to simulate a test failure.
+    """
 
-        Returns:
-            int:
+    def test_read(self) -> None:
+        device = make_device(SquareWave(PERIOD / 1000, impairments=(StuckAt(1, 4, PERIOD * 2 / 1000),)))
 
-            A 1 or 0 value for HIGH and LOW respectively.
-        """
+        # Run the base test with the device.
+        base_test(self, device)
 
-        # Store the current time to be constant for each function call.
-        now = time.perf_counter()
 
-        # If last change was randomly set, change states again.
-        if self.is_random:
-            self.current_state = not self.current_state
-            self.is_random = False
+class TestSignalMultiChannel(unittest.TestCase):
+    """
+    Test if the signal jitter is within acceptable range on every digital
+    line of the device. The same square wave is wired to all of them and they
+    are sampled by a single task.
+    """
 
-            return self.current_state
+    def test_read(self) -> None:
+        device = make_device(SquareWave(PERIOD / 1000), "Dev1/port0/line0:12")
 
-        # Inject randomly a fluke in the signal.
-        if random.random() < 0.000075:
-            self.current_state = not self.current_state
-            self.is_random = True
+        # Run the base test with all the lines of the device.
+        base_test(self, device, "Dev1/port0/line0:12")
 
-            return self.current_state
 
-        # If it is time to change the state then do so and compute the time
-        # for the next state change.
-        if now > self.next_state_change_time:
-            self.current_state = not self.current_state
+class TestSignalDeadLine(unittest.TestCase):
+    """
+    Test that a dead line, which never changes state, fails the test. The
+    square wave is wired to the first line of the task, the second one stays
+    LOW for the whole capture.
+    """
 
-            self.next_state_change_time = now + (PERIOD / 2 / 1000)
+    def test_read(self) -> None:
+        device = make_device(SquareWave(PERIOD / 1000), "Dev1/port0/line0")
+        device.connect("Dev1/port0/line1", SquareWave(PERIOD / 1000, impairments=(StuckAt(0, 0),)))
 
-        return self.current_state
+        # Run the base test with both lines, it must fail because of the dead one.
+        with self.assertRaisesRegex(AssertionError, "No transitions on Dev1/port0/line1"):
+            base_test(self, device, "Dev1/port0/line0:1")
 
-    def test_read(self) -> None:
-        # Context manager to patch "read()" function of the DAQ.Task class.
-        with patch.object(DAQ.Task, "read", side_effect=self.side_effect_read):
 
-            # Init the device
-            device = DAQ()
+class TestSignalReplay(unittest.TestCase):
+    """
+    Test that a recorded capture replays with the same results. A square wave
+    with a jitter below 'MAX_JITTER' is recorded by the base test, then the
+    recording is served to the base test again by a 'ReplayDevice'.
+    """
 
-            # Run the base test with the patched device.
-            base_test(self, device)
+    def test_read(self) -> None:
+        device = make_device(SquareWave(PERIOD / 1000, impairments=(EdgeJitter(MAX_JITTER / 2 / 1000),)))
+
+        with tempfile.TemporaryDirectory() as directory:
+            # Run the base test with the device, recording every read.
+            with mock.patch(f"{__name__}.RECORD_DIR", directory):
+                recorded = base_test(self, device)
+
+            # Run it again with the recording, without recording the replay.
+            path = Path(directory, tests_uuid, f"{self.__class__.__name__}.daqrec")
+            with mock.patch(f"{__name__}.RECORD_DIR", None), ReplayDevice(path) as replay:
+                replayed = base_test(self, replay)
+
+        # Every chunk gives the same transitions, jitters and stats.
+        self.assertGreater(sum(result.transitions for chunk in recorded for result in chunk), 0)
+        self.assertEqual(len(replayed), len(recorded))
+        for expected, result in zip(sum(recorded, []), sum(replayed, [])):
+            for field in fields(JitterResult):
+                np.testing.assert_array_equal(getattr(result, field.name), getattr(expected, field.name))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+import unittest
+
+import numpy as np
+
+from waveform import decimate, step_trace
+
+RATE = 20_000  # In samples per second
+
+
+class TestWaveform(unittest.TestCase):
+    """
+    Test the vectorized step trace and the decimation of the plots.
+    """
+
+    def test_step_trace(self) -> None:
+        times = np.array([1.0, 2.0, 3.0])
+        states = np.array([0, 1, 0], dtype=np.uint8)
+
+        x, y = step_trace(times, states)
+
+        np.testing.assert_array_equal(x, [1, 1, 2, 2, 3, 3])
+        np.testing.assert_array_equal(y, [1, 0, 0, 1, 1, 0])
+
+        # Tests without transitions have an empty trace, the app doesn't plot it.
+        x, y = step_trace(np.empty(0), np.empty(0, dtype=np.uint8))
+        self.assertEqual((len(x), len(y)), (0, 0))
+
+    def test_glitch_is_kept(self) -> None:
+        # A minute of a 0.5Hz square wave with a single sample glitch.
+        times = np.arange(60 * RATE) / RATE
+        samples = ((times // 1) % 2).astype(np.uint8)
+        samples[30 * RATE + 1_234] ^= 1
+
+        x, y = decimate(times, samples, buckets=500)
+
+        self.assertLessEqual(len(x), 4 * 500 + 2)
+        self.assertTrue(np.all(np.diff(x) >= 0))
+        self.assertEqual(x[0], times[0])
+        self.assertEqual(x[-1], times[-1])
+
+        # The glitch is HIGH while the wave is LOW, it is kept as the maximum of its bucket.
+        glitch = times[30 * RATE + 1_234]
+        self.assertIn(glitch, x)
+        self.assertEqual(y[np.flatnonzero(x == glitch)[0]], 1)
+
+    def test_viewport(self) -> None:
+        times = np.arange(60 * RATE) / RATE
+        samples = ((times // 1) % 2).astype(np.uint8)
+
+        # Zooming in keeps every sample once there are few enough of them.
+        x, y = decimate(times, samples, 10, 10.01, buckets=500)
+
+        np.testing.assert_array_equal(x, times[10 * RATE - 1 : int(10.01 * RATE) + 2])
+        np.testing.assert_array_equal(y, samples[10 * RATE - 1 : int(10.01 * RATE) + 2])
+
+        # A wider viewport is decimated within its range only.
+        x, _ = decimate(times, samples, 10, 20, buckets=500)
+
+        self.assertLessEqual(len(x), 4 * 500 + 2)
+        self.assertLess(x[0], 10)
+        self.assertGreater(x[-1], 20)
+        self.assertTrue(np.all((x[1:-1] >= 10) & (x[1:-1] <= 20)))
+
+    def test_viewport_past_the_data(self) -> None:
+        times = np.arange(100 * RATE) / RATE
+        samples = ((times // 1) % 2).astype(np.uint8)
+
+        # A chart wider than the capture, on both sides, is decimated within
+        # the data.
+        for start, end in ((0, 200), (-50, 150), (50, 200)):
+            x, y = decimate(times, samples, start, end, 100)
+
+            self.assertLessEqual(len(x), 4 * 100 + 2)
+            self.assertEqual(x[-1], times[-1])
+            self.assertTrue(np.all(np.diff(x) >= 0))
+            self.assertEqual(set(y[x >= max(start, 0)]), {0, 1})
+
+        # A viewport past the end of the data keeps the last point only.
+        x, _ = decimate(times, samples, 150, 200, 100)
+        np.testing.assert_array_equal(x, times[-1:])
+
+
+if __name__ == "__main__":
+    unittest.main()
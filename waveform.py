@@ -0,0 +1,89 @@
+import numpy as np
+
+
+def step_trace(times: np.ndarray, states: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Build the points of a step plot of a square wave from its transitions,
+    with a vertical edge from the previous state to the new one at each
+    transition.
+
+    Args:
+        times (np.ndarray): The time of each transition.
+        states (np.ndarray): The state of the signal after each transition.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]:
+
+        The x and y values of the points, two for each transition.
+    """
+
+    states = np.asarray(states)
+
+    x = np.repeat(np.asarray(times, dtype=np.float64), 2)
+    y = np.empty(len(x), dtype=states.dtype)
+    y[0::2] = 1 - states
+    y[1::2] = states
+
+    return x, y
+
+
+def decimate(
+    x: np.ndarray, y: np.ndarray, start: float | None = None, end: float | None = None, buckets: int = 2_000
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce the points within a viewport for plotting. The viewport is split in
+    'buckets' of the same duration, and only the first, last, minimum and
+    maximum points of each bucket are kept, so even single sample glitches
+    stay visible at any zoom level. The closest points outside the viewport
+    are kept too, so the trace reaches its borders.
+
+    Args:
+        x (np.ndarray): The sorted x values of the points.
+        y (np.ndarray): The y values of the points.
+        start (float | None): The start of the viewport, the first x by
+            default.
+        end (float | None): The end of the viewport, the last x by default.
+        buckets (int): The number of buckets, up to 4 points are kept for
+            each one.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]:
+
+        The x and y values of the points kept, sorted by x.
+    """
+
+    x, y = np.asarray(x), np.asarray(y)
+    if not len(x):
+        return x, y
+
+    start = x[0] if start is None else start
+    end = x[-1] if end is None else end
+
+    # Select the points within the viewport, plus one on each side.
+    first = max(int(np.searchsorted(x, start, side="left")) - 1, 0)
+    last = min(int(np.searchsorted(x, end, side="right")) + 1, len(x))
+    x, y = x[first:last], y[first:last]
+
+    if len(x) <= 4 * buckets or end <= start:
+        return x, y
+
+    # Split only the part of the viewport that holds points in buckets, so
+    # none of them starts past the last point when the viewport is wider
+    # than the data.
+    start, end = max(start, x[0]), min(end, x[-1])
+
+    # Find where each bucket starts, and drop the empty ones.
+    edges = np.searchsorted(x, np.linspace(start, end, buckets + 1)[:-1], side="left")
+    edges = np.unique(np.concatenate(([0], edges)))
+    ends = np.append(edges[1:], len(x)) - 1
+    bucket = np.repeat(np.arange(len(edges)), np.diff(np.append(edges, len(x))))
+
+    # The first point of each bucket that holds its minimum and its maximum.
+    keep = [edges, ends]
+    for extreme in (np.minimum, np.maximum):
+        matches = np.flatnonzero(y == extreme.reduceat(y, edges)[bucket])
+        keep.append(matches[np.unique(bucket[matches], return_index=True)[1]])
+
+    indices = np.unique(np.concatenate(keep))
+
+    return x[indices], y[indices]